@@ -0,0 +1,92 @@
+import glob
+import logging
+import os
+from datetime import datetime, timedelta
+
+
+class ColdArchive:
+    """Gzipped CSV archive of listings that have been inactive for a long time
+
+    Each archiving pass writes one file, so files never need rewriting and
+    columns added to the dataset later don't clash with older files.
+    """
+
+    def __init__(self, archive_dir):
+        self.logger = logging.getLogger(__name__)
+        self.archive_dir = archive_dir
+
+    def split_cold(self, df, retention_days, now=None):
+        """Split the dataset into (hot, cold) rows; cold rows are inactive and last seen over retention_days ago"""
+        import pandas as pd
+
+        if df.empty or 'last_seen' not in df.columns:
+            return df, df.iloc[0:0]
+
+        cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+        last_seen = pd.to_datetime(df['last_seen'], errors='coerce')
+        inactive = df['is_active'].astype(str).str.lower() != 'true'
+        cold_mask = inactive & (last_seen < cutoff)
+        return df[~cold_mask], df[cold_mask]
+
+    def archive(self, cold_df, part=None):
+        """Append cold rows to the archive as a new compressed file (part numbers one pass's files)"""
+        filepath = self.stage(cold_df, part)
+        if filepath:
+            self.publish([filepath])
+        return filepath
+
+    def stage(self, cold_df, part=None):
+        """Write cold rows to a temporary file that queries don't see yet, returning the path it will publish to
+
+        Staging lets the caller write the archive before removing the rows from the
+        dataset, and publish it only once that save has succeeded, so a failed save
+        can't leave the same rows both in the dataset and in the archive.
+        """
+        if cold_df.empty:
+            return None
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        suffix = f"_part{part:04d}" if part is not None else ''
+        filepath = os.path.join(self.archive_dir, f"archived_{timestamp}{suffix}.csv.gz")
+        cold_df.to_csv(f"{filepath}.tmp", index=False, compression='gzip')
+        return filepath
+
+    def publish(self, filepaths):
+        """Move staged files into the archive"""
+        for filepath in filepaths:
+            os.replace(f"{filepath}.tmp", filepath)
+
+    def discard(self, filepaths):
+        """Delete staged files whose rows stayed in the dataset"""
+        for filepath in filepaths:
+            if os.path.exists(f"{filepath}.tmp"):
+                os.remove(f"{filepath}.tmp")
+
+    def archive_files(self):
+        """Archive files, oldest first"""
+        return sorted(glob.glob(os.path.join(self.archive_dir, "archived_*.csv.gz")))
+
+    def query(self, listing_id=None, car_model=None, last_seen_from=None, last_seen_to=None, columns=None):
+        """Load archived listings, optionally filtered by ID, model and last_seen date range (YYYY-MM-DD)"""
+        import pandas as pd
+
+        frames = []
+        for filepath in self.archive_files():
+            frame = pd.read_csv(filepath, compression='gzip', dtype={'ID': str, 'listing_id': str})
+            if listing_id is not None:
+                frame = frame[frame['ID'] == listing_id]
+            if car_model is not None:
+                frame = frame[frame['car_model'] == car_model]
+            if last_seen_from is not None:
+                frame = frame[frame['last_seen'].astype(str) >= last_seen_from]
+            if last_seen_to is not None:
+                frame = frame[frame['last_seen'].astype(str) <= f"{last_seen_to} 23:59:59"]
+            if columns:
+                frame = frame[[column for column in columns if column in frame.columns]]
+            if not frame.empty:
+                frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
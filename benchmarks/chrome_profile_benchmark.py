@@ -0,0 +1,133 @@
+"""Before/after benchmark of the default and lean Chrome profiles.
+
+For each profile, loads every search URL a few times and records page load
+time (until the first listing card is present), bytes transferred over the
+network and resident memory of the chromedriver/Chrome process tree.
+
+    python benchmarks/chrome_profile_benchmark.py --loads 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from streamlined_master_scraper import StreamlinedMasterScraper
+
+CARD_SELECTOR = '.tm-motors-tier-one-search-card__listing-details-container'
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and all its descendants"""
+    try:
+        import psutil
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+        return sum(process.memory_info().rss for process in processes if process.is_running())
+    except ImportError:
+        pass
+
+    # Fall back to /proc on Linux when psutil isn't installed
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def bytes_transferred(driver):
+    """Sum of encoded bytes received since the performance log was last read"""
+    total = 0
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message.get('method') == 'Network.loadingFinished':
+            total += message['params'].get('encodedDataLength', 0)
+    return total
+
+
+def benchmark_profile(scraper, lean, urls, loads):
+    """Load each URL `loads` times with one profile and return the measurements"""
+    scraper.lean_profile = lean
+    scraper.chrome_options = scraper.build_chrome_options(lean)
+    scraper.chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    driver = scraper.create_driver()
+    load_times = []
+    transfer_sizes = []
+    rss_samples = []
+
+    try:
+        for url in urls:
+            for _ in range(loads):
+                bytes_transferred(driver)  # Drain log entries from the previous load
+                start = time.perf_counter()
+                driver.get(url)
+                WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+                load_times.append(time.perf_counter() - start)
+
+                # Give late requests (trackers, lazy images) a moment to land before counting
+                time.sleep(2)
+                transfer_sizes.append(bytes_transferred(driver))
+                rss_samples.append(process_tree_rss(driver.service.process.pid))
+    finally:
+        driver.quit()
+
+    return {
+        'profile': 'lean' if lean else 'default',
+        'loads': len(load_times),
+        'load_time_median_s': statistics.median(load_times),
+        'load_time_max_s': max(load_times),
+        'bytes_transferred_median': statistics.median(transfer_sizes),
+        'driver_rss_peak_mb': max(rss_samples) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loads', type=int, default=3, help='page loads per URL per profile')
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'chrome_profile.json'))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = StreamlinedMasterScraper(output_dir=output_dir, onedrive_dir=os.path.join(output_dir, 'onedrive'))
+        urls = list(scraper.urls.values())
+
+        # Warm the lean profile's disk cache first so the comparison reflects steady-state runs
+        benchmark_profile(scraper, True, urls[:1], 1)
+
+        results = [benchmark_profile(scraper, False, urls, args.loads), benchmark_profile(scraper, True, urls, args.loads)]
+
+    for result in results:
+        print(f"{result['profile']:>8}: load {result['load_time_median_s']:.2f}s median "
+              f"({result['load_time_max_s']:.2f}s max), "
+              f"{result['bytes_transferred_median'] / 1024:.0f} KiB transferred, "
+              f"driver RSS {result['driver_rss_peak_mb']:.0f} MiB peak")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'recorded_at': datetime.now().isoformat(timespec='seconds'), 'results': results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Startup cost of each CLI subcommand.
+
+Runs every subcommand several times in a fresh interpreter against a scratch
+output root seeded with synthetic cards, and records the median wall time
+plus which heavy dependencies (Selenium, pandas, openpyxl, requests) each
+one ended up importing.
+
+    python benchmarks/cli_startup_benchmark.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from recorded_cards import RecordedCard, save_cards
+from synthetic_listings import generate_cards
+
+SCRIPT = os.path.join(REPO_DIR, 'streamlined_master_scraper.py')
+HEAVY_MODULES = ['selenium', 'pandas', 'openpyxl', 'requests']
+
+
+def imported_heavy_modules(importtime_output):
+    """Heavy top-level packages listed in -X importtime output"""
+    imported = set()
+    for line in importtime_output.splitlines():
+        if line.startswith('import time:'):
+            module = line.rsplit('|', 1)[-1].strip()
+            if module in HEAVY_MODULES:
+                imported.add(module)
+    return sorted(imported)
+
+
+def time_command(name, args, repeat):
+    """Run a CLI command `repeat` times and return its timing record"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, SCRIPT] + args, cwd=REPO_DIR, check=True, capture_output=True)
+        durations.append(time.perf_counter() - start)
+
+    # One extra run with import tracing to see what the command pulled in
+    traced = subprocess.run([sys.executable, '-X', 'importtime', SCRIPT] + args, cwd=REPO_DIR, check=True, capture_output=True, text=True)
+    result = {
+        'command': name,
+        'median_seconds': statistics.median(durations),
+        'min_seconds': min(durations),
+        'heavy_imports': imported_heavy_modules(traced.stderr),
+    }
+    print(f"{name:>14}: {result['median_seconds'] * 1000:7.0f} ms median, imports {', '.join(result['heavy_imports']) or 'nothing heavy'}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--listings', type=int, default=200, help='synthetic listings to seed the dataset with')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results', 'cli_startup.json'))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        raw_file = os.path.join(output_dir, 'raw_scrapes', 'cards_synthetic.jsonl')
+        save_cards(raw_file, [RecordedCard(card.text, card.anchor.href, car_model) for car_model, card in generate_cards(args.listings)])
+
+        root = ['--output-dir', output_dir]
+        results = [
+            time_command('--help', ['--help'], args.repeat),
+            time_command('scrape --help', root + ['scrape', '--help'], args.repeat),
+            time_command('replay', root + ['replay', raw_file], args.repeat),
+            time_command('stats', root + ['stats'], args.repeat),
+            time_command('reformat', root + ['reformat'], args.repeat),
+            time_command('export', root + ['export'], args.repeat),
+        ]
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({'recorded_at': datetime.now().isoformat(timespec='seconds'), 'results': results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
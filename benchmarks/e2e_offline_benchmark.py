@@ -0,0 +1,88 @@
+"""Offline end-to-end benchmark of StreamlinedMasterScraper.run.
+
+Starts the mock TradeMe server, points the scraper at it with a scratch (or
+given) output root and times the full fetch -> parse -> merge -> export
+pipeline. No network access is needed beyond localhost.
+
+    python benchmarks/e2e_offline_benchmark.py --pages 5 --latency 0.1 --runs 2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import pandas as pd
+
+from mock_trademe_server import MockTradeMeConfig, start_server
+from streamlined_master_scraper import StreamlinedMasterScraper
+
+
+def run_pipeline(output_dir, base_url, args):
+    """Run the scraper once and return timing and row counts"""
+    scraper = StreamlinedMasterScraper(output_dir=output_dir, base_url=base_url)
+    scraper.page_wait_seconds = args.page_wait
+    scraper.model_delay_seconds = 0
+    scraper.max_pages = args.pages + 1  # One extra page to hit the empty end of the results
+    scraper.enrich_details = args.enrich
+
+    start = time.perf_counter()
+    scraper.run()
+    seconds = time.perf_counter() - start
+
+    df = pd.read_excel(scraper.master_file)
+    return {
+        'seconds': seconds,
+        'rows': len(df),
+        'active_rows': int((df['is_active'] == True).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=3, help='results pages per model')
+    parser.add_argument('--per-page', type=int, default=22)
+    parser.add_argument('--latency', type=float, default=0.0, help='mock server latency per request in seconds')
+    parser.add_argument('--page-wait', type=float, default=0.5, help='scraper wait after each page load')
+    parser.add_argument('--runs', type=int, default=1, help='consecutive runs against the same output root')
+    parser.add_argument('--enrich', action='store_true', help='enable detail page enrichment')
+    parser.add_argument('--fixtures-dir', help='recorded results pages to serve instead of synthetic ones')
+    parser.add_argument('--output-dir', help='output root (default: a temporary directory)')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results', 'e2e_offline.json'))
+    args = parser.parse_args()
+
+    config = MockTradeMeConfig(pages=args.pages, per_page=args.per_page, latency=args.latency, fixtures_dir=args.fixtures_dir)
+    server, base_url = start_server(config)
+
+    runs = []
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = args.output_dir or temp_dir
+            for run_number in range(1, args.runs + 1):
+                requests_before = config.request_count
+                result = run_pipeline(output_dir, base_url, args)
+                result['run'] = run_number
+                result['requests'] = config.request_count - requests_before
+                runs.append(result)
+                print(f"Run {run_number}: {result['seconds']:.2f}s, {result['requests']} requests, "
+                      f"{result['rows']} rows ({result['active_rows']} active)")
+    finally:
+        server.shutdown()
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+            'runs': runs,
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
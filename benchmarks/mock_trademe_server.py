@@ -0,0 +1,168 @@
+"""Local mock of the TradeMe motors search and listing pages.
+
+Serves results pages at /a/motors/cars/<make>/<model>?page=N with the same
+card markup the scraper selects on, and listing detail pages at
+/a/motors/cars/<make>/<model>/listing/<id>. Pages are synthetic and
+deterministic unless a recorded page exists in the fixtures directory
+(named <make>_<model>_page<N>.html), in which case it is served as-is.
+
+    python benchmarks/mock_trademe_server.py --port 8086 --pages 5 --latency 0.2
+    python streamlined_master_scraper.py --output-dir /tmp/carsearch scrape --base-url http://127.0.0.1:8086
+"""
+import argparse
+import html
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_listings import MODELS, generate_results_page
+
+RESULTS_PATH = re.compile(r'^/a/motors/cars/(?P<make>[\w-]+)/(?P<model>[\w-]+)/?$')
+LISTING_PATH = re.compile(r'^/a/motors/cars/(?P<make>[\w-]+)/(?P<model>[\w-]+)/listing/(?P<listing_id>\d+)/?$')
+
+# URL slug -> car model name used by the generator
+MODEL_SLUGS = {(make.lower(), model.lower()): car_model for car_model, (make, model, _) in MODELS.items()}
+
+
+class MockTradeMeConfig:
+    """Settings shared by every request handler"""
+
+    def __init__(self, pages=3, per_page=22, latency=0.0, jitter=0.0, seed=86, fixtures_dir=None):
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.fixtures_dir = fixtures_dir
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+
+def render_results_page(make, model, cards):
+    """Render results page HTML with one anchor-wrapped card per listing"""
+    card_html = []
+    for listing_id, lines in cards:
+        line_html = ''.join(f'<div>{html.escape(line)}</div>' for line in lines)
+        card_html.append(
+            f'<a class="tm-motors-search-card__link" href="/a/motors/cars/{make}/{model}/listing/{listing_id}?bof=mock">'
+            f'<div class="tm-motors-tier-one-search-card__listing-details-container">{line_html}</div></a>'
+        )
+    return (
+        f'<!DOCTYPE html><html><head><title>{make} {model} | Trade Me Motors</title></head>'
+        f'<body><main>{"".join(card_html)}</main></body></html>'
+    )
+
+
+def render_listing_page(listing_id, seed):
+    """Render a detail page with the attribute list the enrichment stage reads"""
+    rng = random.Random(f"{seed}:listing:{listing_id}")
+    transmission = rng.choice(['Manual', 'Automatic'])
+    return (
+        f'<!DOCTYPE html><html><body><h1>Listing #{listing_id}</h1><ul class="tm-motors-listing-attributes">'
+        f'<li><span>Transmission</span><span>{transmission}</span></li>'
+        f'<li><span>Fuel type</span><span>Petrol</span></li>'
+        f'<li><span>Body style</span><span>Coupe</span></li>'
+        f'</ul></body></html>'
+    )
+
+
+class MockTradeMeHandler(BaseHTTPRequestHandler):
+    config = None
+
+    def do_GET(self):
+        config = self.config
+        with config.lock:
+            config.request_count += 1
+
+        # Simulated network and server latency
+        delay = config.latency + random.uniform(0, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        listing_match = LISTING_PATH.match(parsed.path)
+        if listing_match:
+            self.send_html(render_listing_page(listing_match.group('listing_id'), config.seed))
+            return
+
+        results_match = RESULTS_PATH.match(parsed.path)
+        if results_match:
+            make, model = results_match.group('make'), results_match.group('model')
+            try:
+                page = max(int(query.get('page', ['1'])[0]), 1)
+            except ValueError:
+                page = 1
+            self.send_html(self.results_page(make, model, page))
+            return
+
+        self.send_error(404)
+
+    def results_page(self, make, model, page):
+        """Serve a recorded page when one exists, otherwise a synthetic one"""
+        config = self.config
+        if config.fixtures_dir:
+            fixture = os.path.join(config.fixtures_dir, f"{make}_{model}_page{page}.html")
+            if os.path.exists(fixture):
+                with open(fixture, encoding='utf-8') as f:
+                    return f.read()
+
+        car_model = MODEL_SLUGS.get((make, model))
+        if car_model is None or page > config.pages:
+            return render_results_page(make, model, [])
+        return render_results_page(make, model, generate_results_page(car_model, page, config.per_page, config.seed))
+
+    def send_html(self, body):
+        encoded = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """Start the mock server on a background thread and return (server, base_url)"""
+    handler = type('ConfiguredMockTradeMeHandler', (MockTradeMeHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8086)
+    parser.add_argument('--pages', type=int, default=3, help='results pages per model')
+    parser.add_argument('--per-page', type=int, default=22, help='cards per results page')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency up to this many seconds')
+    parser.add_argument('--seed', type=int, default=86)
+    parser.add_argument('--fixtures-dir', help='directory of recorded results pages to serve instead of synthetic ones')
+    args = parser.parse_args()
+
+    config = MockTradeMeConfig(args.pages, args.per_page, args.latency, args.jitter, args.seed, args.fixtures_dir)
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"Mock TradeMe serving on {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Throughput benchmark of the parse, merge and export hot paths.
+
+Times extract_listing_data, generate_search_terms, update_dataset,
+fair_price_score and save_master_dataset against synthetic corpora of 100,
+10k and 100k listings, then appends the results (tagged with the current
+commit) to a JSON file so runs can be compared across commits.
+
+    python benchmarks/parser_benchmark.py
+    python benchmarks/parser_benchmark.py --sizes 100 10000 --skip save_master_dataset
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import pandas as pd
+
+from fair_price import FairPriceModel
+from streamlined_master_scraper import StreamlinedMasterScraper
+from synthetic_listings import generate_cards
+
+BENCHMARKS = ['extract_listing_data', 'generate_search_terms', 'update_dataset', 'fair_price_score', 'save_master_dataset']
+
+
+def current_commit():
+    """Short hash of the checked-out commit, or 'unknown' outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def timed(name, size, func):
+    """Run func once and return a result record"""
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    result = {
+        'benchmark': name,
+        'size': size,
+        'seconds': seconds,
+        'us_per_listing': seconds / size * 1e6,
+        'listings_per_second': size / seconds if seconds else float('inf'),
+    }
+    print(f"{name:>22} n={size:<7} {seconds:9.3f}s  {result['us_per_listing']:10.1f} us/listing")
+    return result
+
+
+def run_size(size, skip):
+    """Run every benchmark for one corpus size"""
+    results = []
+    cards = generate_cards(size)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = StreamlinedMasterScraper(output_dir=output_dir, onedrive_dir=os.path.join(output_dir, 'onedrive'))
+        logging.getLogger().setLevel(logging.WARNING)
+
+        parsed = []
+
+        def parse_all():
+            for car_model, card in cards:
+                parsed.append(scraper.extract_listing_data(card, car_model))
+
+        # Parsing always runs since the later stages need its output
+        result = timed('extract_listing_data', size, parse_all)
+        if 'extract_listing_data' not in skip:
+            results.append(result)
+
+        if 'generate_search_terms' not in skip:
+            def search_terms():
+                for listing in parsed:
+                    scraper.generate_search_terms(listing['title'], listing['location'], listing['year'], listing['brand'], listing['car_model'])
+            results.append(timed('generate_search_terms', size, search_terms))
+
+        history_df = pd.DataFrame(parsed)
+
+        if 'update_dataset' not in skip:
+            # Next scrape: half the history seen again with new prices, plus 10% brand new listings
+            new_data = []
+            for listing in parsed[:size // 2]:
+                relisted = dict(listing)
+                relisted['price'] = '$19,990'
+                new_data.append(relisted)
+            fresh_cards = generate_cards(max(size // 10, 1), seed=87, start_id=4600000000)
+            new_data.extend(scraper.extract_listing_data(card, car_model) for car_model, card in fresh_cards)
+
+            # Time the merge itself rather than reading the history back from xlsx,
+            # and index the history first so relisting detection runs in steady state
+            scraper.load_existing_dataset = lambda: history_df.copy()
+            scraper.link_relistings(history_df.copy())
+            results.append(timed('update_dataset', size, lambda: scraper.update_dataset(new_data)))
+
+        if 'fair_price_score' not in skip:
+            # Fit once on the history, then time vectorized scoring of every listing
+            model = FairPriceModel()
+            model.update(history_df)
+            model.refit()
+            results.append(timed('fair_price_score', size, lambda: model.estimate(history_df)))
+
+        if 'save_master_dataset' not in skip:
+            results.append(timed('save_master_dataset', size, lambda: scraper.save_master_dataset(history_df.copy())))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000])
+    parser.add_argument('--skip', nargs='*', default=[], choices=BENCHMARKS, help='benchmarks to leave out')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results', 'parser_benchmark.json'))
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, set(args.skip)))
+
+    # Append to the history of runs so regressions show up against earlier commits
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            history = json.load(f)
+
+    run = {
+        'commit': current_commit(),
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'results': results,
+    }
+
+    if history:
+        previous = {(r['benchmark'], r['size']): r['seconds'] for r in history[-1]['results']}
+        print(f"\nCompared with {history[-1]['commit']}:")
+        for result in results:
+            before = previous.get((result['benchmark'], result['size']))
+            if before:
+                change = (result['seconds'] - before) / before
+                print(f"{result['benchmark']:>22} n={result['size']:<7} {change:+.1%}")
+
+    history.append(run)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(history, f, indent=2)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Generator of realistic synthetic TradeMe search cards.
+
+Cards mimic the Selenium elements scrape_car_listings hands to
+extract_listing_data: a `.text` block of card lines plus an anchor to the
+listing page. Output is deterministic for a given seed.
+"""
+import random
+
+NZ_LOCATIONS = [
+    ('Auckland City', 'Auckland'), ('North Shore City', 'Auckland'), ('Manukau City', 'Auckland'),
+    ('Waitakere City', 'Auckland'), ('Wellington', 'Wellington'), ('Lower Hutt', 'Wellington'),
+    ('Upper Hutt', 'Wellington'), ('Porirua', 'Wellington'), ('Christchurch City', 'Canterbury'),
+    ('Hamilton', 'Waikato'), ('Tauranga', 'Bay Of Plenty'), ('Rotorua', 'Bay Of Plenty'),
+    ('Dunedin', 'Otago'), ('Palmerston North', 'Manawatu'), ('Napier', "Hawke's Bay"),
+    ('Hastings', "Hawke's Bay"), ('Nelson', 'Nelson Bays'), ('New Plymouth', 'Taranaki'),
+    ('Whangarei', 'Northland'), ('Invercargill', 'Southland'), ('Queenstown', 'Otago'),
+    ('Timaru', 'Canterbury'), ('Gisborne', 'Gisborne'), ('Blenheim', 'Marlborough'),
+]
+
+DEALER_NAMES = [
+    'Cleveland Motors', 'Auckland Car Centre', 'Drive Direct Ltd', 'Southern Auto Traders',
+    'Capital City Cars', 'Waikato Motor Group', 'Bay Autos Limited', 'Turners Cars',
+    'Import Performance NZ', 'JDM Direct Ltd',
+]
+
+MODELS = {
+    'Toyota 86': ('Toyota', '86', ['GT', 'GT Limited', 'G', 'GTS', 'Black Limited', '14R-60']),
+    'Subaru BRZ': ('Subaru', 'BRZ', ['S', 'R', 'tS', 'STI Sport', 'Premium', 'Limited']),
+}
+
+TRANSMISSION_PHRASES = ['Manual', '6M', '6 speed manual', 'Automatic', 'Auto', '6A', '6 speed auto', '']
+ENGINE_PHRASES = ['2.0P', '2.0L', '2.0 P', 'Petrol', '']
+LISTED_PHRASES = [
+    'Listed within the last 7 days', 'Listed yesterday', 'Listed today',
+    'Listed 3 hours ago', 'Listed 45 minutes ago', '',
+]
+
+
+def format_kms(rng, kms):
+    """Render an odometer reading in one of the formats seen on cards"""
+    style = rng.random()
+    if style < 0.05:
+        return rng.choice(['Low kms', 'Super low km'])
+    if style < 0.45:
+        return f"{kms:,}km"
+    if style < 0.75:
+        return f"{kms:,} km"
+    return f"{kms}km"
+
+
+def card_lines(rng, car_model):
+    """Build the text lines of one card"""
+    make, model, trims = MODELS[car_model]
+    year = rng.randint(2012, 2023)
+    age = max(2024 - year, 1)
+    kms = max(int(rng.gauss(14000 * age, 6000 * age)), 900)
+    price = max(int(rng.gauss(42000 - 2600 * age - kms * 0.04, 2500)) // 10 * 10, 3500)
+
+    title_parts = [str(year), make, model, rng.choice(trims), rng.choice(ENGINE_PHRASES), rng.choice(TRANSMISSION_PHRASES)]
+    if rng.random() < 0.2:
+        title_parts.append(rng.choice(['Low kms', 'NZ New', 'One owner', 'Coupe', 'Full service history', 'Rare']))
+    lines = [' '.join(part for part in title_parts if part)]
+
+    suburb, region = rng.choice(NZ_LOCATIONS)
+    lines.append(f"{suburb}, {region}")
+
+    listed = rng.choice(LISTED_PHRASES)
+    if listed:
+        lines.append(listed)
+
+    lines.append(format_kms(rng, kms))
+
+    if rng.random() < 0.25:
+        # Auction phrasing
+        lines.append(rng.choice(['Current bid', 'Starting price', 'Reserve not met', 'No reserve']))
+        lines.append(f"${int(price * rng.uniform(0.6, 0.95)):,}")
+        lines.append(rng.choice([
+            'Ending today', 'Ending tomorrow', f'Ending in {rng.randint(1, 6)} days',
+            f'Ends in {rng.randint(1, 23)} hours', f'Ends {rng.randint(1, 28)} Sep 2025',
+        ]))
+    else:
+        lines.append(rng.choice(['Asking price', 'Buy Now', 'Price by negotiation']))
+        lines.append(f"${price:,}")
+
+    if rng.random() < 0.55:
+        lines.append(rng.choice(DEALER_NAMES))
+
+    return lines
+
+
+class SyntheticAnchor:
+    """Stand-in for the listing anchor WebElement"""
+
+    def __init__(self, href):
+        self.href = href
+
+    def get_attribute(self, name):
+        return self.href if name == 'href' else None
+
+
+class SyntheticCard:
+    """Stand-in for a listing card WebElement"""
+
+    def __init__(self, text, href):
+        self.text = text
+        self.anchor = SyntheticAnchor(href)
+
+    def find_elements(self, by, value):
+        return [self.anchor]
+
+
+def generate_cards(count, seed=86, start_id=4500000000):
+    """Generate `count` synthetic cards as (car_model, card) pairs"""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(count):
+        car_model = rng.choice(list(MODELS))
+        make, model, _ = MODELS[car_model]
+        listing_id = start_id + i
+        href = f"/a/motors/cars/{make.lower()}/{model.lower()}/listing/{listing_id}?bof=synthetic"
+        cards.append((car_model, SyntheticCard('\n'.join(card_lines(rng, car_model)), href)))
+    return cards
+
+
+def generate_results_page(car_model, page, per_page, seed=86, start_id=4500000000):
+    """Generate one newest-first results page as a list of (listing_id, card lines)
+
+    Listing IDs count down across pages, like a results page sorted by most recent.
+    """
+    rng = random.Random(f"{seed}:{car_model}:{page}")
+    model_offset = list(MODELS).index(car_model) * 100000000
+    first_id = start_id + model_offset - (page - 1) * per_page
+    return [(first_id - i, card_lines(rng, car_model)) for i in range(per_page)]
@@ -0,0 +1,215 @@
+import logging
+import os
+from datetime import datetime
+
+# Historical values kept when the new scrape doesn't have them (same rules as update_dataset)
+PRESERVED_COLUMNS = {
+    'year': ('N/A', ''),
+    'price': ('N/A', ''),
+    'kms': ('N/A', ''),
+    'listing_date': ('N/A',),
+    'listing_time': ('N/A',),
+}
+
+# Historical values that always win over the new scrape once they exist
+KEPT_COLUMNS = ['first_seen']
+
+
+class ChunkedHistoryMerger:
+    """Merge a new scrape into an ID-sorted history CSV one chunk at a time
+
+    The history is streamed in `chunk_rows` slices. Each new listing is routed to the
+    chunk whose ID range covers it, so matching rows are updated and new rows inserted
+    in ID order, and every merged chunk is appended to the output as soon as it is
+    done. Peak memory is one history chunk plus the new scrape, whatever the history size.
+    """
+
+    def __init__(self, chunk_rows=50000):
+        self.logger = logging.getLogger(__name__)
+        self.chunk_rows = chunk_rows
+        self.rows_updated = 0
+        self.rows_inserted = 0
+        self.rows_written = 0
+        # IDs whose row changed in the last merge (seen again, inserted or gone inactive) and
+        # fallback IDs whose rows moved to a real listing ID, for incremental consumers
+        self.changed_ids = set()
+        self.rekeyed_ids = set()
+
+    def prepare_new(self, new_data):
+        """Turn the new scrape into a DataFrame sorted by ID"""
+        import pandas as pd
+
+        new_df = pd.DataFrame(new_data)
+        if new_df.empty:
+            # Everything rejected or nothing scraped: still sliced by ID range in merge
+            return pd.DataFrame(columns=['ID'])
+        new_df['ID'] = new_df['ID'].astype(str)
+        new_df = new_df.drop_duplicates(subset=['ID'], keep='first')
+        return new_df.sort_values('ID', kind='mergesort').reset_index(drop=True)
+
+    def read_chunks(self, history_path):
+        """Yield history chunks, checking the file really is sorted by ID"""
+        import pandas as pd
+
+        previous_max = None
+        for chunk in pd.read_csv(history_path, dtype=object, keep_default_na=False, na_values=[''], chunksize=self.chunk_rows):
+            ids = chunk['ID']
+            if not ids.is_monotonic_increasing or (previous_max is not None and ids.iloc[0] <= previous_max):
+                raise ValueError(f"History file is not sorted by ID: {history_path}")
+            previous_max = ids.iloc[-1]
+            chunk['is_active'] = chunk['is_active'].astype(str).str.lower() == 'true'
+            yield chunk
+
+    def adopted_rows(self, history_path, fallback_ids):
+        """History rows saved under a fallback ID whose listing is now keyed by its real ID, re-keyed to it
+
+        fallback_ids maps fallback (content hash) ID -> real listing ID for the new scrape. A
+        row is only adopted when its real ID isn't in the history yet (as in update_dataset).
+        The first pass reads the ID column alone; whole rows are only read when there is
+        something to adopt, which after the first run under real IDs is rare.
+        """
+        import pandas as pd
+
+        empty = pd.DataFrame(columns=['ID'])
+        if not fallback_ids or not os.path.exists(history_path) or os.path.getsize(history_path) == 0:
+            return empty
+
+        candidates = set(fallback_ids) | set(fallback_ids.values())
+        present = set()
+        for chunk in pd.read_csv(history_path, dtype=object, keep_default_na=False, usecols=['ID'], chunksize=self.chunk_rows):
+            present.update(chunk['ID'][chunk['ID'].isin(candidates)])
+        adopt = {old_id: new_id for old_id, new_id in fallback_ids.items() if old_id in present and new_id not in present}
+        if not adopt:
+            return empty
+
+        rows = pd.concat([chunk[chunk['ID'].isin(adopt)] for chunk in self.read_chunks(history_path)], ignore_index=True)
+        for old_id in rows['ID']:
+            self.logger.info(f"Re-keyed listing {old_id} as {adopt[old_id]}")
+        rows['ID'] = rows['ID'].map(adopt)
+        return rows.sort_values('ID', kind='mergesort').reset_index(drop=True)
+
+    def merge_chunk(self, chunk, new_part, swept_models, now):
+        """Merge the new rows that fall in this chunk's ID range"""
+        import pandas as pd
+
+        # Listings of fully swept models that aren't seen again are no longer active
+        if swept_models is None:
+            swept = chunk['is_active'] == True
+        else:
+            swept = (chunk['is_active'] == True) & chunk['car_model'].isin(swept_models or [])
+        if swept.any():
+            self.changed_ids.update(chunk.loc[swept, 'ID'])
+            chunk.loc[swept, 'is_active'] = False
+        self.changed_ids.update(new_part['ID'])
+
+        if new_part.empty:
+            return chunk
+
+        chunk = chunk.set_index('ID')
+        matched = new_part['ID'].isin(chunk.index)
+        updates = new_part[matched].set_index('ID')
+        inserts = new_part[~matched]
+
+        if not updates.empty:
+            # Keep historical values where the new scrape has none
+            for column, missing_values in PRESERVED_COLUMNS.items():
+                if column in updates.columns and column in chunk.columns:
+                    missing = updates[column].isna() | updates[column].astype(str).isin(missing_values)
+                    updates.loc[missing, column] = chunk.loc[updates.index[missing], column]
+            for column in KEPT_COLUMNS:
+                if column in updates.columns and column in chunk.columns:
+                    previous = chunk.loc[updates.index, column]
+                    known = previous.notna() & ~previous.astype(str).isin(['N/A', ''])
+                    updates.loc[known[known].index, column] = previous[known]
+
+            # Only overwrite the columns the new scrape actually has
+            for column in updates.columns:
+                if column not in chunk.columns:
+                    chunk[column] = None
+            chunk.loc[updates.index, updates.columns] = updates
+            chunk.loc[updates.index, 'is_active'] = True
+            chunk.loc[updates.index, 'last_seen'] = now
+            self.rows_updated += len(updates)
+
+        chunk = chunk.reset_index()
+        if not inserts.empty:
+            chunk = pd.concat([chunk, inserts], ignore_index=True).sort_values('ID', kind='mergesort')
+            self.rows_inserted += len(inserts)
+
+        return chunk
+
+    def merge(self, history_path, new_data, output_path, swept_models=None, on_chunk=None, fallback_ids=None):
+        """Stream-merge new_data into the history at history_path, writing the result to output_path
+
+        on_chunk, if given, is called with each merged chunk and returns the rows to write
+        (e.g. after assigning vehicle IDs or dropping archived rows). Rows saved under a
+        fallback ID in fallback_ids are moved to their real listing ID before merging.
+        """
+        import pandas as pd
+
+        new_df = self.prepare_new(new_data)
+        adopted = self.adopted_rows(history_path, fallback_ids)
+        adopted_ids = adopted['ID'].to_numpy()
+        # Each adopted row leaves its old chunk and joins the chunk its real ID sorts into
+        adopted_to = set(adopted_ids)
+        adopted_from = {old_id for old_id, new_id in (fallback_ids or {}).items() if new_id in adopted_to}
+        self.changed_ids = set()
+        self.rekeyed_ids = adopted_from
+        adopted_position = 0
+        new_ids = new_df['ID'].to_numpy() if not new_df.empty else []
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        temp_path = f"{output_path}.tmp"
+        header_written = False
+        columns = None
+        position = 0
+
+        def write(frame):
+            nonlocal header_written, columns
+            if frame.empty:
+                return
+            if columns is None:
+                columns = list(frame.columns)
+            # Columns first seen in a later chunk can't be added to an already written header
+            extra = [column for column in frame.columns if column not in columns]
+            if extra:
+                self.logger.warning(f"Dropping columns missing from the history header: {extra}")
+            frame.reindex(columns=columns).to_csv(f, index=False, header=not header_written)
+            header_written = True
+            self.rows_written += len(frame)
+
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            if os.path.exists(history_path) and os.path.getsize(history_path) > 0:
+                for chunk in self.read_chunks(history_path):
+                    # New listings up to this chunk's last ID belong in this chunk
+                    last_id = chunk['ID'].iloc[-1]
+                    end = position + int((new_ids[position:] <= last_id).sum()) if len(new_ids) else position
+                    if len(adopted_ids):
+                        adopted_end = adopted_position + int((adopted_ids[adopted_position:] <= last_id).sum())
+                        chunk = chunk[~chunk['ID'].isin(adopted_from)]
+                        if adopted_end > adopted_position:
+                            chunk = pd.concat([chunk, adopted.iloc[adopted_position:adopted_end]], ignore_index=True)
+                            chunk = chunk.sort_values('ID', kind='mergesort').reset_index(drop=True)
+                        adopted_position = adopted_end
+                    if columns is None:
+                        columns = list(chunk.columns) + [column for column in new_df.columns if column not in chunk.columns]
+                    merged = self.merge_chunk(chunk, new_df.iloc[position:end], swept_models, now)
+                    position = end
+                    write(on_chunk(merged) if on_chunk else merged)
+
+            # Listings sorting after the last history row
+            remaining = new_df.iloc[position:]
+            adopted_rest = adopted.iloc[adopted_position:]
+            if not adopted_rest.empty:
+                merged = self.merge_chunk(adopted_rest.reset_index(drop=True), remaining, swept_models, now)
+                write(on_chunk(merged) if on_chunk else merged)
+            elif not remaining.empty:
+                self.rows_inserted += len(remaining)
+                self.changed_ids.update(remaining['ID'])
+                write(on_chunk(remaining.copy()) if on_chunk else remaining)
+
+        os.replace(temp_path, output_path)
+        self.logger.info(
+            f"Chunked merge wrote {self.rows_written} rows "
+            f"({self.rows_updated} updated, {self.rows_inserted} inserted) to: {output_path}"
+        )
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+
+# Fields compared as numbers; text fields are matched case-insensitively
+NUMERIC_FIELDS = ['year', 'kms', 'price', 'distance_km', 'expected_price', 'discount_pct']
+OPERATORS = ['between', 'min', 'max', 'equals', 'in', 'not_in', 'contains']
+
+
+class DealRules:
+    """Score listings against rules loaded from a JSON config, a whole column at a time
+
+    Each rule adds its score to every listing matching all of its conditions, e.g.
+
+        {"name": "Sweet spot years", "when": {"year": {"between": [2015, 2016]}}, "score": 60}
+
+    and the total picks the first category whose min_score / max_score it satisfies.
+    Listings missing a value never match a condition on that field.
+    """
+
+    def __init__(self, rules=None, categories=None):
+        self.logger = logging.getLogger(__name__)
+        self.rules = rules or []
+        self.categories = categories or []
+        for rule in self.rules:
+            for field, condition in rule.get('when', {}).items():
+                unknown = [operator for operator in condition if operator not in OPERATORS]
+                if unknown:
+                    raise ValueError(f"Unknown operator {unknown} for '{field}' in rule '{rule.get('name')}'")
+
+    @classmethod
+    def load(cls, config_file):
+        """Load rules from a JSON config; a missing file means no rules"""
+        if not os.path.exists(config_file):
+            logging.getLogger(__name__).warning(f"No deal rules config at {config_file}, listings won't be scored")
+            return cls()
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('rules', []), config.get('categories', []))
+
+    def category_fills(self):
+        """Category name -> highlight colour for the xlsx"""
+        return {category['name']: category['fill'] for category in self.categories if category.get('fill')}
+
+    def field_values(self, df, field):
+        """A column as numbers (numeric fields) or lower-case text, NaN where missing"""
+        import pandas as pd
+
+        if field not in df.columns:
+            return pd.Series(float('nan'), index=df.index)
+        if field in NUMERIC_FIELDS and pd.api.types.is_numeric_dtype(df[field]):
+            return df[field].astype('float64')
+        values = df[field].astype(str).str.strip()
+        values = values.mask(values.isin(['', 'N/A', 'nan', 'None']))
+        if field in NUMERIC_FIELDS:
+            return pd.to_numeric(values.str.replace(r'[$,\s]|km', '', regex=True), errors='coerce')
+        return values.str.lower()
+
+    def condition_mask(self, values, condition):
+        """Rows whose value satisfies every operator of one condition"""
+        import pandas as pd
+
+        mask = values.notna()
+        for operator, expected in condition.items():
+            if operator == 'between':
+                mask &= values.between(expected[0], expected[1])
+            elif operator == 'min':
+                mask &= values >= expected
+            elif operator == 'max':
+                mask &= values <= expected
+            elif operator == 'equals':
+                mask &= values == (expected.lower() if isinstance(expected, str) else expected)
+            elif operator in ('in', 'not_in'):
+                options = [option.lower() if isinstance(option, str) else option for option in expected]
+                matches = values.isin(options)
+                mask &= matches if operator == 'in' else ~matches
+            elif operator == 'contains':
+                options = expected if isinstance(expected, list) else [expected]
+                matches = pd.Series(False, index=values.index)
+                for option in options:
+                    matches |= values.str.contains(option.lower(), regex=False, na=False)
+                mask &= matches
+        return mask
+
+    def score(self, df):
+        """Return df with deal_score and deal_category columns for every row"""
+        import numpy as np
+
+        df = df.copy()
+        scores = np.zeros(len(df), dtype='int64')
+        field_cache = {}
+        for rule in self.rules:
+            mask = np.ones(len(df), dtype=bool)
+            for field, condition in rule.get('when', {}).items():
+                if field not in field_cache:
+                    field_cache[field] = self.field_values(df, field)
+                mask &= self.condition_mask(field_cache[field], condition).to_numpy()
+            scores += np.where(mask, int(rule.get('score', 0)), 0)
+
+        conditions = []
+        for category in self.categories:
+            condition = np.ones(len(df), dtype=bool)
+            if 'min_score' in category:
+                condition &= scores >= category['min_score']
+            if 'max_score' in category:
+                condition &= scores <= category['max_score']
+            conditions.append(condition)
+
+        df['deal_score'] = scores
+        df['deal_category'] = np.select(conditions, [category['name'] for category in self.categories], default='') if conditions else ''
+        return df
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class DetailPageCache:
+    """On-disk TTL cache of parsed listing detail pages, keyed by listing ID"""
+
+    def __init__(self, filepath, ttl_hours=168):
+        self.logger = logging.getLogger(__name__)
+        self.filepath = filepath
+        self.ttl_seconds = ttl_hours * 3600
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        """Load cached entries, dropping any that have expired"""
+        if not os.path.exists(self.filepath):
+            return
+
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading detail page cache: {e}")
+            return
+
+        now = time.time()
+        self.entries = {
+            listing_id: entry for listing_id, entry in entries.items()
+            if now - entry.get('fetched_at', 0) < self.ttl_seconds
+        }
+
+    def get(self, listing_id, fingerprint):
+        """Return cached details if the entry is fresh and the card has not changed since it was fetched"""
+        entry = self.entries.get(listing_id)
+        if not entry:
+            return None
+        if entry.get('fingerprint') != fingerprint:
+            return None
+        if time.time() - entry.get('fetched_at', 0) >= self.ttl_seconds:
+            return None
+        return entry.get('details')
+
+    def put(self, listing_id, fingerprint, details):
+        """Store parsed details for a listing"""
+        self.entries[listing_id] = {'fingerprint': fingerprint, 'fetched_at': time.time(), 'details': details}
+
+    def save(self):
+        """Write the cache atomically so an interrupted run never leaves a truncated file"""
+        temp_path = f"{self.filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.filepath)
+
+
+class DetailEnricher:
+    """Fetch listing detail pages concurrently to fill fields the search card does not show"""
+
+    # Detail page attribute labels and the listing field they fill
+    ATTRIBUTE_PATTERNS = {
+        'transmission': r'Transmission\s*:?\s*(Manual|Automatic|Auto|CVT|Tiptronic|Semi-auto)',
+        'fuel_type': r'Fuel type\s*:?\s*(Petrol|Diesel|Hybrid|Plug-in hybrid|Electric|LPG)',
+        'body_style': r'Body style\s*:?\s*(Coupe|Sedan|Hatchback|Wagon|Station wagon|SUV|Convertible|Ute|Van)',
+    }
+
+    # Normalise detail page wording to the values extract_listing_data produces
+    VALUE_MAP = {
+        'auto': 'Automatic',
+        'cvt': 'CVT',
+        'tiptronic': 'Automatic',
+        'semi-auto': 'Automatic',
+        'station wagon': 'Wagon',
+        'plug-in hybrid': 'Hybrid',
+    }
+
+    def __init__(self, cache_file, ttl_hours=168, max_workers=4, timeout=15, breaker=None):
+        self.logger = logging.getLogger(__name__)
+        self.cache = DetailPageCache(cache_file, ttl_hours)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Optional resilience.CircuitBreaker shared with the results page scraper
+        self.breaker = breaker
+        self.headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'}
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fetch_failures = 0
+        self.fetch_latencies = []
+
+    def fingerprint(self, listing):
+        """Fingerprint the card fields that change when a seller edits a listing"""
+        card_values = '|'.join(str(listing.get(field, '')) for field in ('title', 'price', 'kms', 'location'))
+        return hashlib.md5(card_values.encode()).hexdigest()
+
+    def parse_details(self, html):
+        """Pull the vehicle attributes out of a detail page"""
+        # Collapse the markup to text so labels and values sit next to each other
+        text = re.sub(r'<(script|style)[^>]*>.*?</\1>', ' ', html, flags=re.IGNORECASE | re.DOTALL)
+        text = re.sub(r'<[^>]+>', ' ', text)
+        text = re.sub(r'\s+', ' ', text)
+
+        details = {}
+        for field, pattern in self.ATTRIBUTE_PATTERNS.items():
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                value = match.group(1)
+                details[field] = self.VALUE_MAP.get(value.lower(), value.capitalize())
+        return details
+
+    def fetch_details(self, url):
+        """Fetch and parse a detail page, returning (details, seconds taken)"""
+        start = time.perf_counter()
+        if self.breaker is not None:
+            self.breaker.check(url)
+        try:
+            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.failure(url)
+            raise
+        if self.breaker is not None:
+            self.breaker.success(url)
+        details = self.parse_details(response.text)
+        return details, time.perf_counter() - start
+
+    def enrich(self, listings):
+        """Fill transmission, fuel type and body style from detail pages for new or changed listings"""
+        to_fetch = {}
+
+        for listing in listings:
+            listing_id = listing.get('ID')
+            listing_url = listing.get('listing_url', 'N/A')
+            if not listing_url or listing_url == 'N/A':
+                continue
+
+            fingerprint = self.fingerprint(listing)
+            details = self.cache.get(listing_id, fingerprint)
+            if details is not None:
+                self.cache_hits += 1
+                self.apply_details(listing, details)
+            else:
+                self.cache_misses += 1
+                to_fetch[listing_id] = (listing, fingerprint)
+
+        if to_fetch:
+            self.logger.info(f"Fetching {len(to_fetch)} listing detail pages with {self.max_workers} workers")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self.fetch_details, listing['listing_url']): listing_id
+                    for listing_id, (listing, _) in to_fetch.items()
+                }
+                for future in as_completed(futures):
+                    listing_id = futures[future]
+                    listing, fingerprint = to_fetch[listing_id]
+                    try:
+                        details, latency = future.result()
+                    except Exception as e:
+                        self.fetch_failures += 1
+                        self.logger.error(f"Error fetching details for {listing_id}: {e}")
+                        continue
+
+                    self.fetch_latencies.append(latency)
+                    self.cache.put(listing_id, fingerprint, details)
+                    self.apply_details(listing, details)
+
+        try:
+            self.cache.save()
+        except Exception as e:
+            self.logger.error(f"Error saving detail page cache: {e}")
+
+        self.log_report()
+        return listings
+
+    def apply_details(self, listing, details):
+        """Overwrite card-derived guesses with detail page values"""
+        for field, value in details.items():
+            if value:
+                listing[field] = value
+
+    def report(self):
+        """Cache hit rate and fetch latency percentiles for this run"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': self.cache_hits / lookups if lookups else 0.0,
+            'fetches': len(self.fetch_latencies),
+            'fetch_failures': self.fetch_failures,
+            'fetch_latency_p50': percentile(self.fetch_latencies, 50),
+            'fetch_latency_p90': percentile(self.fetch_latencies, 90),
+            'fetch_latency_p99': percentile(self.fetch_latencies, 99),
+        }
+
+    def log_report(self):
+        """Log the enrichment report"""
+        report = self.report()
+        self.logger.info(
+            f"Detail enrichment: cache hit rate {report['cache_hit_rate']:.1%} "
+            f"({report['cache_hits']} hits, {report['cache_misses']} misses), "
+            f"{report['fetches']} fetched, {report['fetch_failures']} failed, "
+            f"latency p50 {report['fetch_latency_p50']:.2f}s p90 {report['fetch_latency_p90']:.2f}s "
+            f"p99 {report['fetch_latency_p99']:.2f}s"
+        )
@@ -0,0 +1,143 @@
+import logging
+import os
+import shutil
+
+# Columns exported as numbers; everything else is written as text
+NUMERIC_COLUMNS = ['year', 'kms', 'price', 'distance_km', 'expected_price', 'discount_pct', 'deal_score']
+BOOLEAN_COLUMNS = ['is_auction', 'is_dealer', 'is_active']
+
+EXPORT_FORMATS = ['csv', 'jsonl', 'parquet']
+
+
+class StreamingExporter:
+    """Write the dataset to CSV, JSON Lines and hive-partitioned Parquet in fixed-size chunks
+
+    Every target is written to a temporary path and swapped in when complete, so
+    readers never see a half-written export.
+    """
+
+    def __init__(self, export_dir, chunk_rows=50000):
+        self.logger = logging.getLogger(__name__)
+        self.export_dir = export_dir
+        self.chunk_rows = chunk_rows
+        os.makedirs(self.export_dir, exist_ok=True)
+
+    def chunks(self, df):
+        """Yield consecutive row slices of the dataset"""
+        for start in range(0, len(df), self.chunk_rows):
+            yield df.iloc[start:start + self.chunk_rows]
+
+    def target_path(self, fmt):
+        """Path of an export target"""
+        names = {'csv': '86_BRZ_dataset.csv', 'jsonl': '86_BRZ_dataset.jsonl', 'parquet': '86_BRZ_dataset.parquet'}
+        return os.path.join(self.export_dir, names[fmt])
+
+    def export(self, df, fmt):
+        """Write one export format and return its path"""
+        if fmt == 'csv':
+            return self.export_csv(df)
+        if fmt == 'jsonl':
+            return self.export_jsonl(df)
+        if fmt == 'parquet':
+            return self.export_parquet(df)
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    def export_csv(self, df):
+        """Stream the dataset to CSV"""
+        filepath = self.target_path('csv')
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            for i, chunk in enumerate(self.chunks(df)):
+                chunk.to_csv(f, index=False, header=(i == 0))
+        os.replace(temp_path, filepath)
+        return filepath
+
+    def export_jsonl(self, df):
+        """Stream the dataset to JSON Lines, one listing per line"""
+        filepath = self.target_path('jsonl')
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for chunk in self.chunks(df):
+                records = self.typed_chunk(chunk).to_json(orient='records', lines=True, date_format='iso')
+                f.write(records if records.endswith('\n') else records + '\n')
+        os.replace(temp_path, filepath)
+        return filepath
+
+    def export_parquet(self, df):
+        """Stream the dataset to Parquet partitioned by scrape_date and car_model"""
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+        dataset_dir = self.target_path('parquet')
+        temp_dir = f"{dataset_dir}.tmp"
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+
+        # Types are fixed up front from the column names, not inferred from the first chunk's values,
+        # so a text column that happens to be empty in one chunk can't become a null column
+        schema = self.arrow_schema(df.columns)
+
+        def batches():
+            for chunk in self.chunks(df):
+                yield pa.RecordBatch.from_pandas(self.typed_chunk(chunk), schema=schema, preserve_index=False)
+
+        reader = pa.RecordBatchReader.from_batches(schema, batches())
+        ds.write_dataset(
+            reader, temp_dir, format='parquet',
+            partitioning=['scrape_date', 'car_model'], partitioning_flavor='hive',
+            max_rows_per_group=self.chunk_rows
+        )
+
+        # Swap the finished dataset in place of the previous export
+        if os.path.exists(dataset_dir):
+            old_dir = f"{dataset_dir}.old"
+            os.replace(dataset_dir, old_dir)
+            os.replace(temp_dir, dataset_dir)
+            shutil.rmtree(old_dir)
+        else:
+            os.replace(temp_dir, dataset_dir)
+        return dataset_dir
+
+    def arrow_schema(self, columns):
+        """Arrow schema matching typed_chunk: float64 numbers, booleans and nullable strings"""
+        import pyarrow as pa
+
+        fields = []
+        for column in columns:
+            if column in NUMERIC_COLUMNS:
+                fields.append(pa.field(column, pa.float64()))
+            elif column in BOOLEAN_COLUMNS:
+                fields.append(pa.field(column, pa.bool_()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        return pa.schema(fields)
+
+    def typed_chunk(self, chunk):
+        """Give a chunk consistent column types: numbers, booleans and nullable text"""
+        import pandas as pd
+
+        typed = chunk.copy()
+        for column in typed.columns:
+            if column in NUMERIC_COLUMNS:
+                typed[column] = pd.to_numeric(typed[column], errors='coerce').astype('float64')
+            elif column in BOOLEAN_COLUMNS:
+                typed[column] = typed[column].map(lambda value: str(value).lower() == 'true').astype('bool')
+            else:
+                typed[column] = typed[column].map(lambda value: None if pd.isna(value) else str(value)).astype('object')
+        return typed
+
+
+def read_parquet_slice(dataset_dir, scrape_date=None, car_model=None, columns=None):
+    """Read just one scrape date and/or car model from the partitioned Parquet export"""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning='hive')
+    filters = None
+    for field, value in (('scrape_date', scrape_date), ('car_model', car_model)):
+        if value is not None:
+            condition = ds.field(field) == value
+            filters = condition if filters is None else filters & condition
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()
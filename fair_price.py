@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+
+# Design matrix columns; prices are modelled in logs so depreciation is a percentage per year / 10k km
+FEATURES = ['intercept', 'model_year', 'kms_10k', 'manual', 'automatic', 'dealer', 'brz']
+
+# Asking prices outside this range are typos or parts cars and stay out of the fit
+FIT_PRICE_RANGE = (2000, 150000)
+
+
+def numeric_column(frame, column):
+    """A column as float64, stripping $, commas and 'km'; NaN where missing or unparseable"""
+    import numpy as np
+    import pandas as pd
+
+    if column not in frame.columns:
+        return pd.Series(float('nan'), index=frame.index)
+    values = frame[column]
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+
+    # Prices and years repeat a lot, so parse each distinct value once
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_numeric(pd.Series(uniques, dtype=object).astype(str).str.replace(r'[$,\s]|km', '', regex=True), errors='coerce').to_numpy(dtype='float64')
+    return pd.Series(np.where(codes >= 0, parsed[codes], np.nan), index=frame.index)
+
+
+def text_column(frame, column):
+    """A column as lower-case text with missing values as ''"""
+    import pandas as pd
+
+    if column not in frame.columns:
+        return pd.Series('', index=frame.index)
+    return frame[column].fillna('').astype(str).str.lower()
+
+
+def auction_mask(frame):
+    """True for auction listings, whose card price is the current bid rather than an asking price"""
+    import numpy as np
+
+    if 'is_auction' not in frame.columns:
+        return np.zeros(len(frame), dtype=bool)
+    return (frame['is_auction'].astype(str).str.lower() == 'true').to_numpy()
+
+
+class FairPriceModel:
+    """Log-linear fair-price model fitted by least squares over accumulated normal equations
+
+    Every listing contributes its first valid price once: its feature row x adds x'x and
+    x'y to running sums, so refitting after a run only costs the new rows plus one small
+    solve, and the sums persist between runs. Auctions are left out of both the fit and
+    the estimates, since a current bid says little about what the car is worth.
+    """
+
+    def __init__(self, ridge=1e-3):
+        import numpy as np
+
+        self.logger = logging.getLogger(__name__)
+        self.ridge = ridge
+        size = len(FEATURES)
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.count = 0
+        self.coefficients = None
+        self.fitted_ids = set()
+
+    def design_matrix(self, frame):
+        """Feature matrix for every row and a mask of rows that have the features"""
+        import numpy as np
+
+        year = numeric_column(frame, 'year').to_numpy()
+        kms = numeric_column(frame, 'kms').to_numpy()
+        transmission = text_column(frame, 'transmission')
+        seller_type = text_column(frame, 'seller_type')
+        car_model = text_column(frame, 'car_model')
+
+        X = np.empty((len(frame), len(FEATURES)))
+        X[:, 0] = 1.0
+        X[:, 1] = year - 2012
+        X[:, 2] = kms / 10000
+        X[:, 3] = (transmission == 'manual').to_numpy()
+        X[:, 4] = transmission.isin(['automatic', 'cvt']).to_numpy()
+        X[:, 5] = (seller_type == 'dealer').to_numpy()
+        X[:, 6] = car_model.str.contains('brz', regex=False).to_numpy()
+        valid = ~np.isnan(year) & ~np.isnan(kms) & (kms >= 0)
+        return X, valid
+
+    def update(self, frame):
+        """Add listings not fitted before to the normal equations; returns how many were added"""
+        import numpy as np
+
+        if frame.empty:
+            return 0
+
+        X, valid = self.design_matrix(frame)
+        price = numeric_column(frame, 'price').to_numpy()
+        ids = frame['ID'].astype(str).to_numpy()
+        unseen = np.fromiter((listing_id not in self.fitted_ids for listing_id in ids), dtype=bool, count=len(ids))
+        usable = valid & unseen & ~auction_mask(frame) & (price >= FIT_PRICE_RANGE[0]) & (price <= FIT_PRICE_RANGE[1])
+        if not usable.any():
+            return 0
+
+        X_new = X[usable]
+        y_new = np.log(price[usable])
+        self.xtx += X_new.T @ X_new
+        self.xty += X_new.T @ y_new
+        self.count += int(usable.sum())
+        self.fitted_ids.update(ids[usable])
+        return int(usable.sum())
+
+    def refit(self):
+        """Solve the accumulated normal equations; needs a few listings per feature first"""
+        import numpy as np
+
+        if self.count < 3 * len(FEATURES):
+            self.logger.info(f"Fair-price model needs {3 * len(FEATURES)} priced listings, have {self.count}")
+            return False
+
+        # A small ridge keeps the solve stable when a feature hasn't varied yet (e.g. no dealers)
+        regulariser = self.ridge * np.eye(len(FEATURES))
+        regulariser[0, 0] = 0
+        self.coefficients = np.linalg.lstsq(self.xtx + regulariser, self.xty, rcond=None)[0]
+        return True
+
+    def estimate(self, frame):
+        """Return frame with expected_price and discount_pct filled for active, non-auction listings"""
+        import numpy as np
+
+        frame = frame.copy()
+        if self.coefficients is None or frame.empty:
+            return frame
+
+        X, valid = self.design_matrix(frame)
+        if 'is_active' in frame.columns:
+            valid &= (frame['is_active'].astype(str).str.lower() == 'true').to_numpy()
+        valid &= ~auction_mask(frame)
+        expected = np.where(valid, np.exp(X @ self.coefficients), np.nan)
+        price = numeric_column(frame, 'price').to_numpy()
+
+        frame['expected_price'] = np.round(expected)
+        frame['discount_pct'] = np.round((expected - price) / expected * 100, 1)
+        return frame
+
+    def save(self, filepath):
+        """Persist the normal equations, coefficients and fitted listing IDs"""
+        state = {
+            'features': FEATURES,
+            'xtx': self.xtx.tolist(),
+            'xty': self.xty.tolist(),
+            'count': self.count,
+            'coefficients': None if self.coefficients is None else self.coefficients.tolist(),
+            'fitted_ids': sorted(self.fitted_ids),
+        }
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, filepath)
+
+    def load(self, filepath):
+        """Load a persisted model, ignoring ones built with different features"""
+        import numpy as np
+
+        if not os.path.exists(filepath):
+            return False
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading fair-price model: {e}")
+            return False
+
+        if state.get('features') != FEATURES:
+            self.logger.info("Fair-price model was built with different features, refitting from scratch")
+            return False
+
+        self.xtx = np.array(state['xtx'])
+        self.xty = np.array(state['xty'])
+        self.count = state['count']
+        self.coefficients = None if state['coefficients'] is None else np.array(state['coefficients'])
+        self.fitted_ids = set(state['fitted_ids'])
+        return True
@@ -0,0 +1,127 @@
+import csv
+import logging
+import re
+import unicodedata
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def normalize_place(text):
+    """Lower-case place name without macrons, apostrophes, extra spaces or a trailing 'City'"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    text = re.sub(r"['’]", '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(r' city$', '', text)
+
+
+def haversine_km(lat, lon, home_lat, home_lon):
+    """Great-circle distance in km from arrays of coordinates to one point; NaN where unknown"""
+    import numpy as np
+
+    lat, lon = np.radians(np.asarray(lat, dtype='float64')), np.radians(np.asarray(lon, dtype='float64'))
+    home_lat, home_lon = np.radians(home_lat), np.radians(home_lon)
+    a = np.sin((lat - home_lat) / 2) ** 2 + np.cos(lat) * np.cos(home_lat) * np.sin((lon - home_lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class Gazetteer:
+    """NZ towns and regions with coordinates, indexed by every normalized name and alias
+
+    A card's location line such as "Auckland City, Auckland" or "Nelson, Nelson Bays"
+    resolves part by part: a town before the final (region) part gives the town and its
+    region, otherwise a region name gives the region alone. Distances use the town's coordinates, or the
+    region's main centre when only the region is known.
+    """
+
+    def __init__(self, places=None):
+        self.logger = logging.getLogger(__name__)
+        # normalized name -> place dict, kept apart so a town always wins over a region of the same name
+        self.towns = {}
+        self.regions = {}
+        # town name / region code -> (lat, lon)
+        self.coordinates = {}
+        for place in places or []:
+            self.add(place)
+
+    @classmethod
+    def load(cls, csv_file):
+        """Load the bundled gazetteer CSV (kind, name, region, region_code, lat, lon, aliases)"""
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            return cls(list(csv.DictReader(f)))
+
+    def add(self, place):
+        place = dict(place, lat=float(place['lat']), lon=float(place['lon']))
+        names = [place['name']] + [alias for alias in (place.get('aliases') or '').split('|') if alias]
+        target = self.towns if place['kind'] == 'town' else self.regions
+        for name in names:
+            target.setdefault(normalize_place(name), place)
+        if place['kind'] == 'town':
+            self.coordinates[place['name']] = (place['lat'], place['lon'])
+        else:
+            # The first row of a region code is its main centre
+            self.coordinates.setdefault(place['region_code'], (place['lat'], place['lon']))
+
+    def resolve(self, text):
+        """{'town', 'region', 'region_code'} for a location line, or None when nothing in it is a known place"""
+        if not text or not isinstance(text, str):
+            return None
+        parts = [normalize_place(part) for part in text.split(',')]
+        # "Suburb, Region": the last part names the region, so "Ellerslie, Auckland" is not Auckland the town
+        town_parts = parts[:-1] if len(parts) > 1 else parts
+        for part in town_parts:
+            town = self.towns.get(part)
+            if town is not None:
+                return {'town': town['name'], 'region': town['region'], 'region_code': town['region_code']}
+        for part in reversed(parts):
+            region = self.regions.get(part)
+            if region is not None:
+                return {'town': 'N/A', 'region': region['region'], 'region_code': region['region_code']}
+        return None
+
+    def home(self, value):
+        """(lat, lon) of a home location given as a place name or 'lat,lon'"""
+        match = re.fullmatch(r'\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*', str(value))
+        if match:
+            return float(match.group(1)), float(match.group(2))
+        resolved = self.resolve(value)
+        if resolved is None:
+            raise ValueError(f"Unknown home location: {value}")
+        if resolved['town'] != 'N/A':
+            return self.coordinates[resolved['town']]
+        return self.coordinates[resolved['region_code']]
+
+    def locate(self, frame):
+        """Return frame with town / region / region_code filled from location where they are missing"""
+        frame = frame.copy()
+        columns = ['town', 'region', 'region_code']
+        for column in columns:
+            if column not in frame.columns:
+                frame[column] = 'N/A'
+        if 'location' not in frame.columns or frame.empty:
+            return frame
+
+        missing = frame['region_code'].isna() | frame['region_code'].astype(str).isin(['', 'N/A', 'nan'])
+        if missing.any():
+            # Locations repeat a lot, so resolve each distinct line once
+            resolved = {location: self.resolve(location) for location in frame.loc[missing, 'location'].unique()}
+            for column in columns:
+                lookup = {location: place[column] for location, place in resolved.items() if place is not None}
+                frame.loc[missing, column] = frame.loc[missing, 'location'].map(lookup).fillna('N/A')
+        return frame
+
+    def distance_km(self, frame, home):
+        """Distance from home for every row, by town or else region centre; NaN when neither is known"""
+        import numpy as np
+        import pandas as pd
+
+        if frame.empty:
+            return pd.Series(dtype='float64', index=frame.index)
+        town = frame['town'].astype(str) if 'town' in frame.columns else pd.Series('N/A', index=frame.index)
+        region_code = frame['region_code'].astype(str) if 'region_code' in frame.columns else pd.Series('N/A', index=frame.index)
+        key = town.where(town.isin(list(self.coordinates)), region_code)
+
+        latitudes = {name: coordinates[0] for name, coordinates in self.coordinates.items()}
+        longitudes = {name: coordinates[1] for name, coordinates in self.coordinates.items()}
+        distance = haversine_km(key.map(latitudes).to_numpy(dtype='float64'), key.map(longitudes).to_numpy(dtype='float64'), *home)
+        return pd.Series(np.round(distance, 1), index=frame.index)
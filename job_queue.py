@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Job states; a run is finished once every job is done, skipped or failed
+PENDING, LEASED, DONE, SKIPPED, FAILED = 'pending', 'leased', 'done', 'skipped', 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    max_pages INTEGER NOT NULL,
+    marketplace TEXT NOT NULL DEFAULT 'trademe',
+    base_url TEXT,
+    merge_state TEXT NOT NULL DEFAULT 'open'
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    car_model TEXT NOT NULL,
+    url TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result_file TEXT,
+    listings INTEGER,
+    error TEXT,
+    UNIQUE (run_id, car_model, page)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (run_id, status, lease_expires);
+"""
+
+
+class JobQueue:
+    """SQLite job queue with one job per car model and results page
+
+    Workers claim a job by taking a time-limited lease inside an immediate transaction,
+    so two workers never hold the same job. A worker that dies simply lets its lease
+    expire and the job is handed out again, up to max_attempts. Every job writes its
+    own result file, and one process merges a finished run, so workers never contend
+    for the dataset itself.
+
+    SQLite's locking needs a filesystem with working POSIX locks (local disks, SMB and
+    most modern NFS setups); the database uses the rollback journal rather than WAL
+    because WAL needs shared memory that network filesystems don't provide.
+    """
+
+    def __init__(self, db_path, lease_seconds=300, max_attempts=3):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            # Queues created before runs recorded their site scraped TradeMe
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(runs)')}
+            if 'marketplace' not in columns:
+                conn.execute("ALTER TABLE runs ADD COLUMN marketplace TEXT NOT NULL DEFAULT 'trademe'")
+                conn.execute('ALTER TABLE runs ADD COLUMN base_url TEXT')
+
+    @contextmanager
+    def connect(self):
+        """Open a connection, rolling back a half-done transaction on error and always closing it"""
+        # isolation_level=None leaves transactions to the explicit BEGIN IMMEDIATE below
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def transaction(self, conn):
+        """Start a write transaction straight away so concurrent claims serialise on the lock"""
+        conn.execute('BEGIN IMMEDIATE')
+
+    def enqueue(self, urls, max_pages, marketplace='trademe', base_url=None):
+        """Create a run with one job per (model, page) and return its ID"""
+        run_id = datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        with self.connect() as conn:
+            self.transaction(conn)
+            conn.execute(
+                'INSERT INTO runs (run_id, created_at, max_pages, marketplace, base_url) VALUES (?, ?, ?, ?, ?)',
+                (run_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), max_pages, marketplace, base_url)
+            )
+            conn.executemany(
+                'INSERT INTO jobs (run_id, car_model, url, page) VALUES (?, ?, ?, ?)',
+                [(run_id, car_model, url, page) for car_model, url in urls.items() for page in range(1, max_pages + 1)]
+            )
+            conn.execute('COMMIT')
+        return run_id
+
+    def latest_run(self):
+        """The most recently created run ID, or None"""
+        with self.connect() as conn:
+            row = conn.execute('SELECT run_id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT 1').fetchone()
+        return row['run_id'] if row else None
+
+    def run_info(self, run_id):
+        """The run's row (marketplace, base URL, merge state), or None"""
+        with self.connect() as conn:
+            row = conn.execute('SELECT * FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, run_id, worker):
+        """Lease the next pending (or lease-expired) job, lowest pages first; None when there is none"""
+        now = time.time()
+        with self.connect() as conn:
+            self.transaction(conn)
+            row = conn.execute(
+                '''SELECT * FROM jobs
+                   WHERE run_id = ? AND attempts < ?
+                     AND (status = ? OR (status = ? AND lease_expires < ?))
+                   ORDER BY page, job_id LIMIT 1''',
+                (run_id, self.max_attempts, PENDING, LEASED, now)
+            ).fetchone()
+            if row is None:
+                # Expired leases that have used up their attempts are failures, not work
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ? WHERE run_id = ? AND status = ? AND lease_expires < ? AND attempts >= ?',
+                    (FAILED, 'lease expired on final attempt', run_id, LEASED, now, self.max_attempts)
+                )
+                conn.execute('COMMIT')
+                return None
+
+            if row['status'] == LEASED:
+                self.logger.warning(f"Lease of job {row['job_id']} held by {row['worker']} expired, retrying")
+            conn.execute(
+                'UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE job_id = ?',
+                (LEASED, worker, now + self.lease_seconds, row['job_id'])
+            )
+            conn.execute('COMMIT')
+        return dict(row, attempts=row['attempts'] + 1, worker=worker)
+
+    def complete(self, job, worker, result_file, listings, last_page=False):
+        """Record a finished job; on the model's last page, skip the pages after it
+
+        result_file should be relative to the job results folder, which each machine may
+        mount at a different path; the merging process resolves it against its own.
+        Returns False when the lease was lost to another worker, whose result then stands.
+        """
+        with self.connect() as conn:
+            self.transaction(conn)
+            updated = conn.execute(
+                'UPDATE jobs SET status = ?, result_file = ?, listings = ?, lease_expires = NULL, error = NULL '
+                'WHERE job_id = ? AND worker = ? AND status = ?',
+                (DONE, result_file, listings, job['job_id'], worker, LEASED)
+            ).rowcount
+            if updated and last_page:
+                conn.execute(
+                    'UPDATE jobs SET status = ? WHERE run_id = ? AND car_model = ? AND page > ? AND status IN (?, ?)',
+                    (SKIPPED, job['run_id'], job['car_model'], job['page'], PENDING, LEASED)
+                )
+            conn.execute('COMMIT')
+        return bool(updated)
+
+    def fail(self, job, worker, error):
+        """Release a job after an error; it is retried until it runs out of attempts"""
+        with self.connect() as conn:
+            self.transaction(conn)
+            status = FAILED if job['attempts'] >= self.max_attempts else PENDING
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, lease_expires = NULL WHERE job_id = ? AND worker = ? AND status = ?',
+                (status, str(error)[:500], job['job_id'], worker, LEASED)
+            )
+            conn.execute('COMMIT')
+
+    def release(self, job, worker, reason=None):
+        """Hand a job back untried, refunding the attempt its claim used
+
+        Only for a job that made no request (e.g. the site's circuit was already open when
+        it was claimed); a job whose own requests failed goes through fail() and is charged.
+        """
+        with self.connect() as conn:
+            self.transaction(conn)
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, attempts = MAX(attempts - 1, 0) '
+                'WHERE job_id = ? AND worker = ? AND status = ?',
+                (PENDING, str(reason)[:500] if reason else None, job['job_id'], worker, LEASED)
+            )
+            conn.execute('COMMIT')
+
+    def has_live_leases(self, run_id):
+        """Whether any job is still leased to a worker that may finish it"""
+        with self.connect() as conn:
+            row = conn.execute(
+                'SELECT COUNT(*) AS n FROM jobs WHERE run_id = ? AND status = ? AND lease_expires >= ?',
+                (run_id, LEASED, time.time())
+            ).fetchone()
+        return row['n'] > 0
+
+    def status_counts(self, run_id):
+        """{status: count} for a run"""
+        with self.connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM jobs WHERE run_id = ? GROUP BY status', (run_id,)).fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def is_finished(self, run_id):
+        counts = self.status_counts(run_id)
+        return bool(counts) and not counts.get(PENDING) and not counts.get(LEASED)
+
+    def jobs(self, run_id):
+        with self.connect() as conn:
+            return [dict(row) for row in conn.execute('SELECT * FROM jobs WHERE run_id = ? ORDER BY car_model, page', (run_id,))]
+
+    def claim_merge(self, run_id):
+        """Let exactly one process merge a finished run"""
+        with self.connect() as conn:
+            self.transaction(conn)
+            updated = conn.execute(
+                "UPDATE runs SET merge_state = 'merging' WHERE run_id = ? AND merge_state = 'open'", (run_id,)
+            ).rowcount
+            conn.execute('COMMIT')
+        return bool(updated)
+
+    def finish_merge(self, run_id, merged=True):
+        """Mark the run merged, or reopen it for another attempt"""
+        with self.connect() as conn:
+            conn.execute('UPDATE runs SET merge_state = ? WHERE run_id = ?', ('merged' if merged else 'open', run_id))
+
+
+def write_job_result(filepath, listings):
+    """Write one job's parsed listings as JSON Lines, atomically"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    temp_path = f"{filepath}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for listing in listings:
+            f.write(json.dumps(listing, default=str) + '\n')
+    os.replace(temp_path, filepath)
+
+
+def read_job_result(filepath):
+    """Read the listings a job wrote"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
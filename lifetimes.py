@@ -0,0 +1,223 @@
+import logging
+import os
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Listing attributes kept beside each interval for filtering
+ATTRIBUTES = ['car_model', 'year', 'transmission', 'region_code']
+COLUMNS = ['ID', 'first_seen', 'last_seen', 'is_active'] + ATTRIBUTES
+# In memory the interval is int64 seconds since the epoch
+INDEX_COLUMNS = ['ID', 'start', 'end', 'is_active'] + ATTRIBUTES
+
+
+def parse_timestamps(values):
+    """Timestamps as datetime64, NaT where missing or unparseable"""
+    import pandas as pd
+
+    text = pd.Series(values).astype(str).replace({'N/A': None, 'nan': None, 'NaT': None, '': None})
+    # Most values are in the dataset's own format; only the rest pay for format inference
+    parsed = pd.to_datetime(text, errors='coerce', format=TIMESTAMP_FORMAT)
+    retry = parsed.isna() & text.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(text[retry], errors='coerce', format='mixed')
+    return parsed
+
+
+def fill_first_seen(frame):
+    """Return frame with first_seen filled where missing
+
+    Rows saved before first_seen existed fall back to their listing date, then the
+    scrape they were last written by, and never later than last_seen.
+    """
+    import pandas as pd
+
+    frame = frame.copy()
+    if 'first_seen' not in frame.columns:
+        frame['first_seen'] = None
+    first_seen = parse_timestamps(frame['first_seen']).to_numpy()
+    if not pd.isna(first_seen).any():
+        return frame
+
+    fallbacks = []
+    if 'listing_date' in frame.columns:
+        fallbacks.append(parse_timestamps(frame['listing_date']))
+    if 'scrape_date' in frame.columns:
+        scrape_time = frame['scrape_time'].astype(str) if 'scrape_time' in frame.columns else ''
+        fallbacks.append(parse_timestamps(frame['scrape_date'].astype(str) + ' ' + scrape_time))
+    last_seen = parse_timestamps(frame['last_seen']) if 'last_seen' in frame.columns else pd.Series(pd.NaT, index=range(len(frame)))
+    fallbacks.append(last_seen)
+
+    filled = pd.Series(first_seen)
+    for fallback in fallbacks:
+        filled = filled.fillna(fallback.reset_index(drop=True))
+    filled = filled.where(~(filled > last_seen.reset_index(drop=True)), last_seen.reset_index(drop=True))
+    frame['first_seen'] = filled.dt.strftime(TIMESTAMP_FORMAT).where(filled.notna(), 'N/A').to_numpy()
+    return frame
+
+
+class LifetimeIndex:
+    """First-seen / last-seen interval per listing ID across the full history
+
+    Intervals are kept as int64 seconds in two sorted arrays, starts and ends, so
+    "how many listings were live at t" is two binary searches (starts <= t minus
+    ends < t) and listing-level point queries only scan the rows that started by t.
+    Archived listings stay in the index, so time-to-sale covers everything ever seen.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.frame = None
+        self.pending = []
+        self.starts = None
+        self.ends_sorted = None
+        # attribute -> (integer code per row, {normalized value: code}), for filters without string work
+        self.codes = {}
+
+    def update(self, frame):
+        """Queue a merged frame's intervals; first_seen only moves back and last_seen only forward"""
+        if frame.empty:
+            return 0
+        frame = fill_first_seen(frame)
+        rows = frame[[column for column in COLUMNS if column in frame.columns]].copy()
+        for column in COLUMNS:
+            if column not in rows.columns:
+                rows[column] = 'N/A'
+        rows['ID'] = rows['ID'].astype(str)
+        rows['is_active'] = rows['is_active'].astype(str).str.lower() == 'true'
+        start = parse_timestamps(rows['first_seen'])
+        end = parse_timestamps(rows['last_seen'])
+        known = (start.notna() & end.notna()).to_numpy()
+        rows = rows[known]
+        rows['start'] = start[known].astype('int64').to_numpy() // 10**9
+        rows['end'] = end[known].astype('int64').to_numpy() // 10**9
+        self.pending.append(rows[INDEX_COLUMNS])
+        return len(rows)
+
+    def consolidate(self):
+        """Fold queued updates into the index and rebuild the sorted arrays"""
+        import numpy as np
+        import pandas as pd
+
+        if not self.pending and self.frame is not None:
+            return
+
+        frames = ([self.frame] if self.frame is not None else []) + self.pending
+        self.pending = []
+        if not frames:
+            frames = [pd.DataFrame({column: pd.Series(dtype='int64' if column in ('start', 'end') else object) for column in INDEX_COLUMNS})]
+        combined = pd.concat(frames, ignore_index=True)
+
+        grouped = combined.groupby('ID', sort=False)
+        merged = grouped[['is_active'] + ATTRIBUTES].last()
+        merged['start'] = grouped['start'].min()
+        merged['end'] = grouped['end'].max()
+        merged = merged.reset_index()
+        merged['is_active'] = merged['is_active'].astype(bool)
+
+        self.frame = merged[INDEX_COLUMNS].sort_values('start', kind='mergesort').reset_index(drop=True)
+        self.starts = self.frame['start'].to_numpy(dtype='int64')
+        self.ends_sorted = np.sort(self.frame['end'].to_numpy(dtype='int64'))
+        self.codes = {}
+        for column in ATTRIBUTES:
+            # Normalize each distinct value once, then merge values that normalize alike
+            raw_codes, uniques = pd.factorize(self.frame[column])
+            codes, normalized = pd.factorize(self.normalized(pd.Series(uniques, dtype=object)))
+            self.codes[column] = (np.where(raw_codes >= 0, codes[raw_codes], -1), {value: code for code, value in enumerate(normalized)})
+
+    def normalized(self, values):
+        """Lower-case attribute text; years come back from CSV / xlsx as '2016' or '2016.0'"""
+        return values.astype(str).str.lower().str.replace(r'\.0$', '', regex=True)
+
+    def with_timestamps(self, frame):
+        """Index rows in the persisted layout, with first_seen / last_seen as text"""
+        import pandas as pd
+
+        frame = frame.copy()
+        frame['first_seen'] = pd.to_datetime(frame['start'], unit='s').dt.strftime(TIMESTAMP_FORMAT)
+        frame['last_seen'] = pd.to_datetime(frame['end'], unit='s').dt.strftime(TIMESTAMP_FORMAT)
+        return frame[COLUMNS]
+
+    def timestamp(self, value):
+        """Seconds since the epoch for a date / datetime string"""
+        import pandas as pd
+
+        return int(pd.Timestamp(value).value // 10**9)
+
+    def live_count(self, when):
+        """Number of listings live at `when`, from the two sorted arrays alone"""
+        import numpy as np
+
+        self.consolidate()
+        t = self.timestamp(when)
+        return int(np.searchsorted(self.starts, t, side='right') - np.searchsorted(self.ends_sorted, t, side='left'))
+
+    def filter_mask(self, rows, car_model=None, year=None, transmission=None, region_code=None):
+        """Mask over the first `rows` intervals matching the given attributes (case-insensitive)"""
+        import numpy as np
+        import pandas as pd
+
+        mask = np.ones(rows, dtype=bool)
+        for column, expected in (('car_model', car_model), ('year', year), ('transmission', transmission), ('region_code', region_code)):
+            if expected is None:
+                continue
+            codes, lookup = self.codes[column]
+            code = lookup.get(self.normalized(pd.Series([expected]))[0], -2)
+            mask &= codes[:rows] == code
+        return mask
+
+    def live_at(self, when, **filters):
+        """Listings live at `when` (first_seen <= when <= last_seen), optionally filtered by attributes"""
+        import numpy as np
+
+        self.consolidate()
+        t = self.timestamp(when)
+        rows = int(np.searchsorted(self.starts, t, side='right'))
+        started = self.frame.iloc[:rows]
+        mask = (started['end'].to_numpy() >= t) & self.filter_mask(rows, **filters)
+        return self.with_timestamps(started[mask])
+
+    def durations(self, sold_only=True, **filters):
+        """Days from first to last seen per listing; sold_only drops listings that are still active"""
+        self.consolidate()
+        frame = self.frame
+        mask = self.filter_mask(len(frame), **filters)
+        if sold_only:
+            mask &= ~frame['is_active'].to_numpy()
+        return (frame['end'].to_numpy()[mask] - frame['start'].to_numpy()[mask]) / 86400
+
+    def time_to_sale(self, **filters):
+        """Count, mean and quartiles of days listed for sold (no longer active) listings"""
+        import numpy as np
+
+        days = self.durations(sold_only=True, **filters)
+        if not len(days):
+            return {'sold': 0}
+        p25, median, p75 = np.percentile(days, [25, 50, 75])
+        return {'sold': int(len(days)), 'mean_days': round(float(days.mean()), 1),
+                'p25_days': round(float(p25), 1), 'median_days': round(float(median), 1), 'p75_days': round(float(p75), 1)}
+
+    def save(self, filepath):
+        """Persist the intervals as CSV alongside the dataset"""
+        self.consolidate()
+        temp_path = f"{filepath}.tmp"
+        self.with_timestamps(self.frame).to_csv(temp_path, index=False)
+        os.replace(temp_path, filepath)
+
+    def load(self, filepath):
+        """Load persisted intervals; returns False when there is nothing to load"""
+        import pandas as pd
+
+        if not os.path.exists(filepath):
+            return False
+
+        try:
+            self.frame = None
+            self.pending = []
+            self.update(pd.read_csv(filepath, dtype=str, keep_default_na=False))
+            self.consolidate()
+        except Exception as e:
+            self.logger.error(f"Error loading listing lifetimes: {e}")
+            self.frame = None
+            self.pending = []
+            return False
+        return True
@@ -0,0 +1,225 @@
+import json
+import logging
+import math
+import os
+
+
+class QuantileSketch:
+    """Streaming quantile sketch with bounded relative error that can also remove values
+
+    Values fall into logarithmic buckets whose bounds grow by gamma = (1 + a) / (1 - a),
+    so every quantile is within relative accuracy a of the exact one (the DDSketch
+    construction). Memory is one counter per occupied bucket - a few hundred for prices
+    from $1k to $250k at 1% - and, unlike P-squared, a value can be taken out again by
+    decrementing its bucket, so a median can follow listings that go inactive.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # bucket index -> number of values in it
+        self.buckets = {}
+        self.count = 0
+
+    def bucket(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def add(self, value):
+        """Add one positive observation"""
+        index = self.bucket(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def remove(self, value):
+        """Remove one observation added earlier"""
+        index = self.bucket(value)
+        remaining = self.buckets.get(index, 0) - 1
+        if remaining < 0:
+            return
+        if remaining:
+            self.buckets[index] = remaining
+        else:
+            del self.buckets[index]
+        self.count -= 1
+
+    def value(self, q=0.5):
+        """Estimate of the q quantile (the median by default), None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return None
+
+    def to_dict(self):
+        return {'relative_accuracy': self.relative_accuracy, 'buckets': {str(index): n for index, n in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state['relative_accuracy'])
+        sketch.buckets = {int(index): n for index, n in state['buckets'].items()}
+        sketch.count = sum(sketch.buckets.values())
+        return sketch
+
+
+class MarketStats:
+    """Running market statistics per (car model, year, transmission) over active listings
+
+    Active and total counts are exact. Median price and price per km are quantile sketches
+    over the current price of each active listing. The listing index remembers what each
+    listing contributes (group, active flag, price, price per km), so a change - a listing
+    going inactive, moving group once enrichment fills in the transmission, or being
+    repriced - takes its old contribution out and puts the new one in. Each run feeds only
+    the rows its merge touched.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        # group key -> {'active', 'listings', 'price', 'price_per_km'}
+        self.groups = {}
+        # listing ID -> [group key, is active, price, price per km]
+        self.listings = {}
+
+    @staticmethod
+    def group_key(car_model, year, transmission):
+        return f"{car_model}|{year}|{transmission}"
+
+    def group(self, key):
+        if key not in self.groups:
+            self.groups[key] = {'active': 0, 'listings': 0, 'price': QuantileSketch(), 'price_per_km': QuantileSketch()}
+        return self.groups[key]
+
+    def row_keys(self, frame):
+        """Group key of every row, with unparseable years and transmissions as N/A"""
+        import pandas as pd
+
+        years = pd.to_numeric(frame['year'], errors='coerce').astype('Int64').astype(str).replace('<NA>', 'N/A')
+        if 'transmission' in frame.columns:
+            transmissions = frame['transmission'].fillna('N/A').astype(str).replace('', 'N/A')
+        else:
+            transmissions = pd.Series('N/A', index=frame.index)
+        return frame['car_model'].astype(str) + '|' + years + '|' + transmissions
+
+    def apply(self, state, sign):
+        """Add (sign 1) or take out (sign -1) one listing's contribution to its group"""
+        key, is_active, price, price_per_km = state
+        group = self.group(key)
+        group['listings'] += sign
+        if not is_active:
+            return
+        group['active'] += sign
+        for sketch, value in ((group['price'], price), (group['price_per_km'], price_per_km)):
+            if value is not None:
+                sketch.add(value) if sign > 0 else sketch.remove(value)
+
+    def update(self, frame):
+        """Apply the rows of frame that differ from what the stats last saw; returns how many changed
+
+        frame only needs the rows a merge touched (seen again, new or gone inactive).
+        """
+        import numpy as np
+        import pandas as pd
+
+        if frame.empty:
+            return 0
+
+        keys = self.row_keys(frame)
+        active = frame['is_active'].astype(str).str.lower() == 'true'
+        prices = pd.to_numeric(frame['price'].astype(str).str.replace(r'[$,\s]', '', regex=True), errors='coerce').to_numpy()
+        kms = pd.to_numeric(frame['kms'].astype(str).str.replace(r'[,\s]|km', '', regex=True), errors='coerce').to_numpy()
+        has_price = prices > 0
+        prices = np.where(has_price, np.round(prices, 2), np.nan)
+        per_km = np.where(has_price & (kms > 0), np.round(prices / np.where(kms > 0, kms, 1), 6), np.nan)
+
+        changed = 0
+        for listing_id, key, is_active, price, price_per_km in zip(frame['ID'].astype(str), keys, active, prices, per_km):
+            state = [key, bool(is_active), None if price != price else float(price),
+                     None if price_per_km != price_per_km else float(price_per_km)]
+            previous = self.listings.get(listing_id)
+            if previous == state:
+                continue
+            changed += 1
+            if previous is not None:
+                self.apply(previous, -1)
+            self.apply(state, 1)
+            self.listings[listing_id] = state
+
+        return changed
+
+    def forget(self, listing_ids):
+        """Drop listings (e.g. archived or re-keyed ones) from the index and from their group's totals"""
+        for listing_id in listing_ids:
+            state = self.listings.pop(str(listing_id), None)
+            if state is not None:
+                self.apply(state, -1)
+
+    def summary(self):
+        """One row per group: model, year, transmission, active count, medians"""
+        rows = []
+        for key, group in sorted(self.groups.items()):
+            if not group['listings']:
+                continue
+            car_model, year, transmission = key.split('|', 2)
+            rows.append({
+                'car_model': car_model,
+                'year': year,
+                'transmission': transmission,
+                'active': group['active'],
+                'listings': group['listings'],
+                'median_price': group['price'].value(),
+                'median_price_per_km': group['price_per_km'].value(),
+            })
+        return rows
+
+    def save(self, filepath):
+        """Persist the sketches and listing index alongside the dataset"""
+        state = {
+            'groups': {
+                key: {
+                    'active': group['active'],
+                    'listings': group['listings'],
+                    'price': group['price'].to_dict(),
+                    'price_per_km': group['price_per_km'].to_dict(),
+                }
+                for key, group in self.groups.items()
+            },
+            'listings': self.listings,
+        }
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, filepath)
+
+    def load(self, filepath):
+        """Load persisted stats; returns False when there is nothing to load"""
+        if not os.path.exists(filepath):
+            return False
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading market stats: {e}")
+            return False
+
+        if any('buckets' not in group['price'] for group in state['groups'].values()):
+            # Written by the earlier P-squared version, which can't take values out again
+            self.logger.info("Market stats file is in an older format, rebuilding")
+            return False
+
+        self.groups = {
+            key: {
+                'active': group['active'],
+                'listings': group['listings'],
+                'price': QuantileSketch.from_dict(group['price']),
+                'price_per_km': QuantileSketch.from_dict(group['price_per_km']),
+            }
+            for key, group in state['groups'].items()
+        }
+        self.listings = state['listings']
+        return True
@@ -0,0 +1,15 @@
+"""Listing site adapters; add a site by subclassing MarketplaceAdapter and registering it here"""
+from .base import MarketplaceAdapter
+from .trademe import TradeMeAdapter
+
+ADAPTERS = {adapter.name: adapter for adapter in [TradeMeAdapter]}
+
+
+def get_adapter(name='trademe', base_url=None):
+    """Create the adapter registered under name"""
+    if name not in ADAPTERS:
+        raise ValueError(f"Unknown marketplace '{name}' (available: {', '.join(sorted(ADAPTERS))})")
+    return ADAPTERS[name](base_url)
+
+
+__all__ = ['ADAPTERS', 'MarketplaceAdapter', 'TradeMeAdapter', 'get_adapter']
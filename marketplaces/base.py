@@ -0,0 +1,166 @@
+import re
+from html.parser import HTMLParser
+
+from recorded_cards import RecordedCard
+
+# Tags after which Selenium's .text starts a new line
+BLOCK_TAGS = {'div', 'p', 'li', 'ul', 'ol', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'tr'}
+
+
+class MarketplaceAdapter:
+    """Everything the scraper needs to know about one listings site
+
+    Subclasses describe where the search results live (URL building), how a results
+    page is fetched and which elements are the listing cards, and how a card's link
+    becomes a stable listing ID. Parsing of the card text itself stays shared, so a
+    new site only has to fill in the class attributes and override what differs.
+    """
+
+    name = None
+    display_name = None
+    default_base_url = None
+    # Prefix that keeps IDs from different sites apart (and the ID column text in the xlsx)
+    id_prefix = None
+    # Class of the element holding one listing card's text
+    card_class = None
+    # Path of each car model's search results, relative to the base URL
+    model_paths = {}
+    # Listing links look like this; group 1 is the site's listing number
+    listing_id_pattern = r'/listing/(\d+)'
+    # Query parameters for paging and the newest-first sort
+    page_param = 'page'
+    sort_param = None
+    newest_first_sort = None
+    # Site search used for the "find it again" links; {term} is '+'-joined
+    site_search_path = None
+
+    # Selenium's By.XPATH locator strategy, spelled out so parsing never imports Selenium
+    XPATH = 'xpath'
+
+    def __init__(self, base_url=None):
+        self.base_url = (base_url or self.default_base_url).rstrip('/')
+
+    @property
+    def card_selector(self):
+        return f".{self.card_class}"
+
+    @property
+    def listing_anchor_xpath(self):
+        marker = self.listing_id_pattern.split('(')[0]
+        return f"./ancestor-or-self::a[contains(@href, '{marker}')] | .//a[contains(@href, '{marker}')]"
+
+    def search_urls(self):
+        """Car model -> first results page URL"""
+        return {car_model: f"{self.base_url}{path}" for car_model, path in self.model_paths.items()}
+
+    def build_page_url(self, url, page, newest_first=False):
+        """Build the URL for a results page, optionally sorted newest first"""
+        params = []
+        if newest_first and self.sort_param:
+            params.append(f"{self.sort_param}={self.newest_first_sort}")
+        if page > 1:
+            params.append(f"{self.page_param}={page}")
+
+        if not params:
+            return url
+        separator = '&' if '?' in url else '?'
+        return f"{url}{separator}{'&'.join(params)}"
+
+    def fetch_page(self, driver, page_url):
+        """Point the browser at a results page"""
+        driver.get(page_url)
+
+    def find_cards(self, driver):
+        """Listing card elements on the loaded page"""
+        from selenium.webdriver.common.by import By
+
+        return driver.find_elements(By.CSS_SELECTOR, self.card_selector)
+
+    def find_listing_href(self, listing_element):
+        """Find the href of the listing anchor wrapping (or inside) a card"""
+        for anchor in listing_element.find_elements(self.XPATH, self.listing_anchor_xpath):
+            href = anchor.get_attribute('href') or ''
+            if re.search(self.listing_id_pattern, href):
+                return href
+        return None
+
+    def parse_listing_href(self, href):
+        """(listing ID, canonical listing URL) from a card link, or ('N/A', 'N/A')"""
+        id_match = re.search(self.listing_id_pattern, href or '')
+        if not id_match:
+            return 'N/A', 'N/A'
+
+        # Drop tracking query strings so the URL is stable between runs
+        listing_url = href.split('?')[0]
+        if listing_url.startswith('/'):
+            listing_url = f"{self.base_url}{listing_url}"
+        return id_match.group(1), listing_url
+
+    def listing_key(self, listing_id):
+        """Dataset ID for a site listing number"""
+        return f"{self.id_prefix}{listing_id}"
+
+    def site_search_url(self, term):
+        return f"{self.base_url}{self.site_search_path.format(term=term.replace(' ', '+'))}"
+
+    def web_search_url(self, term, images=False):
+        """Web search restricted to this site, for listings the site search can't find"""
+        domain = re.sub(r'^https?://(www\.)?', '', self.default_base_url)
+        return f"https://www.google.com/search?q={term.replace(' ', '+')}+site:{domain}{'&tbm=isch' if images else ''}"
+
+    def cards_from_html(self, html, car_model=None):
+        """Cards from a saved results page, the same snapshots the browser would produce"""
+        parser = CardHTMLParser(self.card_class, self.listing_id_pattern)
+        parser.feed(html)
+        parser.close()
+        return [RecordedCard(text, href, car_model) for text, href in parser.cards]
+
+
+class CardHTMLParser(HTMLParser):
+    """Collect (text, listing href) for every card element in a page"""
+
+    def __init__(self, card_class, listing_id_pattern):
+        super().__init__(convert_charrefs=True)
+        self.card_class = card_class
+        self.listing_id_pattern = listing_id_pattern
+        self.cards = []
+        # Listing hrefs of the anchors currently open
+        self.anchor_stack = []
+        self.card_depth = 0
+        self.card_parts = None
+        self.card_href = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a':
+            href = attrs.get('href') or ''
+            self.anchor_stack.append(href if re.search(self.listing_id_pattern, href) else None)
+            if self.card_parts is not None and self.card_href is None and self.anchor_stack[-1]:
+                self.card_href = self.anchor_stack[-1]
+
+        if self.card_parts is not None:
+            self.card_depth += 1
+            if tag in BLOCK_TAGS:
+                self.card_parts.append('\n')
+        elif self.card_class in (attrs.get('class') or '').split():
+            self.card_parts = []
+            self.card_depth = 1
+            # A card wrapped in its listing anchor
+            self.card_href = next((href for href in reversed(self.anchor_stack) if href), None)
+
+    def handle_endtag(self, tag):
+        if self.card_parts is not None:
+            self.card_depth -= 1
+            if tag in BLOCK_TAGS:
+                self.card_parts.append('\n')
+            if self.card_depth == 0:
+                lines = [line.strip() for line in ''.join(self.card_parts).split('\n')]
+                self.cards.append(('\n'.join(line for line in lines if line), self.card_href))
+                self.card_parts = None
+                self.card_href = None
+        if tag == 'a' and self.anchor_stack:
+            self.anchor_stack.pop()
+
+    def handle_data(self, data):
+        if self.card_parts is not None:
+            self.card_parts.append(data)
@@ -0,0 +1,19 @@
+from .base import MarketplaceAdapter
+
+
+class TradeMeAdapter(MarketplaceAdapter):
+    """TradeMe Motors search results"""
+
+    name = 'trademe'
+    display_name = 'TradeMe'
+    default_base_url = 'https://www.trademe.co.nz'
+    id_prefix = 'TM'
+    card_class = 'tm-motors-tier-one-search-card__listing-details-container'
+    model_paths = {
+        'Toyota 86': '/a/motors/cars/toyota/86',
+        'Subaru BRZ': '/a/motors/cars/subaru/brz',
+    }
+    listing_id_pattern = r'/listing/(\d+)'
+    sort_param = 'sort_order'
+    newest_first_sort = 'expirydesc'  # TradeMe's "Latest listings" sort order
+    site_search_path = '/a/motors/cars/search?search_string={term}'
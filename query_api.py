@@ -0,0 +1,468 @@
+"""Read-only HTTP query API over the published dataset, served from an in-memory index.
+
+The scraper publishes every run as exports/86_BRZ_dataset.jsonl (swapped in
+atomically); the service indexes it by model, region, active status and year / price /
+kms / distance ranges, and reloads only the lines that changed when a new run is published.
+
+    python streamlined_master_scraper.py serve --port 8087
+    curl 'http://127.0.0.1:8087/listings?model=Toyota%2086&active=true&year_min=2015&price_max=23000&sort=price'
+    curl 'http://127.0.0.1:8087/listings?region=NZ-WKO&distance_km_max=150&sort=distance_km'
+"""
+import bisect
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Fields with a sorted index for <field>_min / <field>_max filters
+RANGE_FIELDS = ['year', 'price', 'kms', 'distance_km']
+SORT_FIELDS = RANGE_FIELDS + ['expected_price', 'discount_pct', 'deal_score', 'last_seen', 'listing_date']
+MAX_LIMIT = 1000
+
+
+def number(value):
+    """A value as float, None when missing or not a number"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
+
+
+class ListingIndex:
+    """Listings by ID with secondary indexes for the query API
+
+    Model, region code and active status map to sets of IDs; each range field keeps its values in
+    a sorted list beside the matching IDs (ties in ID order), so a range is two bisects and a
+    sort on a range field is a walk along its list that stops once the page is full. Range
+    filters are checked per ID against the narrowest one rather than copied into sets. A reload
+    compares the snapshot line by line with the previous one and only parses and re-indexes
+    lines that changed, dropping IDs that disappeared.
+    """
+
+    def __init__(self, snapshot_file):
+        self.logger = logging.getLogger(__name__)
+        self.snapshot_file = snapshot_file
+        self.lock = threading.RLock()
+        self.records = {}
+        self.by_model = {}
+        self.by_region = {}
+        self.by_active = {True: set(), False: set()}
+        self.range_values = {field: [] for field in RANGE_FIELDS}
+        self.range_ids = {field: [] for field in RANGE_FIELDS}
+        # field -> {ID: value}, to check a range filter for one listing without scanning its list
+        self.range_value_of = {field: {} for field in RANGE_FIELDS}
+        # hash(line) -> ID, to recognise unchanged lines on reload
+        self.line_ids = {}
+        self.version = None
+        self.loaded_at = None
+        self.last_reload = None
+
+    def snapshot_version(self):
+        """Version of the published snapshot (mtime and size), None when there is none"""
+        try:
+            stat = os.stat(self.snapshot_file)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def add(self, listing_id, record, index_ranges=True):
+        self.records[listing_id] = record
+        self.by_model.setdefault(str(record.get('car_model', '')).lower(), set()).add(listing_id)
+        self.by_region.setdefault(str(record.get('region_code', '')).lower(), set()).add(listing_id)
+        self.by_active[record.get('is_active') is True].add(listing_id)
+        if not index_ranges:
+            return
+        for field in RANGE_FIELDS:
+            value = number(record.get(field))
+            if value is not None:
+                values, ids = self.range_values[field], self.range_ids[field]
+                start, end = bisect.bisect_left(values, value), bisect.bisect_right(values, value)
+                position = start + bisect.bisect_left(ids[start:end], listing_id)
+                values.insert(position, value)
+                ids.insert(position, listing_id)
+                self.range_value_of[field][listing_id] = value
+
+    def rebuild_ranges(self):
+        """Re-sort every range index from the records, cheaper than many single inserts"""
+        for field in RANGE_FIELDS:
+            pairs = sorted(
+                (value, listing_id) for listing_id, value in
+                ((listing_id, number(record.get(field))) for listing_id, record in self.records.items())
+                if value is not None
+            )
+            self.range_values[field] = [value for value, _ in pairs]
+            self.range_ids[field] = [listing_id for _, listing_id in pairs]
+            self.range_value_of[field] = {listing_id: value for value, listing_id in pairs}
+
+    def remove(self, listing_id, index_ranges=True):
+        record = self.records.pop(listing_id, None)
+        if record is None:
+            return
+        model_ids = self.by_model.get(str(record.get('car_model', '')).lower())
+        if model_ids is not None:
+            model_ids.discard(listing_id)
+        region_ids = self.by_region.get(str(record.get('region_code', '')).lower())
+        if region_ids is not None:
+            region_ids.discard(listing_id)
+        self.by_active[record.get('is_active') is True].discard(listing_id)
+        if not index_ranges:
+            return
+        for field in RANGE_FIELDS:
+            value = number(record.get(field))
+            if value is None:
+                continue
+            values, ids = self.range_values[field], self.range_ids[field]
+            start, end = bisect.bisect_left(values, value), bisect.bisect_right(values, value)
+            position = start + ids[start:end].index(listing_id)
+            del values[position], ids[position]
+            del self.range_value_of[field][listing_id]
+
+    def reload(self, force=False):
+        """Apply the published snapshot if it changed; returns False when there was nothing new"""
+        version = self.snapshot_version()
+        if version is None or (version == self.version and not force):
+            return False
+
+        started = time.perf_counter()
+        with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+
+        # Parse only new or changed lines, outside the lock so queries keep being served
+        line_ids = {}
+        changed = {}
+        for line in lines:
+            key = hash(line)
+            listing_id = self.line_ids.get(key)
+            if listing_id is None:
+                record = json.loads(line)
+                listing_id = str(record.get('ID'))
+                changed[listing_id] = record
+            line_ids[key] = listing_id
+        seen = set(line_ids.values())
+
+        with self.lock:
+            removed = [listing_id for listing_id in self.records if listing_id not in seen]
+            # A first load or a large change re-sorts the range indexes once instead of inserting row by row
+            bulk = len(changed) + len(removed) > max(1000, len(self.records) // 10)
+            for listing_id in removed:
+                self.remove(listing_id, index_ranges=not bulk)
+            for listing_id, record in changed.items():
+                self.remove(listing_id, index_ranges=not bulk)
+                self.add(listing_id, record, index_ranges=not bulk)
+            if bulk:
+                self.rebuild_ranges()
+            self.line_ids = line_ids
+            self.version = version
+            self.loaded_at = time.strftime('%Y-%m-%d %H:%M:%S')
+            self.last_reload = {
+                'changed': len(changed),
+                'removed': len(removed),
+                'seconds': round(time.perf_counter() - started, 3),
+            }
+        self.logger.info(f"Loaded snapshot {version}: {len(changed)} changed, {len(removed)} removed, {len(self.records)} listings")
+        return True
+
+    def range_span(self, field, low=None, high=None):
+        """(start, end) positions in the field's sorted list of the IDs whose value lies in [low, high]"""
+        values = self.range_values[field]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        end = len(values) if high is None else bisect.bisect_right(values, high)
+        return start, end
+
+    def matching_ids(self, sets, ranges):
+        """IDs passing every filter, or None when there are no filters (everything matches)
+
+        The ID sets are intersected smallest first; then the smaller of that and the narrowest
+        range's slice of its sorted list is walked, checking the remaining ranges per ID.
+        """
+        spans = {field: self.range_span(field, low, high) for field, (low, high) in ranges.items()}
+        if not sets and not spans:
+            return None
+        matches = None
+        if sets:
+            sets = sorted(sets, key=len)
+            matches = sets[0].intersection(*sets[1:])
+        if not spans:
+            return matches
+
+        checks = dict(ranges)
+        field = min(spans, key=lambda name: spans[name][1] - spans[name][0])
+        start, end = spans[field]
+        if matches is None or end - start < len(matches):
+            walked = self.range_ids[field][start:end]
+            if matches is not None:
+                walked = matches.intersection(walked)
+            del checks[field]
+        else:
+            walked = matches
+        for field, (low, high) in checks.items():
+            # A missing value is NaN here, which fails both comparisons
+            low = -math.inf if low is None else low
+            high = math.inf if high is None else high
+            value_of = self.range_value_of[field]
+            walked = [listing_id for listing_id in walked if low <= value_of.get(listing_id, math.nan) <= high]
+        return walked if isinstance(walked, set) else set(walked)
+
+    def sorted_by_range(self, field, descending, matches, count):
+        """The first count matching IDs by a range field (ties in ID order, missing values last)"""
+        ids, values, value_of = self.range_ids[field], self.range_values[field], self.range_value_of[field]
+        if matches is not None and len(matches) * 8 < len(ids):
+            # Few matches: sorting them beats walking the whole list past non-matches
+            present = [(value_of[listing_id], listing_id) for listing_id in matches if listing_id in value_of]
+            if descending:
+                present = heapq.nsmallest(count, present, key=lambda pair: (-pair[0], pair[1]))
+            else:
+                present = heapq.nsmallest(count, present)
+            result = [listing_id for _, listing_id in present]
+        else:
+            if descending:
+                def ordered():
+                    # Walk groups of equal values from the top, each group in ID order
+                    end = len(values)
+                    while end > 0:
+                        start = bisect.bisect_left(values, values[end - 1], 0, end)
+                        yield from ids[start:end]
+                        end = start
+                walk = ordered()
+            else:
+                walk = iter(ids)
+            result = []
+            if count:
+                for listing_id in walk:
+                    if matches is None or listing_id in matches:
+                        result.append(listing_id)
+                        if len(result) == count:
+                            break
+
+        if len(result) < count:
+            candidates = self.records if matches is None else matches
+            missing = (listing_id for listing_id in candidates if listing_id not in value_of)
+            result += heapq.nsmallest(count - len(result), missing)
+        return result
+
+    def sorted_by_value(self, field, descending, candidates, count):
+        """The first count candidate IDs by any sort field (ties in ID order, missing values last)"""
+        present, missing = [], []
+        for listing_id in candidates:
+            value = self.sort_value(listing_id, field)
+            if value is None:
+                missing.append(listing_id)
+            else:
+                present.append((value, listing_id))
+
+        if not descending:
+            top = heapq.nsmallest(count, present)
+        elif count >= len(present):
+            top = sorted(sorted(present, key=lambda pair: pair[1]), key=lambda pair: pair[0], reverse=True)
+        elif count:
+            # Values may be strings, so they can't be negated: take the largest count, then give
+            # the values tied at the cut-off to the smallest IDs
+            top = heapq.nlargest(count, present, key=lambda pair: pair[0])
+            cutoff = top[-1][0]
+            above = sorted(sorted(pair for pair in top if pair[0] != cutoff), key=lambda pair: pair[0], reverse=True)
+            tied = heapq.nsmallest(count - len(above), (listing_id for value, listing_id in present if value == cutoff))
+            top = above + [(cutoff, listing_id) for listing_id in tied]
+        else:
+            top = []
+        result = [listing_id for _, listing_id in top]
+        if len(result) < count:
+            result += heapq.nsmallest(count - len(result), missing)
+        return result
+
+    def query(self, model=None, region=None, active=None, ranges=None, sort=None, descending=False, limit=100, offset=0, fields=None):
+        """Filter, sort and page listings; returns the JSON-ready response body"""
+        with self.lock:
+            sets = []
+            if model is not None:
+                sets.append(self.by_model.get(model.lower(), set()))
+            if region is not None:
+                sets.append(self.by_region.get(region.lower(), set()))
+            if active is not None:
+                sets.append(self.by_active[active])
+            matches = self.matching_ids(sets, ranges or {})
+            total = len(self.records) if matches is None else len(matches)
+
+            # Only the IDs up to the end of the requested page are ever put in order
+            count = offset + limit
+            if sort in RANGE_FIELDS:
+                listing_ids = self.sorted_by_range(sort, descending, matches, count)
+            elif sort is not None:
+                listing_ids = self.sorted_by_value(sort, descending, self.records if matches is None else matches, count)
+            else:
+                listing_ids = heapq.nsmallest(count, self.records if matches is None else matches)
+
+            page = listing_ids[offset:count]
+            listings = [self.records[listing_id] for listing_id in page]
+            if fields:
+                listings = [{field: listing.get(field) for field in fields} for listing in listings]
+            return {'version': self.version, 'total': total, 'offset': offset, 'limit': limit, 'listings': listings}
+
+    def sort_value(self, listing_id, field):
+        value = self.records[listing_id].get(field)
+        if field in RANGE_FIELDS or field in ('expected_price', 'discount_pct', 'deal_score'):
+            return number(value)
+        return None if value in (None, '', 'N/A') else str(value)
+
+    def status(self):
+        with self.lock:
+            return {
+                'version': self.version,
+                'loaded_at': self.loaded_at,
+                'listings': len(self.records),
+                'active': len(self.by_active[True]),
+                'models': {model: len(ids) for model, ids in sorted(self.by_model.items()) if ids},
+                'regions': {region: len(ids) for region, ids in sorted(self.by_region.items()) if ids},
+                'last_reload': self.last_reload,
+            }
+
+
+class QueryRequestError(ValueError):
+    """A query parameter the API can't use; answered with 400"""
+
+
+def parse_listing_query(query):
+    """Turn /listings query parameters into ListingIndex.query arguments"""
+    def single(name):
+        values = query.get(name)
+        return values[-1] if values else None
+
+    def bound(name):
+        value = single(name)
+        if value is None:
+            return None
+        parsed = number(value.replace(',', ''))
+        if parsed is None:
+            raise QueryRequestError(f"{name} must be a number")
+        return parsed
+
+    options = {'ranges': {}}
+    options['model'] = single('model')
+    options['region'] = single('region')
+    active = single('active')
+    if active is not None:
+        if active.lower() not in ('true', 'false'):
+            raise QueryRequestError("active must be true or false")
+        options['active'] = active.lower() == 'true'
+
+    for field in RANGE_FIELDS:
+        low, high = bound(f"{field}_min"), bound(f"{field}_max")
+        if low is not None or high is not None:
+            options['ranges'][field] = (low, high)
+
+    sort = single('sort')
+    if sort is not None:
+        options['descending'] = sort.startswith('-') or (single('order') or '').lower() == 'desc'
+        sort = sort.lstrip('-')
+        if sort not in SORT_FIELDS:
+            raise QueryRequestError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+        options['sort'] = sort
+
+    try:
+        options['limit'] = min(int(single('limit') or 100), MAX_LIMIT)
+        options['offset'] = int(single('offset') or 0)
+    except ValueError:
+        raise QueryRequestError("limit and offset must be integers")
+    if options['limit'] < 0 or options['offset'] < 0:
+        raise QueryRequestError("limit and offset must not be negative")
+
+    fields = single('fields')
+    if fields:
+        options['fields'] = [field.strip() for field in fields.split(',') if field.strip()]
+    return options
+
+
+class QueryAPIHandler(BaseHTTPRequestHandler):
+    """GET /listings, /listings/<ID> and /status as JSON, with ETags tied to the snapshot version"""
+
+    index = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+
+        if path == '/status':
+            self.send_json(self.index.status(), etag=False)
+            return
+
+        if self.not_modified():
+            return
+
+        if path == '/listings':
+            try:
+                options = parse_listing_query(parse_qs(parsed.query))
+            except QueryRequestError as e:
+                self.send_json({'error': str(e)}, status=400, etag=False)
+                return
+            self.send_json(self.index.query(**options))
+            return
+
+        if path.startswith('/listings/'):
+            listing_id = unquote(path[len('/listings/'):])
+            with self.index.lock:
+                record = self.index.records.get(listing_id)
+            if record is None:
+                self.send_json({'error': f"No listing {listing_id}"}, status=404, etag=False)
+            else:
+                self.send_json(record)
+            return
+
+        self.send_json({'error': 'Not found'}, status=404, etag=False)
+
+    def etag(self):
+        return f'"{self.index.version}"'
+
+    def not_modified(self):
+        """Answer 304 when the client already has this snapshot's response"""
+        if self.index.version is None or self.headers.get('If-None-Match') != self.etag():
+            return False
+        self.send_response(304)
+        self.send_header('ETag', self.etag())
+        self.end_headers()
+        return True
+
+    def send_json(self, body, status=200, etag=True):
+        encoded = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        if etag and self.index.version is not None:
+            # Responses only change when a new snapshot is published
+            self.send_header('ETag', self.etag())
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"{self.address_string()} {format % args}")
+
+
+def watch_snapshot(index, poll_seconds, stop_event):
+    """Reload the index whenever the scraper publishes a new snapshot"""
+    while not stop_event.wait(poll_seconds):
+        try:
+            index.reload()
+        except Exception as e:
+            index.logger.error(f"Error reloading snapshot: {e}")
+
+
+def start_server(snapshot_file, host='127.0.0.1', port=0, poll_seconds=5.0):
+    """Load the snapshot, start serving and watching it on background threads; returns (server, index, base_url)"""
+    index = ListingIndex(snapshot_file)
+    if not index.reload():
+        index.logger.warning(f"No published snapshot at {snapshot_file} yet, serving an empty index until one appears")
+
+    handler = type('ConfiguredQueryAPIHandler', (QueryAPIHandler,), {'index': index})
+    server = ThreadingHTTPServer((host, port), handler)
+    # Set server.stop_watching to stop reloading along with server.shutdown()
+    server.stop_watching = threading.Event()
+    threading.Thread(target=watch_snapshot, args=(index, poll_seconds, server.stop_watching), daemon=True).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, index, f"http://{host}:{server.server_address[1]}"
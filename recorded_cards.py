@@ -0,0 +1,50 @@
+import json
+import os
+
+
+class RecordedAnchor:
+    """Plain stand-in for a listing anchor WebElement"""
+
+    def __init__(self, href):
+        self.href = href
+
+    def get_attribute(self, name):
+        return self.href if name == 'href' else None
+
+
+class RecordedCard:
+    """Snapshot of a search card's text and listing anchor, detached from the browser
+
+    Exposes the same `.text` / `find_elements` surface extract_listing_data uses on
+    Selenium elements, so recorded cards can be re-parsed without a browser.
+    """
+
+    def __init__(self, text, href=None, car_model=None):
+        self.text = text
+        self.href = href
+        self.car_model = car_model
+
+    def find_elements(self, by, value):
+        return [RecordedAnchor(self.href)] if self.href else []
+
+    def to_dict(self):
+        return {'car_model': self.car_model, 'text': self.text, 'href': self.href}
+
+
+def save_cards(filepath, cards):
+    """Write recorded cards as JSON Lines"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        for card in cards:
+            f.write(json.dumps(card.to_dict()) + '\n')
+
+
+def load_cards(filepath):
+    """Read recorded cards from a JSON Lines file"""
+    cards = []
+    with open(filepath, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                cards.append(RecordedCard(record['text'], record.get('href'), record.get('car_model')))
+    return cards
@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import pickle
+import random
+import re
+
+
+class RelistingDetector:
+    """Near-duplicate detector that links relisted cars to one vehicle record.
+
+    Each listing is reduced to a set of tokens (title words and word pairs plus
+    year, kms band, location and transmission), summarised with a MinHash
+    signature and bucketed with banded locality-sensitive hashing. Looking up a
+    new listing only compares it against the listings that share a band bucket,
+    so the cost per listing does not grow with the size of the history.
+
+    Title words dominate the token set, so similarity alone would merge different
+    cars with the same title in the same town. A match also needs both odometer
+    readings, with the newer listing's no lower and at most kms_tolerance higher,
+    and the earlier listing's vehicle must not be on sale right now.
+    """
+
+    # Mersenne prime used for the universal hash family
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm=32, bands=8, threshold=0.6, kms_band=5000, kms_tolerance=10000, seed=86):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.logger = logging.getLogger(__name__)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        self.kms_band = kms_band
+        self.kms_tolerance = kms_tolerance
+
+        # Fixed seed so signatures stay comparable between runs
+        rng = random.Random(seed)
+        self.hash_params = [(rng.randrange(1, self.PRIME), rng.randrange(0, self.PRIME)) for _ in range(num_perm)]
+
+        # listing ID -> (vehicle ID, signature, car model, year, kms or None)
+        self.entries = {}
+        # (band number, band values) -> list of listing IDs
+        self.buckets = {}
+
+    def listing_tokens(self, listing):
+        """Build the token set for a listing from the fields produced by extract_listing_data"""
+        tokens = set()
+
+        title = str(listing.get('title', '') or '').lower()
+        words = re.findall(r'[a-z0-9]+', title)
+        tokens.update(f"w:{word}" for word in words)
+        tokens.update(f"b:{first}_{second}" for first, second in zip(words, words[1:]))
+
+        year = self.clean_value(listing.get('year'))
+        if year:
+            tokens.add(f"year:{year}")
+
+        kms = self.kms_value(listing)
+        if kms is not None:
+            tokens.add(f"kms:{kms // self.kms_band}")
+
+        location = self.clean_value(listing.get('location'))
+        if location:
+            tokens.add(f"loc:{location.lower()}")
+
+        transmission = self.clean_value(listing.get('transmission'))
+        if transmission:
+            tokens.add(f"trans:{transmission.lower()}")
+
+        return tokens
+
+    def clean_value(self, value):
+        """Normalise a field value to a string, treating N/A and blanks as missing"""
+        if value is None:
+            return ''
+        value = str(value).replace(',', '').strip()
+        if value in ('', 'N/A', 'nan', 'None'):
+            return ''
+        # Numbers read back from Excel come through as floats
+        if value.endswith('.0') and value[:-2].isdigit():
+            value = value[:-2]
+        return value
+
+    def kms_value(self, listing):
+        """Odometer reading as an int, or None when the card didn't give one"""
+        kms = self.clean_value(listing.get('kms'))
+        return int(kms) if kms.isdigit() else None
+
+    def kms_consistent(self, earlier_kms, kms):
+        """Whether a later listing's odometer reading can belong to the same car as an earlier one"""
+        if earlier_kms is None or kms is None:
+            # Without both readings only the title ties the two cards together
+            return False
+        return earlier_kms <= kms <= earlier_kms + self.kms_tolerance
+
+    def signature(self, tokens):
+        """Compute the MinHash signature of a token set"""
+        if not tokens:
+            return None
+
+        token_hashes = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big') for token in tokens]
+        return tuple(
+            min((a * token_hash + b) % self.PRIME for token_hash in token_hashes)
+            for a, b in self.hash_params
+        )
+
+    def band_keys(self, signature):
+        """Split a signature into its LSH band keys"""
+        rows = self.rows_per_band
+        return [(band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def similarity(self, first, second):
+        """Estimate the Jaccard similarity of two signatures"""
+        return sum(1 for a, b in zip(first, second) if a == b) / self.num_perm
+
+    def add(self, listing_id, vehicle_id, listing):
+        """Add a listing to the index under the given vehicle ID"""
+        signature = self.signature(self.listing_tokens(listing))
+        if signature is None:
+            return
+
+        self.entries[listing_id] = (vehicle_id, signature, listing.get('car_model'), self.clean_value(listing.get('year')),
+                                    self.kms_value(listing))
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, []).append(listing_id)
+
+    def find_match(self, listing_id, listing, exclude=(), taken_vehicles=()):
+        """Return the vehicle ID of the closest indexed listing, or None if nothing is similar enough
+
+        Listings in exclude (those in the current scrape, so on sale alongside this one)
+        and vehicles in taken_vehicles (already held by such a listing) are never matched:
+        two cars for sale at once are two cars.
+        """
+        signature = self.signature(self.listing_tokens(listing))
+        if signature is None:
+            return None
+
+        car_model = listing.get('car_model')
+        year = self.clean_value(listing.get('year'))
+        kms = self.kms_value(listing)
+
+        # Gather candidates sharing at least one band bucket
+        candidates = set()
+        for key in self.band_keys(signature):
+            candidates.update(self.buckets.get(key, ()))
+        candidates.discard(listing_id)
+
+        best_vehicle_id = None
+        best_similarity = self.threshold
+        for candidate_id in candidates:
+            if candidate_id in exclude:
+                continue
+            vehicle_id, candidate_signature, candidate_model, candidate_year, candidate_kms = self.entries[candidate_id]
+            if vehicle_id in taken_vehicles:
+                continue
+
+            # Different models or model years can never be the same car, nor can an odometer that went backwards
+            if candidate_model != car_model or (year and candidate_year and year != candidate_year):
+                continue
+            if not self.kms_consistent(candidate_kms, kms):
+                continue
+
+            similarity = self.similarity(signature, candidate_signature)
+            if similarity >= best_similarity:
+                best_vehicle_id = vehicle_id
+                best_similarity = similarity
+
+        return best_vehicle_id
+
+    def save(self, filepath):
+        """Persist the indexed signatures so later runs only hash new listings"""
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'num_perm': self.num_perm, 'bands': self.bands, 'entries': self.entries}, f)
+        os.replace(temp_path, filepath)
+
+    def load(self, filepath):
+        """Load previously indexed signatures, ignoring files built with different parameters"""
+        if not os.path.exists(filepath):
+            return
+
+        try:
+            with open(filepath, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            self.logger.error(f"Error loading relisting index: {e}")
+            return
+
+        if state.get('num_perm') != self.num_perm or state.get('bands') != self.bands:
+            self.logger.info("Relisting index was built with different parameters, rebuilding")
+            return
+        if any(len(entry) != 5 for entry in state['entries'].values()):
+            self.logger.info("Relisting index predates odometer checks, rebuilding")
+            return
+
+        self.entries = state['entries']
+        self.buckets = {}
+        for listing_id, (_, signature, _, _, _) in self.entries.items():
+            for key in self.band_keys(signature):
+                self.buckets.setdefault(key, []).append(listing_id)
@@ -0,0 +1,99 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# Circuit states
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of contacting a host whose circuit is open"""
+
+    def __init__(self, host, retry_after):
+        super().__init__(f"Circuit open for {host}, retry in {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt, base_seconds, cap_seconds):
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]
+
+    Spreading retries over the whole window keeps several workers that failed together
+    from retrying together.
+    """
+    return random.uniform(0, min(cap_seconds, base_seconds * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker shared by everything that fetches pages
+
+    After failure_threshold consecutive failures a host's circuit opens and calls fail
+    fast with CircuitOpenError for cooldown_seconds. The first call after the cooldown
+    is let through as a probe (half-open): success closes the circuit, failure opens it
+    for another cooldown. Safe to share between threads.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown_seconds=120, clock=time.monotonic):
+        self.logger = logging.getLogger(__name__)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        # host -> {'state', 'failures', 'opened_at', 'probing'}
+        self.hosts = {}
+
+    def host(self, url):
+        return urlparse(url).netloc or url
+
+    def circuit(self, host):
+        return self.hosts.setdefault(host, {'state': CLOSED, 'failures': 0, 'opened_at': None, 'probing': False})
+
+    def check(self, url):
+        """Raise CircuitOpenError unless a call to url's host may go ahead now"""
+        host = self.host(url)
+        with self.lock:
+            circuit = self.circuit(host)
+            if circuit['state'] == CLOSED:
+                return
+            retry_after = circuit['opened_at'] + self.cooldown_seconds - self.clock()
+            if circuit['state'] == OPEN and retry_after <= 0:
+                circuit['state'] = HALF_OPEN
+                circuit['probing'] = False
+            if circuit['state'] == HALF_OPEN and not circuit['probing']:
+                # Only one probe at a time; everyone else waits for its outcome
+                circuit['probing'] = True
+                return
+        raise CircuitOpenError(host, max(retry_after, 0))
+
+    def retry_after(self, url):
+        """Seconds until url's host may be tried again (0 when its circuit is closed)"""
+        with self.lock:
+            circuit = self.circuit(self.host(url))
+            if circuit['state'] == CLOSED:
+                return 0
+            return max(circuit['opened_at'] + self.cooldown_seconds - self.clock(), 0)
+
+    def success(self, url):
+        host = self.host(url)
+        with self.lock:
+            circuit = self.circuit(host)
+            if circuit['state'] != CLOSED:
+                self.logger.info(f"Circuit for {host} closed again")
+            circuit.update(state=CLOSED, failures=0, opened_at=None, probing=False)
+
+    def failure(self, url):
+        host = self.host(url)
+        with self.lock:
+            circuit = self.circuit(host)
+            circuit['failures'] += 1
+            if circuit['state'] == HALF_OPEN or circuit['failures'] >= self.failure_threshold:
+                if circuit['state'] != OPEN:
+                    self.logger.warning(f"Circuit for {host} opened after {circuit['failures']} failures, "
+                                        f"pausing requests for {self.cooldown_seconds}s")
+                circuit.update(state=OPEN, opened_at=self.clock(), probing=False)
+
+    def state(self, url):
+        with self.lock:
+            return self.circuit(self.host(url))['state']
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process in bytes, or None if it can't be measured"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return getattr(memory, 'peak_wset', memory.rss)
+    except ImportError:
+        return None
+
+
+def escape_label(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    """Render a label tuple as a Prometheus label set"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def write_atomic(filepath, content):
+    """Write a file via rename so readers (e.g. the node exporter) never see a partial file"""
+    temp_path = f"{filepath}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, filepath)
+
+
+class RunMetrics:
+    """Per-stage timers, counters and gauges for one scraper run"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.finished = None
+        self.success = None
+        # (stage, labels) -> [seconds, calls]
+        self.stages = {}
+        # (name, labels) -> value
+        self.counters = {}
+        # (name, labels) -> last value set (rates, percentiles - values that don't add up)
+        self.gauges = {}
+
+    def label_key(self, labels):
+        """Normalise keyword labels into a hashable, ordered tuple"""
+        return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Time a block of work, accumulating into the stage/label totals"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault((name, self.label_key(labels)), [0.0, 0])
+            totals[0] += time.perf_counter() - start
+            totals[1] += 1
+
+    def incr(self, name, amount=1, **labels):
+        """Add to a counter"""
+        key = (name, self.label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Set a gauge, replacing any earlier value"""
+        self.gauges[(name, self.label_key(labels))] = value
+
+    def finish(self, success):
+        """Mark the run as finished"""
+        self.finished = time.perf_counter()
+        self.success = success
+
+    def duration(self):
+        """Seconds since the run started (or until it finished)"""
+        return (self.finished or time.perf_counter()) - self.start
+
+    def to_dict(self):
+        """Run report as plain data"""
+        return {
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_seconds': self.duration(),
+            'success': self.success,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': [
+                {'stage': name, 'labels': dict(labels), 'seconds': seconds, 'calls': calls}
+                for (name, labels), (seconds, calls) in sorted(self.stages.items())
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ],
+            'gauges': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.gauges.items())
+            ],
+        }
+
+    def to_prometheus(self):
+        """Run report in the Prometheus text exposition format"""
+        lines = [
+            '# HELP carsearch_run_duration_seconds Duration of the last scraper run.',
+            '# TYPE carsearch_run_duration_seconds gauge',
+            f'carsearch_run_duration_seconds {self.duration():.6f}',
+            '# HELP carsearch_run_timestamp_seconds Unix time the last scraper run started.',
+            '# TYPE carsearch_run_timestamp_seconds gauge',
+            f'carsearch_run_timestamp_seconds {self.started_at.timestamp():.0f}',
+            '# HELP carsearch_run_success Whether the last scraper run completed without error.',
+            '# TYPE carsearch_run_success gauge',
+            f'carsearch_run_success {1 if self.success else 0}',
+        ]
+
+        rss = peak_rss_bytes()
+        if rss is not None:
+            lines += [
+                '# HELP carsearch_peak_rss_bytes Peak resident memory of the scraper process.',
+                '# TYPE carsearch_peak_rss_bytes gauge',
+                f'carsearch_peak_rss_bytes {rss}',
+            ]
+
+        lines += [
+            '# HELP carsearch_stage_duration_seconds Time spent in each pipeline stage during the last run.',
+            '# TYPE carsearch_stage_duration_seconds gauge',
+        ]
+        for (name, labels), (seconds, _) in sorted(self.stages.items()):
+            lines.append(f'carsearch_stage_duration_seconds{format_labels((("stage", name),) + labels)} {seconds:.6f}')
+
+        lines += [
+            '# HELP carsearch_stage_calls Number of times each pipeline stage ran during the last run.',
+            '# TYPE carsearch_stage_calls gauge',
+        ]
+        for (name, labels), (_, calls) in sorted(self.stages.items()):
+            lines.append(f'carsearch_stage_calls{format_labels((("stage", name),) + labels)} {calls}')
+
+        # Counters are per-run totals, so both they and the gauges are exported as gauges
+        for values in (self.counters, self.gauges):
+            for metric_name in sorted({name for name, _ in values}):
+                metric = f'carsearch_{metric_name}'
+                lines += [f'# HELP {metric} {metric_name.replace("_", " ").capitalize()} during the last run.', f'# TYPE {metric} gauge']
+                for (name, labels), value in sorted(values.items()):
+                    if name == metric_name:
+                        lines.append(f'{metric}{format_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, report_file, prometheus_file=None):
+        """Write the JSON run report and, if given, the Prometheus textfile"""
+        try:
+            # abspath so a bare filename (e.g. CARSEARCH_PROM_TEXTFILE=carsearch.prom) has a directory to create
+            os.makedirs(os.path.dirname(os.path.abspath(report_file)), exist_ok=True)
+            write_atomic(report_file, json.dumps(self.to_dict(), indent=2))
+            if prometheus_file:
+                os.makedirs(os.path.dirname(os.path.abspath(prometheus_file)), exist_ok=True)
+                write_atomic(prometheus_file, self.to_prometheus())
+            self.logger.info(f"Run report saved to: {report_file}")
+        except Exception as e:
+            self.logger.error(f"Error writing run metrics: {e}")
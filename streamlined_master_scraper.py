@@ -1,45 +1,69 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-import pandas as pd
+# Selenium, pandas, openpyxl and requests are imported where they are used, so
+# subcommands that don't scrape or export start without paying for them
 import time
 import os
 from datetime import datetime, timedelta
 import logging
 import hashlib
+import json
 import re
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
+import socket
+from relisting import RelistingDetector
+from run_metrics import RunMetrics
+from recorded_cards import RecordedCard, save_cards, load_cards
+from exporters import StreamingExporter, EXPORT_FORMATS
+from archive import ColdArchive
+from chunked_merge import ChunkedHistoryMerger
+from deal_rules import DealRules
+from market_stats import MarketStats
+from fair_price import FairPriceModel, FEATURES as FAIR_PRICE_FEATURES
+from job_queue import JobQueue, DONE, FAILED, write_job_result, read_job_result
+from marketplaces import ADAPTERS, get_adapter
+from gazetteer import Gazetteer
+from lifetimes import LifetimeIndex, fill_first_seen
+from resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+from validation import ListingValidator, append_quarantine
 
 class StreamlinedMasterScraper:
-    def __init__(self):
+    # Resource URL patterns the lean profile blocks - we only read card text
+    BLOCKED_URL_PATTERNS = [
+        # Images and media
+        '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.mp4', '*.webm',
+        # Fonts
+        '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+        # Ads and trackers
+        '*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*', '*adservice.google.*',
+        '*google-analytics.com*', '*googletagmanager.com*', '*facebook.net*', '*facebook.com/tr*',
+        '*hotjar.com*', '*nr-data.net*', '*newrelic.com*', '*adnxs.com*', '*criteo.*', '*scorecardresearch.com*',
+    ]
+
+    def __init__(self, output_dir=None, onedrive_dir=None, base_url=None, marketplace=None):
         # Setup logging
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
         
-        # Setup Chrome options
-        self.chrome_options = Options()
-        self.chrome_options.add_argument('--headless')
-        self.chrome_options.add_argument('--no-sandbox')
-        self.chrome_options.add_argument('--disable-dev-shm-usage')
-        self.chrome_options.add_argument('--window-size=1920,1080')
-        
-        # URLs to scrape
-        self.urls = {
-            'Toyota 86': 'https://www.trademe.co.nz/a/motors/cars/toyota/86',
-            'Subaru BRZ': 'https://www.trademe.co.nz/a/motors/cars/subaru/brz'
-        }
+        # Site adapter and its search URLs (base URL overridable so runs can point at a local mock server)
+        self.use_marketplace(
+            marketplace or os.environ.get('CARSEARCH_MARKETPLACE') or 'trademe',
+            base_url or os.environ.get('CARSEARCH_BASE_URL')
+        )
         
-        # Output directory (main CarSearch folder)
-        self.output_dir = r"C:\Users\james\Downloads\CarSearch"
+        # Output directory (main CarSearch folder), overridable with CARSEARCH_OUTPUT_ROOT
+        output_root = output_dir or os.environ.get('CARSEARCH_OUTPUT_ROOT')
+        self.output_dir = output_root or r"C:\Users\james\Downloads\CarSearch"
         os.makedirs(self.output_dir, exist_ok=True)
         
         # Daily backups directory
         self.daily_backups_dir = os.path.join(self.output_dir, "daily_backups")
         os.makedirs(self.daily_backups_dir, exist_ok=True)
         
-        # OneDrive backup directory
-        self.onedrive_dir = r"C:\Users\james\OneDrive - Silverdale Medical Limited\CarSearch"
+        # OneDrive backup directory (kept under the output root when one is configured)
+        if onedrive_dir:
+            self.onedrive_dir = onedrive_dir
+        elif output_root:
+            self.onedrive_dir = os.path.join(output_root, "onedrive")
+        else:
+            self.onedrive_dir = r"C:\Users\james\OneDrive - Silverdale Medical Limited\CarSearch"
         os.makedirs(self.onedrive_dir, exist_ok=True)
         
         # 86/BRZ dataset file (saved directly in main folder, no subfolder)
@@ -47,12 +71,197 @@ class StreamlinedMasterScraper:
         
         # OneDrive backup file
         self.onedrive_file = os.path.join(self.onedrive_dir, "86_BRZ_dataset.xlsx")
+        
+        # MinHash signatures used to link relisted cars into one vehicle record
+        self.relisting_index_file = os.path.join(self.output_dir, "relisting_index.pkl")
+        
+        # Optional detail page enrichment (off by default - it fetches one page per new or changed listing)
+        self.enrich_details = False
+        self.detail_cache_file = os.path.join(self.output_dir, "detail_page_cache.json")
+        self.detail_cache_ttl_hours = 168
+        self.detail_fetch_workers = 4
+        
+        # Paging and incremental mode
+        self.max_pages = 10
+        self.incremental_mode = False
+        self.known_run_limit = 10  # Stop paging after this many consecutive already-known listings
+        self.full_sweep_interval_hours = 24
+        self.state_file = os.path.join(self.output_dir, "scrape_state.json")
+        self.swept_models = None
+        self.page_wait_seconds = 5  # Time for results to render after each page load
+        self.model_delay_seconds = 2  # Delay between car models
+        
+        # Page load limits: a hung load is abandoned, retried with jittered backoff and, optionally,
+        # raced against a second browser once it has been slow for hedge_after_seconds (None = off)
+        self.page_load_timeout_seconds = 45
+        self.script_timeout_seconds = 30
+        self.page_retries = 2
+        self.retry_backoff_seconds = 5
+        self.retry_backoff_cap_seconds = 60
+        self.hedge_after_seconds = None
+        # Consecutive failures against one host open its circuit, so a failing site isn't hammered
+        self.breaker = CircuitBreaker(failure_threshold=5, cooldown_seconds=300)
+        self.failed_models = []
+        
+        # Setup Chrome options (lean profile blocks images, fonts, ads and trackers)
+        self.lean_profile = True
+        self.chrome_cache_dir = os.path.join(self.output_dir, "chrome_cache")
+        self.chrome_options = None  # Built on first use so non-scrape commands never import Selenium
+        
+        # Raw card snapshots from each scrape, kept so runs can be replayed offline
+        self.record_raw_cards = True
+        self.raw_scrapes_dir = os.path.join(self.output_dir, "raw_scrapes")
+        self.recorded_cards = []
+        
+        # Per-stage timings and counters, written as a JSON run report and a Prometheus textfile
+        self.metrics = RunMetrics()
+        self.metrics_dir = os.path.join(self.output_dir, "metrics")
+        self.run_report_file = os.path.join(self.metrics_dir, "run_report.json")
+        self.prometheus_file = os.environ.get('CARSEARCH_PROM_TEXTFILE') or os.path.join(self.metrics_dir, "carsearch.prom")
+        
+        # Additional streamed export targets written alongside the xlsx files ('csv', 'jsonl', 'parquet')
+        self.export_formats = []
+        self.export_dir = os.path.join(self.output_dir, "exports")
+        
+        # Listings inactive for longer than this move out of the working dataset into the cold archive
+        self.archive_after_days = 90
+        self.cold_archive_dir = os.path.join(self.output_dir, "cold_archive")
+        # (staged archive file, its rows) from apply_retention, published once the dataset without them is saved
+        self.staged_archive = None
+        
+        # Chunked mode merges into an ID-sorted history CSV in bounded memory; the xlsx then holds active listings only
+        self.chunked_merge = False
+        self.merge_chunk_rows = 50000
+        self.history_file = os.path.join(self.output_dir, "86_BRZ_history.csv")
+        
+        # Deal scoring rules (year, price, kms, transmission, location, seller type); the xlsx highlights their categories
+        self.deal_rules_file = os.environ.get('CARSEARCH_DEAL_RULES') or os.path.join(os.path.dirname(os.path.abspath(__file__)), "deal_rules.json")
+        self.deal_rules = None
+        
+        # Bundled NZ town / region gazetteer; listings get canonical town and region codes and a distance from home
+        self.gazetteer_file = os.environ.get('CARSEARCH_GAZETTEER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), "nz_gazetteer.csv")
+        self.gazetteer = None
+        self.home_location = os.environ.get('CARSEARCH_HOME') or 'Auckland'
+        
+        # Running median price, price per km and active counts per model / year / transmission
+        self.market_stats_file = os.path.join(self.output_dir, "market_stats.json")
+        self.market_stats = None
+        # IDs the last update_dataset changed, and fallback IDs it re-keyed, fed to the market stats
+        self.changed_ids = set()
+        self.rekeyed_ids = set()
+        
+        # First-seen / last-seen interval of every listing ever seen, for point-in-time and time-to-sale queries
+        self.lifetimes_file = os.path.join(self.output_dir, "listing_lifetimes.csv")
+        self.lifetimes = None
+        
+        # Fair-price model refit from each run's new listings; gives active listings an expected price and discount
+        self.fair_price_file = os.path.join(self.output_dir, "fair_price_model.json")
+        self.fair_price_model = None
+        
+        # Rows failing validation are kept out of the merge and recorded here with their reasons
+        self.quarantine_file = os.path.join(self.output_dir, "quarantine.csv")
+        # A model with more of its rows rejected than this is treated as not swept (likely a parser break)
+        self.max_rejection_rate = 0.5
+        
+        # Shared job queue for multi-worker scraping: one job per model and results page, claimed by lease
+        self.queue_file = os.path.join(self.output_dir, "job_queue.sqlite")
+        self.job_results_dir = os.path.join(self.output_dir, "job_results")
+        self.lease_seconds = 300
+        self.max_job_attempts = 3
+        self.queue_poll_seconds = 5
 
-    def generate_unique_id(self, title, location, year):
-        """Generate a unique ID based on listing characteristics (without date to maintain consistency)"""
+    def build_chrome_options(self, lean=True):
+        """Build Chrome options, optionally with the lean profile that skips everything but page text"""
+        from selenium.webdriver.chrome.options import Options
+        
+        options = Options()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--window-size=1920,1080')
+        
+        if lean:
+            # Don't load images at all (blocked again by URL pattern in create_driver)
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            
+            # Browser features a scraper never uses
+            options.add_argument('--disable-extensions')
+            options.add_argument('--disable-background-networking')
+            options.add_argument('--disable-component-update')
+            options.add_argument('--disable-default-apps')
+            options.add_argument('--disable-sync')
+            options.add_argument('--disable-notifications')
+            options.add_argument('--mute-audio')
+            options.add_argument('--no-first-run')
+            options.add_argument('--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions')
+            
+            # Reuse scripts and stylesheets between runs from a persistent on-disk cache
+            os.makedirs(self.chrome_cache_dir, exist_ok=True)
+            options.add_argument(f'--disk-cache-dir={self.chrome_cache_dir}')
+            
+            options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.default_content_setting_values.notifications': 2,
+                'profile.default_content_setting_values.geolocation': 2,
+                'profile.default_content_setting_values.media_stream': 2,
+            })
+        
+        return options
+
+    def create_driver(self):
+        """Start a Chrome driver, blocking unneeded resource types when the lean profile is on"""
+        from selenium import webdriver
+        
+        if self.chrome_options is None:
+            self.chrome_options = self.build_chrome_options(self.lean_profile)
+        driver = webdriver.Chrome(options=self.chrome_options)
+        # A hung page load or script raises a TimeoutException instead of stalling the run
+        driver.set_page_load_timeout(self.page_load_timeout_seconds)
+        driver.set_script_timeout(self.script_timeout_seconds)
+        
+        if self.lean_profile:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URL_PATTERNS})
+            except Exception as e:
+                self.logger.warning(f"Could not enable resource blocking: {e}")
+        
+        return driver
+
+    def use_marketplace(self, name, base_url=None):
+        """Switch to the site adapter registered under name"""
+        self.marketplace = get_adapter(name, base_url)
+        self.base_url = self.marketplace.base_url
+        self.urls = self.marketplace.search_urls()
+
+    def generate_unique_id(self, title, location, year, listing_id='N/A'):
+        """Generate a unique ID, preferring the site's listing ID and falling back to a content hash"""
+        if listing_id and listing_id != 'N/A':
+            # Prefixed so the ID column stays text when the xlsx is read back
+            return self.marketplace.listing_key(listing_id)
+        return self.generate_fallback_id(title, location, year)
+
+    def generate_fallback_id(self, title, location, year):
+        """Generate a content hash ID based on listing characteristics (without date to maintain consistency)"""
         unique_string = f"{title}_{location}_{year}"
         return hashlib.md5(unique_string.encode()).hexdigest()[:12].upper()
 
+    def find_listing_href(self, listing_element):
+        """Find the href of the listing anchor wrapping (or inside) a search card"""
+        try:
+            return self.marketplace.find_listing_href(listing_element)
+        except Exception as e:
+            self.logger.debug(f"Could not find listing anchor: {e}")
+        return None
+
+    def extract_listing_link(self, listing_element):
+        """Extract the site's listing ID and URL from a search card"""
+        return self.marketplace.parse_listing_href(self.find_listing_href(listing_element))
+
+    def snapshot_card(self, listing_element, car_model):
+        """Copy a card's text and listing link out of the browser so it can be parsed and recorded"""
+        return RecordedCard(listing_element.text, self.find_listing_href(listing_element), car_model)
+
 
     def generate_search_terms(self, title, location, year, brand, car_model):
         """Generate search terms and URLs to help find the original listing"""
@@ -85,26 +294,14 @@ class StreamlinedMasterScraper:
             # Remove duplicates and limit to 5 best search terms
             unique_terms = list(dict.fromkeys(search_terms))[:5]
             
-            # Create TradeMe search URLs
-            trademe_urls = []
-            for term in unique_terms[:3]:  # Top 3 terms for TradeMe
-                encoded_term = term.replace(' ', '+')
-                trademe_url = f"https://www.trademe.co.nz/a/motors/cars/search?search_string={encoded_term}"
-                trademe_urls.append(trademe_url)
+            # Create site search URLs (kept in the trademe_* columns whatever the site)
+            trademe_urls = [self.marketplace.site_search_url(term) for term in unique_terms[:3]]  # Top 3 terms for the site
             
             # Create Google search URLs
-            google_urls = []
-            for term in unique_terms[:3]:  # Top 3 terms for Google
-                encoded_term = term.replace(' ', '+')
-                google_url = f"https://www.google.com/search?q={encoded_term}+site:trademe.co.nz"
-                google_urls.append(google_url)
+            google_urls = [self.marketplace.web_search_url(term) for term in unique_terms[:3]]  # Top 3 terms for Google
             
             # Create Google Images search URLs
-            google_images_urls = []
-            for term in unique_terms[:2]:  # Top 2 terms for Google Images
-                encoded_term = term.replace(' ', '+')
-                google_images_url = f"https://www.google.com/search?q={encoded_term}+site:trademe.co.nz&tbm=isch"
-                google_images_urls.append(google_images_url)
+            google_images_urls = [self.marketplace.web_search_url(term, images=True) for term in unique_terms[:2]]  # Top 2 terms for Google Images
             
             return {
                 'search_terms': ' | '.join(unique_terms),
@@ -149,12 +346,12 @@ class StreamlinedMasterScraper:
             title = lines[0] if lines else 'N/A'
             data['title'] = title
             
-            # Extract year from title using regex
+            # Extract year from title: cards lead with it, and a number later on is more likely a trim or engine name
             year = 'N/A'
             if title != 'N/A':
-                year_match = re.search(r'\b(19|20)\d{2}\b', title)
+                year_match = re.match(r'\s*((?:19|20)\d{2})\b', title) or re.search(r'\b((?:19|20)\d{2})\b(?![.,]?\d|\s*(?:cc|km|hp|kw)\b)', title, re.IGNORECASE)
                 if year_match:
-                    year = year_match.group()
+                    year = year_match.group(1)
             data['year'] = year
             
             # Extract brand
@@ -165,29 +362,18 @@ class StreamlinedMasterScraper:
             mileage_found = False
             
             for line in lines:
-                # Look for patterns like "50,000 km", "50000km", "Low kms", etc.
-                mileage_patterns = [
-                    r'(\d{1,3}(?:,\d{3})*)\s*km',  # 50,000 km
-                    r'(\d+)\s*km',                   # 50000 km
-                    r'(\d{1,3}(?:,\d{3})*)km',      # 50,000km
-                    r'(\d+)km'                      # 50000km
-                ]
-                
-                for pattern in mileage_patterns:
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        mileage_text = match.group(1).replace(',', '')
-                        mileage_found = True
-                        break
-                
-                if mileage_found:
+                # Whole numbers only, like "50,000 km", "50000km" or "66987 kms" (never the tail of a longer number)
+                match = re.search(r'\b(\d{1,3}(?:,\d{3})+|\d+)\s*kms?\b', line, re.IGNORECASE)
+                if match:
+                    mileage_text = match.group(1).replace(',', '')
+                    mileage_found = True
                     break
             
-            # If no mileage found, check for "low km" indicators
+            # "Low kms" isn't a reading, so kms stays unknown and the claim goes in the notes
             if not mileage_found:
                 for line in lines:
-                    if re.search(r'\b(low|super low|very low)\s*km\b', line, re.IGNORECASE):
-                        mileage_text = 'Low km'
+                    if re.search(r'\b(low|super low|very low)\s*kms?\b', line, re.IGNORECASE):
+                        notes.append('Low km (no odometer reading)')
                         break
             
             data['kms'] = mileage_text
@@ -212,22 +398,20 @@ class StreamlinedMasterScraper:
             
             data['price'] = price_text
             
-            # Intelligent location extraction
+            # Location: the first line naming a gazetteer town or region, normalized to canonical town and region
             location_text = 'N/A'
-            nz_cities = ['auckland', 'wellington', 'christchurch', 'hamilton', 'tauranga', 'dunedin', 
-                        'palmerston north', 'napier', 'hastings', 'nelson', 'rotorua', 'new plymouth',
-                        'whangarei', 'invercargill', 'upper hutt', 'lower hutt', 'porirua']
-            
+            place = None
+            gazetteer = self.load_gazetteer()
             for line in lines:
-                line_lower = line.lower()
-                for city in nz_cities:
-                    if city in line_lower:
-                        location_text = line
-                        break
-                if location_text != 'N/A':
+                place = gazetteer.resolve(line)
+                if place is not None:
+                    location_text = line
                     break
             
             data['location'] = location_text
+            data['town'] = place['town'] if place else 'N/A'
+            data['region'] = place['region'] if place else 'N/A'
+            data['region_code'] = place['region_code'] if place else 'N/A'
             
             # Extract additional car details from title/description with improved patterns
             transmission = 'N/A'
@@ -342,8 +526,13 @@ class StreamlinedMasterScraper:
             data['fuel_type'] = fuel_type
             data['body_style'] = body_style
             
-            # Generate unique ID
-            data['ID'] = self.generate_unique_id(data['title'], data['location'], data['year'])
+            # Extract the real listing ID and URL from the card anchor
+            listing_id, listing_url = self.extract_listing_link(listing_element)
+            data['listing_id'] = listing_id
+            data['listing_url'] = listing_url
+            
+            # Generate unique ID (the site's listing ID when available, content hash otherwise)
+            data['ID'] = self.generate_unique_id(data['title'], data['location'], data['year'], listing_id)
             
             # Set car_model before generating search terms
             data['car_model'] = car_model
@@ -353,8 +542,13 @@ class StreamlinedMasterScraper:
             data['is_auction'] = is_auction
             data['price_type'] = 'Auction' if is_auction else 'Buy Now'
             
-            # Determine seller type
-            is_dealer = any(word in full_text.lower() for word in ['dealer', 'motors', 'cars', 'auto', 'ltd', 'limited'])
+            # Determine seller type: a dealer badge, or a short business-name line after the title
+            # (whole words only - "Automatic", "GT Limited" and "cars" in a sentence are not dealers)
+            is_dealer = any(
+                re.search(r'\b(dealer|dealership)\b', line, re.IGNORECASE)
+                or re.fullmatch(r'(?:\S+\s+){1,4}(?:motors|motor group|cars|autos?|auto traders|car centre|car sales|ltd|limited)', line, re.IGNORECASE)
+                for line in lines[1:]
+            )
             data['seller_type'] = 'Dealer' if is_dealer else 'Private'
             data['is_dealer'] = is_dealer
             
@@ -489,8 +683,6 @@ class StreamlinedMasterScraper:
                         break
             
             # Additional fields
-            data['listing_url'] = 'N/A'
-            data['listing_id'] = 'N/A'
             data['listing_time'] = listing_time
             data['listing_date'] = listing_date
             data['auction_end_time'] = auction_end_time
@@ -499,7 +691,7 @@ class StreamlinedMasterScraper:
             data['listing_end_date'] = listing_end_date
             data['scrape_date'] = datetime.now().strftime('%Y-%m-%d')
             data['scrape_time'] = datetime.now().strftime('%H:%M:%S')
-            data['last_seen'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            data['first_seen'] = data['last_seen'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             data['is_active'] = True
             
             # Generate search terms and URLs for finding the original listing
@@ -518,53 +710,243 @@ class StreamlinedMasterScraper:
             self.logger.error(f"Error extracting listing data: {e}")
             return None
 
-    def scrape_car_listings(self, car_model, url):
-        """Scrape listings for a specific car model"""
+    def build_page_url(self, url, page, newest_first=False):
+        """Build the URL for a results page, optionally sorted newest first"""
+        return self.marketplace.build_page_url(url, page, newest_first)
+
+    def fetch_hedged(self, driver, car_model, page_url):
+        """Point driver at page_url; once that has been slow for hedge_after_seconds, race a second browser
+        
+        Returns whichever driver loaded the page first and quits the other, so the caller
+        must carry on with the returned driver. When both fail, the hedge is quit and the
+        first error raised; the caller's driver is left for it to retry or quit.
+        """
+        import queue
+        import threading
+        
+        if not self.hedge_after_seconds:
+            self.marketplace.fetch_page(driver, page_url)
+            return driver
+        
+        # A driver can't be shared between threads, so each attempt gets its own browser
+        results = queue.Queue()
+        def attempt(attempt_driver):
+            try:
+                self.marketplace.fetch_page(attempt_driver, page_url)
+                results.put((attempt_driver, None))
+            except Exception as e:
+                results.put((attempt_driver, e))
+        
+        threading.Thread(target=attempt, args=(driver,), daemon=True).start()
+        try:
+            winner, error = results.get(timeout=self.hedge_after_seconds)
+        except queue.Empty:
+            pass
+        else:
+            if error is not None:
+                raise error
+            return winner
+        
+        self.logger.info(f"Page load slower than {self.hedge_after_seconds}s, hedging: {page_url}")
+        self.metrics.incr('page_load_hedges', model=car_model)
+        with self.metrics.stage('chrome_startup', model=car_model):
+            hedge = self.create_driver()
+        threading.Thread(target=attempt, args=(hedge,), daemon=True).start()
+        
+        first_error = None
+        for _ in range(2):
+            finished, error = results.get()
+            if error is None:
+                loser = hedge if finished is driver else driver
+                if finished is hedge:
+                    self.metrics.incr('page_load_hedge_wins', model=car_model)
+                # The losing load may still be running; quitting the browser ends it
+                threading.Thread(target=self.quit_driver, args=(loser,), daemon=True).start()
+                return finished
+            first_error = first_error or error
+        self.quit_driver(hedge)
+        raise first_error
+
+    def quit_driver(self, driver):
+        """Quit a browser, ignoring errors from one that has already died"""
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.debug(f"Error quitting browser: {e}")
+
+    def open_results_page(self, driver, car_model, page_url):
+        """Load one results page within the retry budget and the host's circuit breaker
+        
+        Returns the driver now showing the page (a hedged attempt may have replaced the one
+        passed in). Raises CircuitOpenError only when the host's circuit was open before
+        this page was tried at all; otherwise the last load error once the retries are used
+        up, even if those failures are what opened the circuit.
+        """
+        last_error = None
+        for attempt in range(self.page_retries + 1):
+            try:
+                self.breaker.check(page_url)
+            except CircuitOpenError:
+                # This page's own failed loads (or failed half-open probe) opened the circuit, so
+                # report the load failure: the page was tried and must be charged for it
+                if last_error is not None:
+                    raise last_error
+                raise
+            try:
+                with self.metrics.stage('page_load', model=car_model):
+                    driver = self.fetch_hedged(driver, car_model, page_url)
+            except Exception as e:
+                last_error = e
+                self.breaker.failure(page_url)
+                self.metrics.incr('page_load_failures', model=car_model)
+                if attempt == self.page_retries:
+                    raise
+                delay = backoff_delay(attempt, self.retry_backoff_seconds, self.retry_backoff_cap_seconds)
+                self.logger.warning(f"Loading {page_url} failed (attempt {attempt + 1}): {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            
+            self.breaker.success(page_url)
+            break
+        
+        self.metrics.incr('pages_loaded', model=car_model)
+        self.logger.info(f"Navigated to: {page_url}")
+        
+        # Wait for page to load
+        with self.metrics.stage('page_wait', model=car_model):
+            time.sleep(self.page_wait_seconds)
+        return driver
+
+    def scrape_car_listings(self, car_model, url, known_ids=None):
+        """Scrape listings for a specific car model, stopping early on known listings when known_ids is given
+        
+        A model whose pages could not all be read is added to failed_models; the listings
+        read before the failure are still returned.
+        """
         self.logger.info(f"Starting scrape for {car_model}")
         
-        driver = webdriver.Chrome(options=self.chrome_options)
         all_listings = []
+        incremental = known_ids is not None
         
+        # Don't start a browser for a site whose circuit is already open
         try:
-            # Navigate to the page
-            driver.get(url)
-            self.logger.info(f"Navigated to: {url}")
-            
-            # Wait for page to load
-            time.sleep(5)
-            
-            # Look for listings
-            listings = driver.find_elements(By.CSS_SELECTOR, '.tm-motors-tier-one-search-card__listing-details-container')
-            
-            if not listings:
-                self.logger.warning(f"No listings found for {car_model}")
-                return all_listings
-            
-            self.logger.info(f"Found {len(listings)} listings for {car_model}")
+            self.breaker.check(url)
+        except CircuitOpenError as e:
+            self.logger.error(f"Not scraping {car_model}: {e}")
+            self.metrics.incr('scrape_errors', model=car_model)
+            self.failed_models.append(car_model)
+            return all_listings
+        
+        with self.metrics.stage('chrome_startup', model=car_model):
+            driver = self.create_driver()
+        
+        try:
+            consecutive_known = 0
             
-            # Extract data from each listing
-            for i, listing in enumerate(listings[:20]):  # Limit to first 20 listings
-                try:
-                    listing_data = self.extract_listing_data(listing, car_model)
-                    if listing_data:
-                        all_listings.append(listing_data)
-                        self.logger.info(f"Extracted listing {i+1}: {listing_data.get('title', 'N/A')[:50]}...")
-                except Exception as e:
-                    self.logger.error(f"Error processing listing {i+1}: {e}")
-                    continue
+            for page in range(1, self.max_pages + 1):
+                page_url = self.build_page_url(url, page, newest_first=incremental)
+                driver = self.open_results_page(driver, car_model, page_url)
+                listings = self.marketplace.find_cards(driver)
+                
+                if not listings:
+                    if page == 1:
+                        self.logger.warning(f"No listings found for {car_model}")
+                    break
+                
+                self.logger.info(f"Found {len(listings)} listings for {car_model} on page {page}")
+                self.metrics.incr('listings_found', len(listings), model=car_model)
+                
+                # Extract data from each listing
+                reached_known = False
+                with self.metrics.stage('parse', model=car_model):
+                    for i, listing in enumerate(listings):
+                        try:
+                            # One browser round trip per card, then parse the plain snapshot
+                            card = self.snapshot_card(listing, car_model)
+                            if self.record_raw_cards:
+                                self.recorded_cards.append(card)
+                            listing_data = self.extract_listing_data(card, car_model)
+                            if listing_data:
+                                all_listings.append(listing_data)
+                                self.metrics.incr('listings_parsed', model=car_model)
+                                self.logger.info(f"Extracted listing {i+1}: {listing_data.get('title', 'N/A')[:50]}...")
+                                
+                                # Newest-first results: a run of known IDs means everything after it is known too
+                                if incremental:
+                                    if listing_data['ID'] in known_ids:
+                                        consecutive_known += 1
+                                    else:
+                                        consecutive_known = 0
+                                    if consecutive_known >= self.known_run_limit:
+                                        reached_known = True
+                                        break
+                            else:
+                                self.metrics.incr('parse_failures', model=car_model)
+                        except Exception as e:
+                            self.metrics.incr('parse_failures', model=car_model)
+                            self.logger.error(f"Error processing listing {i+1}: {e}")
+                            continue
+                
+                if reached_known:
+                    self.logger.info(f"Reached {consecutive_known} known listings in a row on page {page}, stopping early")
+                    break
+            else:
+                # The last allowed page still had cards, so listings past it were never seen
+                if not incremental:
+                    self.metrics.incr('page_limit_reached', model=car_model)
+                    self.logger.warning(f"{car_model} still had listings on page {self.max_pages} (max_pages), not a full sweep")
+                    self.failed_models.append(car_model)
             
             self.logger.info(f"Successfully extracted {len(all_listings)} listings for {car_model}")
             
         except Exception as e:
-            self.logger.error(f"Error scraping {car_model}: {e}")
+            # Unread pages may still hold listings, so the model counts as not scraped rather than empty
+            self.metrics.incr('scrape_errors', model=car_model)
+            self.logger.error(f"Error scraping {car_model} ({len(all_listings)} listings read before the failure): {e}")
+            self.failed_models.append(car_model)
         
         finally:
-            driver.quit()
+            self.quit_driver(driver)
         
         return all_listings
 
+    def load_scrape_state(self):
+        """Load the persisted scrape state (last full sweep time)"""
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                self.logger.error(f"Error loading scrape state: {e}")
+        return {}
+
+    def save_scrape_state(self, state):
+        """Persist the scrape state"""
+        try:
+            with open(self.state_file, 'w') as f:
+                json.dump(state, f, indent=2)
+        except Exception as e:
+            self.logger.error(f"Error saving scrape state: {e}")
+
+    def is_full_sweep_due(self):
+        """Check whether this run should re-read every results page to refresh active/inactive status"""
+        if not self.incremental_mode:
+            return True
+        
+        last_full_sweep = self.load_scrape_state().get('last_full_sweep')
+        if not last_full_sweep:
+            return True
+        
+        try:
+            elapsed = datetime.now() - datetime.strptime(last_full_sweep, '%Y-%m-%d %H:%M:%S')
+            return elapsed >= timedelta(hours=self.full_sweep_interval_hours)
+        except ValueError:
+            return True
+
     def load_existing_dataset(self):
         """Load existing master dataset if it exists"""
+        import pandas as pd
+        
         if os.path.exists(self.master_file):
             try:
                 df = pd.read_excel(self.master_file)
@@ -577,41 +959,77 @@ class StreamlinedMasterScraper:
             self.logger.info("No existing dataset found, creating new one")
             return pd.DataFrame()
 
-    def update_dataset(self, new_data):
-        """Update the master dataset with new data, preserving existing information"""
+    def update_dataset(self, new_data, swept_models=None):
+        """Update the master dataset with new data, preserving existing information
+        
+        Listings missing from the new data are marked inactive only for car models in
+        swept_models (all models when None), since a partial scrape can't tell they have gone.
+        """
+        import pandas as pd
+        
         # Load existing data
         existing_df = self.load_existing_dataset()
         
         if existing_df.empty:
             # Create new dataset
             updated_df = pd.DataFrame(new_data)
+            self.metrics.incr('rows_inserted', len(updated_df))
+            self.changed_ids = set(updated_df['ID']) if 'ID' in updated_df.columns else set()
+            self.rekeyed_ids = set()
         else:
             # Convert new data to DataFrame
             new_df = pd.DataFrame(new_data)
             
-            # Create a copy of existing data to work with
-            updated_df = existing_df.copy()
+            # Create a copy of existing data to work with (rows saved before first_seen existed get an estimate)
+            updated_df = fill_first_seen(existing_df)
+            
+            # Rows this merge touches (seen again, new or gone inactive), for incremental consumers
+            self.changed_ids = set(new_df['ID']) if 'ID' in new_df.columns else set()
+            self.rekeyed_ids = set()
+            
+            # Mark existing listings of fully swept models as potentially inactive first
+            was_active = updated_df['is_active'].astype(str).str.lower() == 'true'
+            if swept_models is None:
+                self.changed_ids.update(updated_df.loc[was_active, 'ID'])
+                updated_df['is_active'] = False
+            elif swept_models:
+                swept = updated_df['car_model'].isin(swept_models)
+                self.changed_ids.update(updated_df.loc[was_active & swept, 'ID'])
+                updated_df.loc[swept, 'is_active'] = False
             
-            # Mark all existing listings as potentially inactive first
-            updated_df['is_active'] = False
+            # Index existing rows by ID so each upsert is a dict lookup rather than a column scan
+            id_index = {}
+            for idx, row_id in zip(updated_df.index, updated_df['ID']):
+                id_index.setdefault(row_id, idx)
+            
+            new_rows = {}
             
             # Process each new listing
             for _, new_row in new_df.iterrows():
                 new_id = new_row['ID']
+                existing_idx = id_index.get(new_id)
                 
-                # Check if this listing already exists
-                existing_mask = updated_df['ID'] == new_id
-                existing_indices = updated_df[existing_mask].index
+                # Rows saved before listing IDs were extracted are keyed by the content hash,
+                # so adopt them under the real listing ID instead of treating them as new
+                if existing_idx is None and new_row.get('listing_id', 'N/A') not in ('N/A', '', None):
+                    fallback_id = self.generate_fallback_id(new_row['title'], new_row['location'], new_row['year'])
+                    existing_idx = id_index.pop(fallback_id, None)
+                    if existing_idx is not None:
+                        id_index[new_id] = existing_idx
+                        self.rekeyed_ids.add(fallback_id)
+                        self.logger.info(f"Re-keyed listing {fallback_id} as {new_id}")
                 
-                if len(existing_indices) > 0:
+                if existing_idx is not None:
                     # Listing exists - update it while preserving important data
-                    existing_idx = existing_indices[0]
+                    self.metrics.incr('rows_updated')
                     
                     # Preserve important historical data
                     preserved_price = updated_df.loc[existing_idx, 'price']
                     preserved_kms = updated_df.loc[existing_idx, 'kms']
+                    preserved_year = updated_df.loc[existing_idx, 'year']
                     preserved_listing_date = updated_df.loc[existing_idx, 'listing_date']
                     preserved_listing_time = updated_df.loc[existing_idx, 'listing_time']
+                    preserved_first_seen = updated_df.loc[existing_idx, 'first_seen']
                     
                     # Update the existing row with new data
                     updated_df.loc[existing_idx] = new_row
@@ -621,10 +1039,14 @@ class StreamlinedMasterScraper:
                         updated_df.loc[existing_idx, 'price'] = preserved_price
                     if pd.isna(new_row['kms']) or new_row['kms'] == 'N/A' or new_row['kms'] == '':
                         updated_df.loc[existing_idx, 'kms'] = preserved_kms
+                    if pd.isna(new_row['year']) or new_row['year'] == 'N/A' or new_row['year'] == '':
+                        updated_df.loc[existing_idx, 'year'] = preserved_year
                     if pd.isna(new_row['listing_date']) or new_row['listing_date'] == 'N/A':
                         updated_df.loc[existing_idx, 'listing_date'] = preserved_listing_date
                     if pd.isna(new_row['listing_time']) or new_row['listing_time'] == 'N/A':
                         updated_df.loc[existing_idx, 'listing_time'] = preserved_listing_time
+                    if not pd.isna(preserved_first_seen) and preserved_first_seen != 'N/A':
+                        updated_df.loc[existing_idx, 'first_seen'] = preserved_first_seen
                     
                     # Mark as active since we found it again
                     updated_df.loc[existing_idx, 'is_active'] = True
@@ -633,14 +1055,313 @@ class StreamlinedMasterScraper:
                     updated_df.loc[existing_idx, 'last_seen'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     
                 else:
-                    # New listing - add it
-                    updated_df = pd.concat([updated_df, new_row.to_frame().T], ignore_index=True)
+                    # New listing - collect it and append all new rows in one concat
+                    new_rows[new_id] = new_row
+            
+            if new_rows:
+                updated_df = pd.concat([updated_df, pd.DataFrame(list(new_rows.values()))], ignore_index=True)
+            self.metrics.incr('rows_inserted', len(new_rows))
             
             # Remove any duplicate IDs (keep the most recent)
             updated_df = updated_df.drop_duplicates(subset=['ID'], keep='first')
         
+        # Link relisted cars to the vehicle record of their earlier listing
+        scraped_ids = {row['ID'] for row in new_data}
+        updated_df = self.link_relistings(updated_df, scraped_ids)
+        
         return updated_df
 
+    def link_relistings(self, df, scraped_ids=None):
+        """Assign a vehicle_id to every listing, reusing the vehicle_id of near-duplicate earlier listings"""
+        if df.empty:
+            return df
+        
+        try:
+            detector = RelistingDetector()
+            detector.load(self.relisting_index_file)
+            
+            linked_count = self.assign_vehicle_ids(df, detector, scraped_ids)
+            detector.save(self.relisting_index_file)
+            self.logger.info(f"Relisting detection linked {linked_count} listings to earlier vehicles")
+            
+        except Exception as e:
+            self.logger.error(f"Error linking relistings: {e}")
+        
+        return df
+
+    def assign_vehicle_ids(self, df, detector, scraped_ids=None):
+        """Fill df's vehicle_id column from the relisting detector, returning how many listings were linked
+        
+        Listings in scraped_ids (the current scrape; df's active rows when not given) are on
+        sale now, so neither they nor the vehicles they hold are taken as the earlier
+        listing of a relisted car.
+        """
+        if scraped_ids is None:
+            scraped_ids = set(df.loc[df['is_active'].astype(str).str.lower() == 'true', 'ID'])
+        taken_vehicles = {detector.entries[listing_id][0] for listing_id in scraped_ids if listing_id in detector.entries}
+        vehicle_ids = []
+        linked_count = 0
+        for row in df.to_dict('records'):
+            listing_id = row['ID']
+            
+            # Already indexed on an earlier run - keep its vehicle record
+            if listing_id in detector.entries:
+                vehicle_ids.append(detector.entries[listing_id][0])
+                continue
+            
+            # Not indexed but linked before (the index was rebuilt) - keep the record and re-index it
+            known_vehicle_id = row.get('vehicle_id')
+            if isinstance(known_vehicle_id, str) and known_vehicle_id not in ('', 'N/A'):
+                vehicle_ids.append(known_vehicle_id)
+                detector.add(listing_id, known_vehicle_id, row)
+                if listing_id in scraped_ids:
+                    taken_vehicles.add(known_vehicle_id)
+                continue
+            
+            vehicle_id = detector.find_match(listing_id, row, scraped_ids, taken_vehicles)
+            if vehicle_id is None:
+                vehicle_id = listing_id
+            else:
+                linked_count += 1
+                self.logger.info(f"Linked listing {listing_id} to vehicle {vehicle_id} as a relisting")
+            
+            vehicle_ids.append(vehicle_id)
+            detector.add(listing_id, vehicle_id, row)
+            if listing_id in scraped_ids:
+                taken_vehicles.add(vehicle_id)
+        
+        df['vehicle_id'] = vehicle_ids
+        return linked_count
+
+    def bootstrap_history_file(self):
+        """Seed the history CSV from the master xlsx, sorted by ID as the chunked merge needs"""
+        df = self.load_existing_dataset()
+        if df.empty:
+            return
+        
+        df = df.copy()
+        df['ID'] = df['ID'].astype(str)
+        df.sort_values('ID', kind='mergesort').to_csv(self.history_file, index=False)
+        self.logger.info(f"Seeded history file with {len(df)} listings from: {self.master_file}")
+
+    def load_known_ids(self):
+        """IDs already in the dataset, read from the history CSV's ID column in chunked mode"""
+        import pandas as pd
+        
+        if self.chunked_merge and os.path.exists(self.history_file) and os.path.getsize(self.history_file) > 0:
+            return set(pd.read_csv(self.history_file, usecols=['ID'], dtype=str)['ID'])
+        
+        existing_df = self.load_existing_dataset()
+        return set(existing_df['ID']) if 'ID' in existing_df.columns else set()
+
+    def update_history_chunked(self, new_data, swept_models=None):
+        """Merge new data into the history CSV chunk by chunk and return the active listings
+        
+        Vehicle IDs are assigned and long-inactive rows archived per chunk, so neither the
+        full history nor the relisting pass ever needs the whole dataset in memory.
+        """
+        import pandas as pd
+        
+        if not os.path.exists(self.history_file):
+            self.bootstrap_history_file()
+        
+        detector = RelistingDetector()
+        detector.load(self.relisting_index_file)
+        cold_archive = ColdArchive(self.cold_archive_dir)
+        active_frames = []
+        staged_files = []
+        archived_count = 0
+        chunk_count = 0
+        
+        market_stats = self.load_market_stats()
+        fair_price_model = self.load_fair_price_model()
+        lifetimes = self.load_lifetimes()
+        gazetteer = self.load_gazetteer()
+        
+        # Empty stats (first run, or an older stats file) are seeded from every row, after that
+        # only the rows the merge changed are fed to them
+        seed_market_stats = not market_stats.listings
+        
+        scraped_ids = {str(listing['ID']) for listing in new_data}
+        
+        def on_chunk(chunk):
+            nonlocal archived_count, chunk_count
+            self.assign_vehicle_ids(chunk, detector, scraped_ids)
+            chunk = fill_first_seen(chunk)
+            market_stats.update(chunk if seed_market_stats else chunk[chunk['ID'].isin(merger.changed_ids)])
+            fair_price_model.update(chunk)
+            lifetimes.update(gazetteer.locate(chunk))
+            
+            # Stage each chunk's cold rows before the new history is swapped in, publishing them once it is
+            if self.archive_after_days:
+                chunk, cold_df = cold_archive.split_cold(chunk, self.archive_after_days)
+                if not cold_df.empty:
+                    staged_files.append(cold_archive.stage(cold_df, part=chunk_count))
+                    market_stats.forget(cold_df['ID'])
+                    archived_count += len(cold_df)
+            
+            active_frames.append(chunk[chunk['is_active'] == True])
+            chunk_count += 1
+            return chunk
+        
+        # Rows saved before listing IDs were extracted are keyed by the content hash (as in update_dataset)
+        fallback_ids = {
+            self.generate_fallback_id(listing['title'], listing['location'], listing['year']): listing['ID']
+            for listing in new_data if listing.get('listing_id', 'N/A') not in ('N/A', '', None)
+        }
+        
+        merger = ChunkedHistoryMerger(self.merge_chunk_rows)
+        try:
+            merger.merge(self.history_file, new_data, self.history_file, swept_models, on_chunk, fallback_ids)
+        except Exception:
+            # The old history still holds the cold rows
+            cold_archive.discard(staged_files)
+            raise
+        cold_archive.publish(staged_files)
+        detector.save(self.relisting_index_file)
+        market_stats.forget(merger.rekeyed_ids)
+        market_stats.save(self.market_stats_file)
+        lifetimes.save(self.lifetimes_file)
+        self.refit_fair_price_model()
+        
+        self.metrics.incr('merge_chunks', chunk_count)
+        self.metrics.incr('rows_inserted', merger.rows_inserted)
+        self.metrics.incr('rows_updated', merger.rows_updated)
+        if archived_count:
+            self.metrics.incr('rows_archived', archived_count)
+            self.logger.info(f"Archived {archived_count} listings inactive for over {self.archive_after_days} days")
+        
+        if not active_frames:
+            return pd.DataFrame()
+        return pd.concat(active_frames, ignore_index=True)
+
+    def validate_new_data(self, new_data, swept_models=None):
+        """Quarantine rows that fail validation; returns (rows to merge, models still counted as swept)"""
+        validator = ListingValidator({car_model for adapter in ADAPTERS.values() for car_model in adapter.model_paths})
+        accepted, quarantine = validator.validate(new_data)
+        validator.log_report()
+        
+        for car_model, counts in validator.report.items():
+            self.metrics.incr('validation_rows', counts['rows'], model=car_model)
+            self.metrics.incr('validation_rows_rejected', counts['rejected'], model=car_model)
+            self.metrics.incr('validation_rows_withheld', counts['withheld'], model=car_model)
+            self.metrics.set('validation_rejection_rate', validator.rejection_rate(car_model), model=car_model)
+        for (field, rule), count in quarantine.groupby(['field', 'rule']).size().items():
+            self.metrics.incr('validation_failures', int(count), field=field, rule=rule)
+        
+        if not quarantine.empty:
+            try:
+                append_quarantine(self.quarantine_file, quarantine)
+                self.logger.warning(f"Quarantined {len(quarantine)} values from {quarantine['ID'].nunique()} listings to: {self.quarantine_file}")
+            except Exception as e:
+                self.logger.error(f"Error writing quarantine table: {e}")
+        
+        # Mostly rejected rows suggest the parser broke, not that the listings are gone
+        suspect = sorted(car_model for car_model in validator.report if validator.rejection_rate(car_model) > self.max_rejection_rate)
+        if suspect and swept_models != []:
+            self.logger.warning(f"Over {self.max_rejection_rate:.0%} of rows rejected, not marking listings inactive for: {suspect}")
+            if swept_models is None:
+                swept_models = sorted(set(validator.report) | set(self.urls))
+            swept_models = [car_model for car_model in swept_models if car_model not in suspect]
+        
+        return accepted.to_dict('records'), swept_models
+
+    def merge_new_data(self, new_data, swept_models=None):
+        """Validate a scrape, merge it into the dataset and apply the retention policy, returning the rows to save"""
+        with self.metrics.stage('validate'):
+            new_data, swept_models = self.validate_new_data(new_data, swept_models)
+        
+        if self.chunked_merge:
+            with self.metrics.stage('update_dataset', mode='chunked'):
+                return self.update_history_chunked(new_data, swept_models)
+        
+        with self.metrics.stage('update_dataset'):
+            updated_df = self.update_dataset(new_data, swept_models)
+        
+        with self.metrics.stage('market_stats'):
+            self.update_market_stats(updated_df)
+        
+        with self.metrics.stage('fair_price_fit'):
+            self.update_fair_price_model(updated_df)
+        
+        with self.metrics.stage('lifetimes'):
+            self.update_lifetimes(updated_df)
+        
+        # Move long-inactive listings to the cold archive
+        with self.metrics.stage('archive'):
+            return self.apply_retention(updated_df)
+
+    def load_market_stats(self):
+        """Load the persisted market statistics once per run"""
+        if self.market_stats is None:
+            self.market_stats = MarketStats()
+            self.market_stats.load(self.market_stats_file)
+        return self.market_stats
+
+    def load_lifetimes(self):
+        """Load the persisted listing lifetimes once per run"""
+        if self.lifetimes is None:
+            self.lifetimes = LifetimeIndex()
+            self.lifetimes.load(self.lifetimes_file)
+        return self.lifetimes
+
+    def update_lifetimes(self, df):
+        """Extend every merged listing's first-seen / last-seen interval and persist the index"""
+        try:
+            lifetimes = self.load_lifetimes()
+            lifetimes.update(self.load_gazetteer().locate(df))
+            lifetimes.save(self.lifetimes_file)
+        except Exception as e:
+            self.logger.error(f"Error updating listing lifetimes: {e}")
+
+    def load_fair_price_model(self):
+        """Load the persisted fair-price model once per run"""
+        if self.fair_price_model is None:
+            self.fair_price_model = FairPriceModel()
+            self.fair_price_model.load(self.fair_price_file)
+        return self.fair_price_model
+
+    def update_fair_price_model(self, df):
+        """Add listings priced for the first time to the fair-price model and refit it"""
+        try:
+            added = self.load_fair_price_model().update(df)
+            self.metrics.incr('fair_price_rows_added', added)
+            self.refit_fair_price_model()
+        except Exception as e:
+            self.logger.error(f"Error updating fair-price model: {e}")
+
+    def refit_fair_price_model(self):
+        """Solve the fair-price model from its accumulated sums and persist it"""
+        model = self.load_fair_price_model()
+        if model.refit():
+            coefficients = ', '.join(f"{name}={value:.4f}" for name, value in zip(FAIR_PRICE_FEATURES, model.coefficients))
+            self.logger.info(f"Fair-price model refit on {model.count} listings: {coefficients}")
+        model.save(self.fair_price_file)
+
+    def estimate_fair_prices(self, df):
+        """Add expected_price and discount_pct for active Buy Now listings (auctions stay blank)"""
+        try:
+            with self.metrics.stage('fair_price_score'):
+                return self.load_fair_price_model().estimate(df)
+        except Exception as e:
+            self.logger.error(f"Error estimating fair prices: {e}")
+            return df
+
+    def update_market_stats(self, df):
+        """Fold the rows this run's merge changed into the market statistics and persist them"""
+        try:
+            market_stats = self.load_market_stats()
+            market_stats.forget(self.rekeyed_ids)
+            # Empty stats (first run, or an older stats file) are seeded from every row
+            if market_stats.listings and 'ID' in df.columns:
+                df = df[df['ID'].isin(self.changed_ids)]
+            changed = market_stats.update(df)
+            market_stats.save(self.market_stats_file)
+            self.metrics.incr('market_stats_changes', changed)
+            self.logger.info(f"Market stats updated from {changed} changed listings")
+        except Exception as e:
+            self.logger.error(f"Error updating market stats: {e}")
+
     def clean_and_format_data(self, df):
         """Clean and format data for proper Excel number formatting"""
         try:
@@ -651,10 +1372,10 @@ class StreamlinedMasterScraper:
             cleaned_df['year'] = cleaned_df['year'].apply(lambda x: self.clean_number(x, 'year'))
             
             # Clean mileage column - extract numbers from text like "50,000 km"
-            cleaned_df['kms'] = cleaned_df['kms'].apply(lambda x: self.clean_mileage(x))
+            cleaned_df['kms'] = cleaned_df['kms'].apply(self.clean_mileage)
             
             # Clean price column - extract numbers from text like "$25,000"
-            cleaned_df['price'] = cleaned_df['price'].apply(lambda x: self.clean_price(x))
+            cleaned_df['price'] = cleaned_df['price'].apply(self.clean_price)
             
             self.logger.info("Data cleaned and formatted for Excel")
             return cleaned_df
@@ -663,9 +1384,18 @@ class StreamlinedMasterScraper:
             self.logger.error(f"Error cleaning data: {e}")
             return df
 
+    def is_blank(self, value):
+        """True for an empty cell (None, NaN, NaT, pd.NA, 'N/A' or ''), checked without pandas since it runs per cell"""
+        try:
+            # NaN and NaT are the only values not equal to themselves
+            return value is None or value != value or value in ('N/A', '')
+        except TypeError:
+            # pd.NA refuses to be used as a bool
+            return True
+
     def clean_number(self, value, column_type):
         """Clean a number value, return number if valid, otherwise return original"""
-        if pd.isna(value) or value == 'N/A' or value == '':
+        if self.is_blank(value):
             return value
         
         try:
@@ -687,7 +1417,7 @@ class StreamlinedMasterScraper:
 
     def clean_mileage(self, value):
         """Clean mileage value - extract number from text like '50,000 km' or just numbers"""
-        if pd.isna(value) or value == 'N/A' or value == '':
+        if self.is_blank(value):
             return ''  # Return blank for empty/invalid values
         
         try:
@@ -712,12 +1442,14 @@ class StreamlinedMasterScraper:
 
     def clean_price(self, value):
         """Clean price value - extract number from text like '$25,000'"""
-        if pd.isna(value) or value == 'N/A' or value == '' or value == '':
+        if self.is_blank(value):
             return ''  # Return blank for empty/invalid prices
         
         try:
-            # Look for $ followed by number
-            match = re.search(r'\$([\d,]+)', str(value))
+            # Look for $ followed by number, or a bare number (prices kept from the saved history are already cleaned)
+            if isinstance(value, (int, float)):
+                value = f"${int(value)}"
+            match = re.search(r'\$([\d,]+)', str(value)) or re.fullmatch(r'\s*(\d+)(?:\.0+)?\s*', str(value))
             if match:
                 # Remove commas and convert to number
                 number_str = match.group(1).replace(',', '')
@@ -798,6 +1530,9 @@ class StreamlinedMasterScraper:
 
     def apply_conditional_formatting(self, filepath):
         """Apply beautiful conditional formatting to the Excel file"""
+        from openpyxl import load_workbook
+        from openpyxl.styles import PatternFill, Font, Alignment
+        
         try:
             wb = load_workbook(filepath)
             ws = wb.active
@@ -896,8 +1631,8 @@ class StreamlinedMasterScraper:
             for col in range(1, ws.max_column + 1):
                 column_name = ws.cell(row=1, column=col).value
                 
-                if column_name == 'price':
-                    # Currency formatting for price column
+                if column_name in ('price', 'expected_price'):
+                    # Currency formatting for price columns
                     for row in range(2, ws.max_row + 1):
                         price_cell = ws.cell(row=row, column=col)
                         if isinstance(price_cell.value, (int, float)) and price_cell.value != '' and price_cell.value != '-':
@@ -1000,67 +1735,29 @@ class StreamlinedMasterScraper:
             self.logger.error(f"Error applying conditional formatting: {e}")
 
     def add_optimal_highlighting(self, ws):
-        """Add highlighting to columns D onwards for optimal purchases"""
+        """Highlight columns D onwards by each listing's deal_category"""
+        from openpyxl.styles import PatternFill
+        
         try:
-            # Find year and price columns
-            year_col = None
-            price_col = None
+            # Find the deal category column written by prepare_for_export
+            category_col = None
             for col in range(1, ws.max_column + 1):
-                if ws.cell(row=1, column=col).value == 'year':
-                    year_col = col
-                elif ws.cell(row=1, column=col).value == 'price':
-                    price_col = col
+                if ws.cell(row=1, column=col).value == 'deal_category':
+                    category_col = col
+                    break
             
-            # Define highlighting colors
-            optimal_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")  # Light green for optimal
-            good_fill = PatternFill(start_color="FFE4B5", end_color="FFE4B5", fill_type="solid")  # Light orange for good
-            avoid_fill = PatternFill(start_color="FFB6C1", end_color="FFB6C1", fill_type="solid")  # Light pink for avoid
+            if category_col is None:
+                self.logger.info("No deal_category column to highlight (re-export to score the dataset)")
+                return
+            
+            fills = {
+                name: PatternFill(start_color=color, end_color=color, fill_type="solid")
+                for name, color in self.load_deal_rules().category_fills().items()
+            }
             
             # Apply highlighting to columns D onwards (columns 4 and beyond)
             for row in range(2, ws.max_row + 1):
-                # Get year and price values
-                year_value = None
-                price_value = None
-                
-                if year_col:
-                    year_value = ws.cell(row=row, column=year_col).value
-                if price_col:
-                    price_value = ws.cell(row=row, column=price_col).value
-                
-                # Determine highlighting based on year and price
-                highlight_fill = None
-                
-                if year_value and year_value != 'N/A':
-                    try:
-                        year_int = int(year_value)
-                        
-                        # Convert price to int if possible
-                        price_int = None
-                        if price_value and price_value != 'N/A' and price_value != '':
-                            try:
-                                if isinstance(price_value, str):
-                                    price_str = str(price_value).replace('$', '').replace(',', '')
-                                    price_int = int(price_str)
-                                else:
-                                    price_int = int(price_value)
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        # Apply highlighting logic
-                        if year_int in [2015, 2016]:
-                            if price_int and 18000 <= price_int <= 23000:
-                                highlight_fill = optimal_fill  # Perfect: 2015-2016 in budget
-                            else:
-                                highlight_fill = good_fill  # 2015-2016 but outside budget
-                        elif year_int == 2014:
-                            if price_int and 18000 <= price_int <= 23000:
-                                highlight_fill = good_fill  # 2014 in budget (backup option)
-                        elif year_int in [2012, 2013]:
-                            highlight_fill = avoid_fill  # Avoid 2012-2013
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Apply highlighting to columns D onwards (columns 4 and beyond)
+                highlight_fill = fills.get(ws.cell(row=row, column=category_col).value)
                 if highlight_fill:
                     for col in range(4, ws.max_column + 1):  # Start from column D (4)
                         ws.cell(row=row, column=col).fill = highlight_fill
@@ -1068,12 +1765,49 @@ class StreamlinedMasterScraper:
         except Exception as e:
             self.logger.error(f"Error adding optimal highlighting: {e}")
 
-    def save_master_dataset(self, df):
-        """Save the master dataset with proper formatting"""
-        if df.empty:
-            self.logger.warning("No data to save")
-            return
-        
+    def load_gazetteer(self):
+        """Load the town / region gazetteer once per run"""
+        if self.gazetteer is None:
+            try:
+                self.gazetteer = Gazetteer.load(self.gazetteer_file)
+            except Exception as e:
+                self.logger.error(f"Error loading gazetteer from {self.gazetteer_file}: {e}")
+                self.gazetteer = Gazetteer()
+        return self.gazetteer
+
+    def locate_listings(self, df):
+        """Fill town / region codes for listings parsed before the gazetteer and add distance_km from home"""
+        try:
+            with self.metrics.stage('locate'):
+                gazetteer = self.load_gazetteer()
+                df = gazetteer.locate(df)
+                df['distance_km'] = gazetteer.distance_km(df, gazetteer.home(self.home_location))
+            return df
+        except Exception as e:
+            self.logger.error(f"Error locating listings: {e}")
+            return df
+
+    def load_deal_rules(self):
+        """Load the deal scoring rules once per run"""
+        if self.deal_rules is None:
+            try:
+                self.deal_rules = DealRules.load(self.deal_rules_file)
+            except Exception as e:
+                self.logger.error(f"Error loading deal rules from {self.deal_rules_file}: {e}")
+                self.deal_rules = DealRules()
+        return self.deal_rules
+
+    def score_deals(self, df):
+        """Add deal_score and deal_category columns to the whole dataset"""
+        try:
+            with self.metrics.stage('score_deals'):
+                return self.load_deal_rules().score(df)
+        except Exception as e:
+            self.logger.error(f"Error scoring deals: {e}")
+            return df
+
+    def prepare_for_export(self, df):
+        """Order columns, sort active listings first and clean values for export"""
         # Reorder columns as requested: ID, brand, year, kms, price, location
         column_order = [
             'ID', 'brand', 'year', 'kms', 'price', 'location', 'price_type', 
@@ -1082,9 +1816,15 @@ class StreamlinedMasterScraper:
             'search_terms', 'trademe_search_urls', 'google_search_urls', 'google_images_urls',
             'listing_time', 'listing_date', 'auction_end_time', 'auction_end_date', 
             'listing_end_time', 'listing_end_date', 'is_active', 'last_seen', 'scrape_date', 'scrape_time', 
-            'listing_url', 'listing_id', 'transmission', 'fuel_type', 'body_style', 'notes'
+            'listing_url', 'listing_id', 'transmission', 'fuel_type', 'body_style', 'vehicle_id', 'first_seen',
+            'town', 'region', 'region_code', 'distance_km', 'expected_price', 'discount_pct', 'deal_score', 'deal_category', 'notes'
         ]
         
+        # Locate, estimate fair prices and score every listing against the deal rules before the columns are picked
+        df = self.locate_listings(df)
+        df = self.estimate_fair_prices(df)
+        df = self.score_deals(df)
+        
         # Only keep columns that exist in the data
         existing_columns = [col for col in column_order if col in df.columns]
         df = df[existing_columns]
@@ -1112,6 +1852,18 @@ class StreamlinedMasterScraper:
         # Clean and format data for proper Excel number formatting
         df = self.clean_and_format_data(df)
         
+        return df
+
+    def save_master_dataset(self, df):
+        """Save the master dataset with proper formatting; returns False when the save failed"""
+        if df.empty:
+            self.logger.warning("No data to save")
+            self.finish_archive(False)
+            return True
+        
+        # Order, sort and clean the rows for export
+        df = self.prepare_for_export(df)
+        
         # Save to Excel (no timestamped copies, just update the master file)
         filepath = self.master_file
         
@@ -1121,25 +1873,39 @@ class StreamlinedMasterScraper:
             daily_backup_file = os.path.join(self.daily_backups_dir, f"86_BRZ_dataset_{timestamp}.xlsx")
             
             # Save main file
-            df.to_excel(filepath, index=False, engine='openpyxl')
+            with self.metrics.stage('to_excel', target='main'):
+                df.to_excel(filepath, index=False, engine='openpyxl')
             self.logger.info(f"86/BRZ dataset saved to: {filepath}")
+            # The master no longer holds the retained-out rows, so their archive can go live
+            self.finish_archive(True)
             
             # Apply conditional formatting to main file
-            self.apply_conditional_formatting(filepath)
+            with self.metrics.stage('conditional_formatting', target='main'):
+                self.apply_conditional_formatting(filepath)
+            self.metrics.incr('bytes_written', os.path.getsize(filepath), target='main')
             
             # Save daily timestamped backup
-            df.to_excel(daily_backup_file, index=False, engine='openpyxl')
+            with self.metrics.stage('to_excel', target='daily_backup'):
+                df.to_excel(daily_backup_file, index=False, engine='openpyxl')
             self.logger.info(f"Daily backup saved to: {daily_backup_file}")
             
             # Apply conditional formatting to daily backup
-            self.apply_conditional_formatting(daily_backup_file)
+            with self.metrics.stage('conditional_formatting', target='daily_backup'):
+                self.apply_conditional_formatting(daily_backup_file)
+            self.metrics.incr('bytes_written', os.path.getsize(daily_backup_file), target='daily_backup')
             
             # Save backup copy to OneDrive
-            df.to_excel(self.onedrive_file, index=False, engine='openpyxl')
+            with self.metrics.stage('to_excel', target='onedrive'):
+                df.to_excel(self.onedrive_file, index=False, engine='openpyxl')
             self.logger.info(f"86/BRZ dataset backup saved to: {self.onedrive_file}")
             
             # Apply conditional formatting to OneDrive backup
-            self.apply_conditional_formatting(self.onedrive_file)
+            with self.metrics.stage('conditional_formatting', target='onedrive'):
+                self.apply_conditional_formatting(self.onedrive_file)
+            self.metrics.incr('bytes_written', os.path.getsize(self.onedrive_file), target='onedrive')
+            
+            # Streamed CSV / JSON Lines / Parquet exports; JSON Lines is always published for the query API
+            self.export_streams(df, ['jsonl'] + [fmt for fmt in self.export_formats if fmt != 'jsonl'])
             
             # Print summary
             print(f"\n=== 86/BRZ Dataset Summary ===")
@@ -1152,47 +1918,725 @@ class StreamlinedMasterScraper:
             print(f"Main dataset: {self.master_file}")
             print(f"Daily backup: {daily_backup_file}")
             print(f"OneDrive backup: {self.onedrive_file}")
+            return True
             
         except Exception as e:
             self.logger.error(f"Error saving master dataset: {e}")
+            self.finish_archive(False)
+            return False
 
     def scrape_all_cars(self):
-        """Scrape listings for all car models"""
+        """Scrape listings for all car models (incrementally unless a full sweep is due)"""
         all_data = []
+        self.recorded_cards = []
+        self.failed_models = []
+        
+        full_sweep = self.is_full_sweep_due()
+        known_ids = None
+        if not full_sweep:
+            known_ids = self.load_known_ids()
+            self.logger.info(f"Incremental scrape against {len(known_ids)} known listings")
+        else:
+            self.logger.info("Full sweep of all results pages")
         
         for car_model, url in self.urls.items():
-            listings = self.scrape_car_listings(car_model, url)
+            listings = self.scrape_car_listings(car_model, url, known_ids)
             all_data.extend(listings)
-            time.sleep(2)  # Delay between requests
+            time.sleep(self.model_delay_seconds)  # Delay between requests
+        
+        # Only a full sweep can tell that a listing has gone, and only for models it read to the end
+        self.swept_models = [car_model for car_model in self.urls if car_model not in self.failed_models] if full_sweep else []
+        if self.failed_models:
+            self.metrics.incr('models_not_scraped', len(self.failed_models))
+            self.logger.warning(f"Not scraped, so their listings keep their current status: {self.failed_models}")
+        
+        if self.record_raw_cards and self.recorded_cards:
+            timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            raw_file = os.path.join(self.raw_scrapes_dir, f"cards_{timestamp}{'' if full_sweep else '_incremental'}.jsonl")
+            try:
+                save_cards(raw_file, self.recorded_cards)
+                self.logger.info(f"Recorded {len(self.recorded_cards)} raw cards to: {raw_file}")
+            except Exception as e:
+                self.logger.error(f"Error recording raw cards: {e}")
         
         return all_data
 
+    def load_recorded_cards(self, raw_file, car_model=None):
+        """Cards from a raw_scrapes JSON Lines file, or from a saved results page (.html) via the site adapter"""
+        if raw_file.lower().endswith(('.html', '.htm')):
+            if car_model is None:
+                raise ValueError("Replaying a saved results page needs the car model it was searched for")
+            with open(raw_file, 'r', encoding='utf-8') as f:
+                return self.marketplace.cards_from_html(f.read(), car_model)
+        return load_cards(raw_file)
+
+    def replay(self, raw_file, full_sweep=False, car_model=None):
+        """Re-run parse, merge and export from recorded raw cards (or a saved results page) without a browser"""
+        self.logger.info(f"Replaying recorded cards from: {raw_file}")
+        self.metrics = RunMetrics()
+        
+        with self.metrics.stage('parse'):
+            new_data = []
+            for card in self.load_recorded_cards(raw_file, car_model):
+                listing_data = self.extract_listing_data(card, card.car_model)
+                if listing_data:
+                    new_data.append(listing_data)
+                    self.metrics.incr('listings_parsed', model=card.car_model)
+                else:
+                    self.metrics.incr('parse_failures', model=card.car_model)
+        
+        # A recorded incremental scrape doesn't show which listings have gone
+        swept_models = sorted({listing['car_model'] for listing in new_data}) if full_sweep else []
+        updated_df = self.merge_new_data(new_data, swept_models)
+        with self.metrics.stage('save'):
+            saved = self.save_master_dataset(updated_df)
+        
+        self.metrics.finish(saved)
+        self.metrics.write(self.run_report_file, self.prometheus_file)
+
+    def open_queue(self):
+        """Open (creating if needed) the shared job queue"""
+        return JobQueue(self.queue_file, self.lease_seconds, self.max_job_attempts)
+
+    def enqueue_scrape(self):
+        """Queue a full sweep as one job per car model and results page, returning the run ID"""
+        run_id = self.open_queue().enqueue(self.urls, self.max_pages, self.marketplace.name, self.base_url)
+        self.logger.info(f"Queued run {run_id}: {len(self.urls)} models x {self.max_pages} pages")
+        return run_id
+
+    def scrape_job(self, driver, job, worker):
+        """Scrape one queued results page and write its listings to the job's own result file
+        
+        Returns (driver, result file, listing count, last page); the driver may be a hedged
+        replacement for the one passed in.
+        """
+        car_model = job['car_model']
+        page_url = self.build_page_url(job['url'], job['page'])
+        driver = self.open_results_page(driver, car_model, page_url)
+        elements = self.marketplace.find_cards(driver)
+        
+        listings = []
+        cards = []
+        with self.metrics.stage('parse', model=car_model):
+            for i, element in enumerate(elements):
+                try:
+                    card = self.snapshot_card(element, car_model)
+                    cards.append(card)
+                    listing_data = self.extract_listing_data(card, car_model)
+                    if listing_data:
+                        listings.append(listing_data)
+                        self.metrics.incr('listings_parsed', model=car_model)
+                    else:
+                        self.metrics.incr('parse_failures', model=car_model)
+                except Exception as e:
+                    self.metrics.incr('parse_failures', model=car_model)
+                    self.logger.error(f"Error processing listing {i+1}: {e}")
+        self.metrics.incr('listings_found', len(elements), model=car_model)
+        
+        # Named by job rather than worker, so a retried job replaces the earlier attempt's file
+        slug = re.sub(r'\W+', '_', car_model).strip('_').lower()
+        result_file = os.path.join(self.job_results_dir, job['run_id'], f"{slug}_page{job['page']:03d}.jsonl")
+        write_job_result(result_file, listings)
+        if self.record_raw_cards and cards:
+            save_cards(result_file.replace('.jsonl', '.cards.jsonl'), cards)
+        
+        # An empty page is past the last results page, so the model's later pages are skipped
+        return driver, result_file, len(listings), not elements
+
+    def work(self, run_id=None, worker_id=None):
+        """Claim and scrape queued jobs until the run has no work left; returns jobs completed"""
+        queue = self.open_queue()
+        run_id = run_id or queue.latest_run()
+        if run_id is None:
+            print("No queued runs (enqueue one with: queue enqueue)")
+            return 0
+        
+        # Parse with the site the run was queued for, whatever this worker was started with
+        run = queue.run_info(run_id)
+        self.use_marketplace(run['marketplace'], run['base_url'])
+        
+        worker = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.metrics = RunMetrics()
+        driver = None
+        completed = 0
+        self.logger.info(f"Worker {worker} started on run {run_id}")
+        
+        try:
+            while True:
+                job = queue.claim(run_id, worker)
+                if job is None:
+                    # Other workers' leases may still expire and need retrying
+                    if queue.has_live_leases(run_id):
+                        time.sleep(self.queue_poll_seconds)
+                        continue
+                    break
+                
+                if driver is None:
+                    with self.metrics.stage('chrome_startup'):
+                        driver = self.create_driver()
+                
+                try:
+                    with self.metrics.stage('job', model=job['car_model']):
+                        driver, result_file, listing_count, last_page = self.scrape_job(driver, job, worker)
+                    # Relative to the job results folder, so workers that mount the share at different paths agree
+                    if queue.complete(job, worker, os.path.relpath(result_file, self.job_results_dir), listing_count, last_page):
+                        completed += 1
+                        self.metrics.incr('jobs_completed', model=job['car_model'])
+                        self.logger.info(f"Job {job['car_model']} page {job['page']}: {listing_count} listings")
+                    else:
+                        self.logger.warning(f"Lost the lease on {job['car_model']} page {job['page']}, discarding result")
+                except CircuitOpenError as e:
+                    # The circuit was already open before this job fetched anything: hand it back untried
+                    # and wait out the cooldown rather than burn through the queue's attempts
+                    self.metrics.incr('jobs_released', model=job['car_model'])
+                    self.logger.warning(f"Job {job['car_model']} page {job['page']} not attempted: {e}")
+                    queue.release(job, worker, e)
+                    time.sleep(e.retry_after)
+                except Exception as e:
+                    self.metrics.incr('jobs_failed', model=job['car_model'])
+                    self.logger.error(f"Job {job['car_model']} page {job['page']} failed (attempt {job['attempts']}): {e}")
+                    queue.fail(job, worker, e)
+                    # Start a fresh browser in case the old one is what broke
+                    self.quit_driver(driver)
+                    driver = None
+        finally:
+            if driver is not None:
+                driver.quit()
+            self.metrics.finish(True)
+            worker_slug = re.sub(r'[^\w.-]', '_', worker)
+            self.metrics.write(os.path.join(self.metrics_dir, f"worker_{worker_slug}.json"))
+        
+        self.logger.info(f"Worker {worker} finished: {completed} jobs completed")
+        return completed
+
+    def merge_queue_run(self, run_id=None):
+        """Merge a finished queued run's per-job results into the dataset (once, by one process)
+        
+        Returns True only when the merged dataset was saved; otherwise the run is left open
+        for another merge attempt.
+        """
+        queue = self.open_queue()
+        run_id = run_id or queue.latest_run()
+        if run_id is None:
+            print("No queued runs")
+            return False
+        if not queue.is_finished(run_id):
+            print(f"Run {run_id} still has work outstanding: {queue.status_counts(run_id)}")
+            return False
+        if not queue.claim_merge(run_id):
+            print(f"Run {run_id} is already merged or being merged")
+            return False
+        
+        self.metrics = RunMetrics()
+        success = False
+        try:
+            jobs = queue.jobs(run_id)
+            new_data = []
+            seen_ids = set()
+            with self.metrics.stage('collect_results'):
+                for job in jobs:
+                    if job['status'] != DONE or not job['result_file']:
+                        continue
+                    # A listing can shift onto the next page between jobs; keep its first copy
+                    # Stored relative to the job results folder (absolute in older queues, which join leaves as is)
+                    for listing in read_job_result(os.path.join(self.job_results_dir, job['result_file'])):
+                        if listing['ID'] not in seen_ids:
+                            seen_ids.add(listing['ID'])
+                            new_data.append(listing)
+            
+            # A model with a failed page wasn't fully swept, so its missing listings stay active
+            failed_models = {job['car_model'] for job in jobs if job['status'] == FAILED}
+            # ...and neither was one whose last queued page still had listings
+            last_page = max((job['page'] for job in jobs), default=0)
+            failed_models |= {job['car_model'] for job in jobs if job['page'] == last_page and job['status'] == DONE and job['listings']}
+            swept_models = sorted({job['car_model'] for job in jobs} - failed_models)
+            if failed_models:
+                self.logger.warning(f"Not marking listings inactive for partly failed models: {sorted(failed_models)}")
+            
+            updated_df = self.merge_new_data(new_data, swept_models)
+            with self.metrics.stage('save'):
+                success = self.save_master_dataset(updated_df)
+            
+            if success and swept_models:
+                state = self.load_scrape_state()
+                state['last_full_sweep'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self.save_scrape_state(state)
+            
+        finally:
+            queue.finish_merge(run_id, merged=success)
+            self.metrics.finish(success)
+            self.metrics.write(self.run_report_file, self.prometheus_file)
+        
+        if not success:
+            self.logger.error(f"Merge of run {run_id} failed; the run is open to merge again")
+            return False
+        self.logger.info(f"Merged run {run_id}: {len(new_data)} listings from {len(jobs)} jobs")
+        return True
+
+    def show_queue_status(self, run_id=None):
+        """Print job counts per status for a queued run"""
+        queue = self.open_queue()
+        run_id = run_id or queue.latest_run()
+        if run_id is None:
+            print("No queued runs")
+            return
+        
+        counts = queue.status_counts(run_id)
+        print(f"Run {run_id}: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+        for job in queue.jobs(run_id):
+            if job['status'] == FAILED:
+                print(f"  failed: {job['car_model']} page {job['page']} after {job['attempts']} attempts: {job['error']}")
+
+    def apply_retention(self, df):
+        """Split off listings inactive for more than archive_after_days and stage them for the cold archive, returning the hot rows"""
+        if not self.archive_after_days:
+            return df
+        
+        try:
+            cold_archive = ColdArchive(self.cold_archive_dir)
+            hot_df, cold_df = cold_archive.split_cold(df, self.archive_after_days)
+            if cold_df.empty:
+                return df
+            
+            # Only published by save_master_dataset once the dataset without these rows is saved
+            self.staged_archive = (cold_archive.stage(cold_df), cold_df)
+            self.logger.info(f"Staged {len(cold_df)} listings inactive for over {self.archive_after_days} days for archiving")
+            return hot_df
+            
+        except Exception as e:
+            # Keep everything in the working set rather than risk losing rows
+            self.logger.error(f"Error archiving inactive listings: {e}")
+            return df
+
+    def finish_archive(self, saved):
+        """Publish the archive staged by apply_retention once the master file is written without its rows, else drop it"""
+        if self.staged_archive is None:
+            return
+        
+        archive_file, cold_df = self.staged_archive
+        self.staged_archive = None
+        cold_archive = ColdArchive(self.cold_archive_dir)
+        if not saved:
+            cold_archive.discard([archive_file])
+            self.logger.warning(f"Dataset not saved, keeping {len(cold_df)} listings due for archiving in the dataset")
+            return
+        
+        try:
+            cold_archive.publish([archive_file])
+            self.metrics.incr('rows_archived', len(cold_df))
+            if self.market_stats is not None:
+                self.market_stats.forget(cold_df['ID'])
+                self.market_stats.save(self.market_stats_file)
+            self.logger.info(f"Archived {len(cold_df)} listings inactive for over {self.archive_after_days} days to: {archive_file}")
+        except Exception as e:
+            # The rows are already out of the dataset; the staged file still holds them
+            self.logger.error(f"Error publishing archive {archive_file}.tmp: {e}")
+
+    def archive_now(self):
+        """Apply the retention policy to the current dataset and re-save it"""
+        df = self.load_existing_dataset()
+        hot_df = self.apply_retention(df)
+        if len(hot_df) < len(df):
+            self.save_master_dataset(hot_df)
+        else:
+            print("No listings due for archiving")
+
+    def query_archive(self, listing_id=None, car_model=None, last_seen_from=None, last_seen_to=None):
+        """Print archived listings matching the filters"""
+        archived = ColdArchive(self.cold_archive_dir).query(listing_id, car_model, last_seen_from, last_seen_to)
+        if archived.empty:
+            print("No archived listings match")
+            return
+        
+        columns = [column for column in ['ID', 'car_model', 'year', 'kms', 'price', 'location', 'last_seen', 'title'] if column in archived.columns]
+        print(archived[columns].to_string(index=False))
+        print(f"\n{len(archived)} archived listings")
+
+    def rebuild_lifetimes(self):
+        """Seed the lifetimes index from the dataset (or history file) and the cold archive"""
+        import pandas as pd
+        
+        if self.chunked_merge and os.path.exists(self.history_file) and os.path.getsize(self.history_file) > 0:
+            frames = [pd.read_csv(self.history_file, dtype=str, keep_default_na=False)]
+        else:
+            frames = [self.load_existing_dataset()]
+        frames.append(ColdArchive(self.cold_archive_dir).query())
+        
+        lifetimes = LifetimeIndex()
+        gazetteer = self.load_gazetteer()
+        for frame in frames:
+            if not frame.empty:
+                lifetimes.update(gazetteer.locate(frame))
+        lifetimes.save(self.lifetimes_file)
+        self.lifetimes = lifetimes
+        self.logger.info(f"Seeded listing lifetimes for {len(lifetimes.frame)} listings")
+        return lifetimes
+
+    def query_lifetimes(self, live_on=None, car_model=None, year=None, transmission=None, region=None):
+        """Print listings live at a point in time and the time-to-sale of sold listings matching the filters"""
+        lifetimes = self.load_lifetimes() if os.path.exists(self.lifetimes_file) else self.rebuild_lifetimes()
+        
+        region_code = None
+        if region is not None:
+            place = self.load_gazetteer().resolve(region)
+            region_code = place['region_code'] if place else region
+        filters = {'car_model': car_model, 'year': year, 'transmission': transmission, 'region_code': region_code}
+        
+        started = time.perf_counter()
+        if live_on:
+            live = lifetimes.live_at(live_on, **filters)
+            if not live.empty:
+                print(live.to_string(index=False))
+            print(f"\n{len(live)} matching listings live at {live_on} ({lifetimes.live_count(live_on)} in total)")
+        
+        summary = lifetimes.time_to_sale(**filters)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if summary['sold']:
+            print(f"Time to sale over {summary['sold']} sold listings: median {summary['median_days']} days "
+                  f"(p25 {summary['p25_days']}, p75 {summary['p75_days']}, mean {summary['mean_days']})")
+        else:
+            print("No sold listings match")
+        print(f"Queried {len(lifetimes.frame)} listing lifetimes in {elapsed_ms:.1f} ms")
+
+    def export(self, formats=None):
+        """Re-write exports from the current dataset (the xlsx files by default)"""
+        formats = formats or ['xlsx']
+        df = self.load_existing_dataset()
+        
+        if 'xlsx' in formats:
+            # The xlsx save also writes any configured stream formats
+            self.export_formats = [fmt for fmt in formats if fmt != 'xlsx']
+            self.save_master_dataset(df)
+        elif df.empty:
+            self.logger.warning("No data to export")
+        else:
+            self.export_streams(self.prepare_for_export(df), formats)
+
+    def export_streams(self, df, formats):
+        """Stream the prepared dataset to each requested CSV / JSON Lines / Parquet target"""
+        if not formats:
+            return
+        
+        exporter = StreamingExporter(self.export_dir)
+        for fmt in formats:
+            try:
+                with self.metrics.stage('stream_export', target=fmt):
+                    path = exporter.export(df, fmt)
+                if os.path.isdir(path):
+                    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+                else:
+                    size = os.path.getsize(path)
+                self.metrics.incr('bytes_written', size, target=fmt)
+                self.logger.info(f"{fmt} export saved to: {path}")
+            except Exception as e:
+                self.logger.error(f"Error writing {fmt} export: {e}")
+
+    def serve(self, host='127.0.0.1', port=8087, poll_seconds=5.0):
+        """Serve the published dataset over a read-only local HTTP query API until interrupted"""
+        from query_api import start_server
+        
+        snapshot_file = StreamingExporter(self.export_dir).target_path('jsonl')
+        if not os.path.exists(snapshot_file) and os.path.exists(self.master_file):
+            # Publish the current dataset once so there is something to serve before the next run
+            self.export_streams(self.prepare_for_export(self.load_existing_dataset()), ['jsonl'])
+        
+        server, index, base_url = start_server(snapshot_file, host, port, poll_seconds)
+        print(f"Query API serving {index.status()['listings']} listings on {base_url} (Ctrl+C to stop)")
+        print(f"  {base_url}/listings?model=Toyota%2086&active=true&year_min=2015&price_max=23000&sort=price")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop_watching.set()
+            server.shutdown()
+
+    def reformat(self, filepaths=None):
+        """Re-apply conditional formatting to existing xlsx files (the master and OneDrive files by default)"""
+        for filepath in filepaths or [self.master_file, self.onedrive_file]:
+            if os.path.exists(filepath):
+                self.apply_conditional_formatting(filepath)
+                self.logger.info(f"Reformatted: {filepath}")
+            else:
+                self.logger.warning(f"File not found: {filepath}")
+
+    def show_stats(self):
+        """Print a summary of the current dataset"""
+        df = self.load_existing_dataset()
+        if df.empty:
+            print("No dataset found")
+            return
+        
+        active = df[df['is_active'] == True]
+        print(f"\n=== 86/BRZ Dataset Stats ===")
+        print(f"Total listings: {len(df)}")
+        print(f"Active listings: {len(active)}")
+        print(f"Inactive listings: {len(df) - len(active)}")
+        
+        prices = active.assign(price_num=active['price'].apply(self.clean_price))
+        prices = prices[prices['price_num'] != '']
+        for model in sorted(df['car_model'].dropna().unique()):
+            model_prices = prices[prices['car_model'] == model]['price_num'].astype(float)
+            median = f"${model_prices.median():,.0f}" if len(model_prices) else 'N/A'
+            print(f"{model}: {len(df[df['car_model'] == model])} listings, "
+                  f"{len(active[active['car_model'] == model])} active, median active price {median}")
+        
+        if 'deal_category' in active.columns:
+            categories = active['deal_category'].fillna('').astype(str)
+            counts = categories[categories != ''].value_counts()
+            if len(counts):
+                print("Active deals: " + ", ".join(f"{count} {category}" for category, count in counts.items()))
+        
+        self.show_market_stats()
+
+    def show_market_stats(self):
+        """Print the running market statistics per model, year and transmission"""
+        market_stats = MarketStats()
+        if not market_stats.load(self.market_stats_file):
+            print("\nNo market stats yet (they are built on the next scrape or replay)")
+            return
+        
+        print(f"\n=== Market by model / year / transmission ===")
+        print(f"{'Model':<12} {'Year':>5} {'Transmission':<13} {'Active':>6} {'Seen':>6} {'Median price':>13} {'Median $/km':>12}")
+        for row in market_stats.summary():
+            if not row['listings']:
+                continue
+            median_price = f"${row['median_price']:,.0f}" if row['median_price'] is not None else 'N/A'
+            median_per_km = f"${row['median_price_per_km']:.3f}" if row['median_price_per_km'] is not None else 'N/A'
+            print(f"{row['car_model']:<12} {row['year']:>5} {row['transmission']:<13} {row['active']:>6} "
+                  f"{row['listings']:>6} {median_price:>13} {median_per_km:>12}")
+
+    def enrich_listings(self, listings):
+        """Enrich new or changed listings from their detail pages, using the on-disk cache for the rest"""
+        from enrichment import DetailEnricher
+        
+        try:
+            enricher = DetailEnricher(
+                self.detail_cache_file,
+                ttl_hours=self.detail_cache_ttl_hours,
+                max_workers=self.detail_fetch_workers,
+                breaker=self.breaker
+            )
+            listings = enricher.enrich(listings)
+            for name, value in enricher.report().items():
+                # The hit rate and latency percentiles are gauges; the rest are counts
+                if name.endswith('_rate') or name.startswith('fetch_latency_'):
+                    self.metrics.set(f"enrichment_{name}", value)
+                else:
+                    self.metrics.incr(f"enrichment_{name}", value)
+            return listings
+        except Exception as e:
+            self.logger.error(f"Error enriching listings from detail pages: {e}")
+            return listings
+
     def run(self):
         """Main execution method"""
         self.logger.info("Starting 86/BRZ Dataset Scraper")
         start_time = datetime.now()
+        self.metrics = RunMetrics()
+        success = False
         
         try:
             # Scrape all car data
-            new_data = self.scrape_all_cars()
+            with self.metrics.stage('scrape'):
+                new_data = self.scrape_all_cars()
             
-            # Update master dataset
-            updated_df = self.update_dataset(new_data)
+            # Fill fields the search cards don't show from listing detail pages
+            if self.enrich_details:
+                with self.metrics.stage('enrich'):
+                    new_data = self.enrich_listings(new_data)
+            
+            # Update master dataset and move long-inactive listings to the cold archive
+            updated_df = self.merge_new_data(new_data, self.swept_models)
             
             # Save master dataset
-            self.save_master_dataset(updated_df)
+            with self.metrics.stage('save'):
+                saved = self.save_master_dataset(updated_df)
+            if not saved:
+                raise RuntimeError("Master dataset was not saved")
+            
+            # Record the full sweep so incremental runs know when the next one is due
+            # (a sweep with failed models is repeated next run)
+            if self.swept_models and not self.failed_models:
+                state = self.load_scrape_state()
+                state['last_full_sweep'] = start_time.strftime('%Y-%m-%d %H:%M:%S')
+                self.save_scrape_state(state)
             
             end_time = datetime.now()
             duration = end_time - start_time
             self.logger.info(f"Master dataset update completed in {duration}")
+            success = True
             
         except Exception as e:
             self.logger.error(f"Error during master dataset update: {e}")
+        
+        finally:
+            # Write the run report and Prometheus textfile even for failed runs
+            self.metrics.finish(success)
+            self.metrics.write(self.run_report_file, self.prometheus_file)
+
+def build_parser():
+    """Build the command line parser"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="86/BRZ car listings dataset scraper")
+    parser.add_argument('--output-dir', help="Output root for the dataset, backups and caches (default: CARSEARCH_OUTPUT_ROOT or the CarSearch folder)")
+    parser.add_argument('--marketplace', choices=sorted(ADAPTERS), help="Listing site adapter (default: CARSEARCH_MARKETPLACE or trademe)")
+    parser.add_argument('--onedrive-dir', help="Folder for the OneDrive copy (default: <output root>/onedrive when an output root is set)")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    scrape_parser = subparsers.add_parser('scrape', help="Scrape the marketplace and update the dataset (the default)")
+    scrape_parser.add_argument('--base-url', help="Site to scrape, e.g. a local mock server (default: https://www.trademe.co.nz)")
+    scrape_parser.add_argument('--incremental', action='store_true', help="Stop paging at known listings unless a full sweep is due")
+    scrape_parser.add_argument('--enrich', action='store_true', help="Fill transmission/fuel/body style from listing detail pages")
+    scrape_parser.add_argument('--export', dest='export_formats', nargs='+', choices=EXPORT_FORMATS, default=[],
+                               help="Also stream the dataset to these formats after saving")
+    scrape_parser.add_argument('--chunked-merge', action='store_true',
+                               help="Merge into the ID-sorted history CSV in bounded memory; the xlsx keeps active listings only")
+    
+    export_parser = subparsers.add_parser('export', help="Re-write exports from the current dataset")
+    export_parser.add_argument('--format', dest='formats', nargs='+', choices=['xlsx'] + EXPORT_FORMATS, default=['xlsx'],
+                               help="Targets to write (default: xlsx); csv, jsonl and parquet are streamed to <output root>/exports")
+    
+    reformat_parser = subparsers.add_parser('reformat', help="Re-apply conditional formatting to xlsx files")
+    reformat_parser.add_argument('files', nargs='*', help="Files to reformat (default: the master and OneDrive files)")
+    
+    subparsers.add_parser('stats', help="Print a summary of the current dataset")
+    
+    archive_parser = subparsers.add_parser('archive', help="Archive long-inactive listings now, or query the cold archive")
+    archive_parser.add_argument('--retention-days', type=int, help="Archive listings inactive for more than this many days (default: 90)")
+    archive_parser.add_argument('--query', action='store_true', help="Query the archive instead of archiving")
+    archive_parser.add_argument('--id', help="Archived listing ID to look up")
+    archive_parser.add_argument('--model', help="Car model, e.g. 'Toyota 86'")
+    archive_parser.add_argument('--from', dest='last_seen_from', help="Last seen on or after this date (YYYY-MM-DD)")
+    archive_parser.add_argument('--to', dest='last_seen_to', help="Last seen on or before this date (YYYY-MM-DD)")
+    
+    queue_parser = subparsers.add_parser('queue', help="Queue a sweep for workers, check its progress or merge its results")
+    queue_parser.add_argument('action', choices=['enqueue', 'status', 'merge'])
+    queue_parser.add_argument('--run-id', help="Queued run to check or merge (default: the latest)")
+    queue_parser.add_argument('--max-pages', type=int, help="Results pages to queue per model (default: 10)")
+    queue_parser.add_argument('--base-url', help="Site the queued jobs scrape, e.g. a local mock server (default: https://www.trademe.co.nz)")
+    
+    work_parser = subparsers.add_parser('work', help="Scrape queued jobs until the run has none left")
+    work_parser.add_argument('--run-id', help="Queued run to work on (default: the latest)")
+    work_parser.add_argument('--worker-id', help="Name for this worker in the queue (default: host-pid)")
+    work_parser.add_argument('--processes', type=int, default=1, help="Worker processes to run on this host")
+    work_parser.add_argument('--lease-seconds', type=int, help="How long a claimed job is held before others may retry it (default: 300)")
+    
+    for page_parser in (scrape_parser, work_parser):
+        page_parser.add_argument('--page-timeout', type=float, help="Abandon a results page load after this many seconds (default: 45)")
+        page_parser.add_argument('--retries', type=int, help="Retries per results page, with jittered backoff (default: 2)")
+        page_parser.add_argument('--hedge-after', type=float,
+                                 help="Race a second browser against page loads slower than this many seconds (default: off)")
+    
+    lifetimes_parser = subparsers.add_parser('lifetimes', help="Query listing lifetimes: listings live on a date and time to sale")
+    lifetimes_parser.add_argument('--live-on', help="List listings live at this date or time (YYYY-MM-DD [HH:MM:SS])")
+    lifetimes_parser.add_argument('--model', help="Car model, e.g. 'Toyota 86'")
+    lifetimes_parser.add_argument('--year', help="Model year, e.g. 2016")
+    lifetimes_parser.add_argument('--transmission', help="Manual or Automatic")
+    lifetimes_parser.add_argument('--region', help="Region name or code, e.g. Auckland or NZ-AUK")
+    lifetimes_parser.add_argument('--rebuild', action='store_true', help="Re-seed the index from the dataset and cold archive first")
+    
+    serve_parser = subparsers.add_parser('serve', help="Serve the published dataset over a read-only local HTTP query API")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument('--port', type=int, default=8087, help="Port to listen on (default: 8087)")
+    serve_parser.add_argument('--poll-seconds', type=float, default=5.0, help="How often to check for a newly published run (default: 5)")
+    
+    replay_parser = subparsers.add_parser('replay', help="Re-parse and merge a recorded raw card file without a browser")
+    replay_parser.add_argument('raw_file', help="JSON Lines file from the raw_scrapes folder, or a saved results page (.html)")
+    replay_parser.add_argument('--model', dest='car_model', help="Car model a saved results page was searched for, e.g. 'Toyota 86'")
+    replay_parser.add_argument('--full-sweep', action='store_true', help="Treat the recording as a full sweep and mark missing listings inactive")
+    replay_parser.add_argument('--chunked-merge', action='store_true', help="Merge into the ID-sorted history CSV in bounded memory")
+    
+    return parser
+
+def run_workers(args, argv):
+    """Run several worker processes on this host against the same queue and wait for them"""
+    import subprocess
+    import sys
+    
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Each child is a single worker with its own name; drop the options being replaced
+    child_argv = []
+    skip_next = False
+    for arg in argv:
+        if skip_next:
+            skip_next = False
+        elif arg in ('--processes', '--worker-id'):
+            skip_next = True
+        elif not arg.startswith(('--processes=', '--worker-id=')):
+            child_argv.append(arg)
+    
+    base_name = args.worker_id or socket.gethostname()
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__)] + child_argv + ['--worker-id', f"{base_name}-{i + 1}"])
+        for i in range(args.processes)
+    ]
+    for worker in workers:
+        worker.wait()
 
-def main():
+def main(argv=None):
     """Main function to run the master scraper"""
-    scraper = StreamlinedMasterScraper()
-    scraper.run()
+    args = build_parser().parse_args(argv)
+    command = args.command or 'scrape'
+    
+    scraper = StreamlinedMasterScraper(
+        output_dir=args.output_dir,
+        onedrive_dir=args.onedrive_dir,
+        base_url=getattr(args, 'base_url', None),
+        marketplace=args.marketplace
+    )
+    
+    if getattr(args, 'page_timeout', None):
+        scraper.page_load_timeout_seconds = args.page_timeout
+    if getattr(args, 'retries', None) is not None:
+        scraper.page_retries = args.retries
+    if getattr(args, 'hedge_after', None):
+        scraper.hedge_after_seconds = args.hedge_after
+    
+    if command == 'scrape':
+        scraper.incremental_mode = getattr(args, 'incremental', False)
+        scraper.enrich_details = getattr(args, 'enrich', False)
+        scraper.export_formats = getattr(args, 'export_formats', [])
+        scraper.chunked_merge = getattr(args, 'chunked_merge', False)
+        scraper.run()
+    elif command == 'export':
+        scraper.export(args.formats)
+    elif command == 'reformat':
+        scraper.reformat(args.files)
+    elif command == 'stats':
+        scraper.show_stats()
+    elif command == 'archive':
+        if args.query:
+            scraper.query_archive(args.id, args.model, args.last_seen_from, args.last_seen_to)
+        else:
+            if args.retention_days is not None:
+                scraper.archive_after_days = args.retention_days
+            scraper.archive_now()
+    elif command == 'queue':
+        if args.action == 'enqueue':
+            if args.max_pages:
+                scraper.max_pages = args.max_pages
+            print(scraper.enqueue_scrape())
+        elif args.action == 'status':
+            scraper.show_queue_status(args.run_id)
+        elif not scraper.merge_queue_run(args.run_id):
+            raise SystemExit(1)
+    elif command == 'work':
+        if args.lease_seconds:
+            scraper.lease_seconds = args.lease_seconds
+        if args.processes > 1:
+            run_workers(args, argv)
+        else:
+            scraper.work(args.run_id, args.worker_id)
+    elif command == 'lifetimes':
+        if args.rebuild:
+            scraper.rebuild_lifetimes()
+        scraper.query_lifetimes(args.live_on, args.model, args.year, args.transmission, args.region)
+    elif command == 'serve':
+        scraper.serve(args.host, args.port, args.poll_seconds)
+    elif command == 'replay':
+        scraper.chunked_merge = args.chunked_merge
+        scraper.replay(args.raw_file, full_sweep=args.full_sweep, car_model=args.car_model)
 
 if __name__ == "__main__":
     main()
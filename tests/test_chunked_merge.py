@@ -0,0 +1,215 @@
+"""Chunked history merge tests: routing by ID order, fallback IDs across chunks, and agreement with update_dataset
+
+Run from the repository root: python -m unittest discover tests
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from chunked_merge import ChunkedHistoryMerger
+
+COLUMNS = ['ID', 'listing_id', 'title', 'location', 'car_model', 'year', 'kms', 'price',
+           'listing_date', 'listing_time', 'is_active', 'first_seen', 'last_seen']
+
+
+def row(listing_id, price='$20,000', kms='50000', year='2016', is_active=True, car_model='Toyota 86',
+        title=None, first_seen='2026-09-01 08:00:00', row_id=None):
+    return {
+        'ID': row_id or f"TM{listing_id}",
+        'listing_id': listing_id,
+        'title': title or f"{year} {car_model} number {listing_id}",
+        'location': 'Auckland City, Auckland',
+        'car_model': car_model,
+        'year': year,
+        'kms': kms,
+        'price': price,
+        'listing_date': '2026-09-01',
+        'listing_time': '08:00',
+        'is_active': is_active,
+        'first_seen': first_seen,
+        'last_seen': '2026-10-18 08:00:00',
+    }
+
+
+def write_history(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+
+def read_output(path):
+    return pd.read_csv(path, dtype=object, keep_default_na=False).set_index('ID')
+
+
+class ChunkedHistoryMergerTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = os.path.join(self.directory.name, 'history.csv')
+        self.output = os.path.join(self.directory.name, 'merged.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def merge(self, history_rows, new_data, chunk_rows=2, **kwargs):
+        write_history(self.history, history_rows)
+        merger = ChunkedHistoryMerger(chunk_rows)
+        chunks = []
+
+        def on_chunk(chunk):
+            chunks.append(list(chunk['ID']))
+            return chunk
+
+        merger.merge(self.history, new_data, self.output, on_chunk=on_chunk, **kwargs)
+        return merger, chunks
+
+    def test_new_rows_are_routed_to_the_chunk_covering_their_id(self):
+        history = [row(f"0{i}") for i in range(1, 7)]
+        new_data = [row('03', price='$18,000'), row('025'), row('00'), row('99')]
+        merger, chunks = self.merge(history, new_data)
+
+        self.assertEqual(chunks, [['TM00', 'TM01', 'TM02'], ['TM025', 'TM03', 'TM04'], ['TM05', 'TM06'], ['TM99']])
+        merged = read_output(self.output)
+        self.assertEqual(list(merged.index), ['TM00', 'TM01', 'TM02', 'TM025', 'TM03', 'TM04', 'TM05', 'TM06', 'TM99'])
+        self.assertEqual(merged.loc['TM03', 'price'], '$18,000')
+        self.assertEqual(merged.loc['TM01', 'is_active'], 'False')
+        self.assertEqual(merged.loc['TM03', 'is_active'], 'True')
+        self.assertEqual((merger.rows_updated, merger.rows_inserted, merger.rows_written), (1, 3, 9))
+        self.assertEqual(merger.changed_ids, {f"TM0{i}" for i in range(1, 7)} | {'TM025', 'TM00', 'TM99'})
+
+    def test_missing_values_keep_the_history(self):
+        history = [row('01', price='$21,000', kms='61000')]
+        merger, _ = self.merge(history, [row('01', price='N/A', kms='', first_seen='2026-10-19 08:00:00')])
+        merged = read_output(self.output)
+        self.assertEqual((merged.loc['TM01', 'price'], merged.loc['TM01', 'kms']), ('$21,000', '61000'))
+        self.assertEqual(merged.loc['TM01', 'first_seen'], '2026-09-01 08:00:00')
+
+    def test_only_swept_models_go_inactive(self):
+        history = [row('01'), row('02', car_model='Subaru BRZ')]
+        self.merge(history, [], swept_models=['Subaru BRZ'])
+        merged = read_output(self.output)
+        self.assertEqual(list(merged['is_active']), ['True', 'False'])
+
+    def test_unsorted_history_is_refused(self):
+        write_history(self.history, [row('02'), row('01')])
+        with self.assertRaises(ValueError):
+            ChunkedHistoryMerger(2).merge(self.history, [row('03')], self.output)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_fallback_rows_are_adopted_into_the_chunk_of_their_real_id(self):
+        # Both fallback rows fill the first chunk; their real IDs sort into the third and past the end
+        history = [
+            row('x', row_id='0AB12CD34EF5', price='$19,500', first_seen='2026-08-01 08:00:00'),
+            row('y', row_id='0CD56EF78AB9', price='$22,000'),
+            row('01'), row('02'), row('03'), row('05'), row('06'),
+        ]
+        new_data = [row('04', price='N/A'), row('99'), row('02')]
+        fallback_ids = {'0AB12CD34EF5': 'TM04', '0CD56EF78AB9': 'TM99', 'FFFFFFFFFFFF': 'TM02'}
+        merger, chunks = self.merge(history, new_data, fallback_ids=fallback_ids)
+
+        self.assertEqual(chunks, [[], ['TM01', 'TM02'], ['TM03', 'TM04', 'TM05'], ['TM06'], ['TM99']])
+        merged = read_output(self.output)
+        self.assertNotIn('0AB12CD34EF5', merged.index)
+        self.assertNotIn('0CD56EF78AB9', merged.index)
+        self.assertEqual(merged.loc['TM04', 'price'], '$19,500')
+        self.assertEqual(merged.loc['TM04', 'first_seen'], '2026-08-01 08:00:00')
+        self.assertEqual(merged.loc['TM99', 'price'], '$20,000')
+        self.assertEqual(merged.loc['TM99', 'first_seen'], '2026-09-01 08:00:00')
+        self.assertEqual(merger.rekeyed_ids, {'0AB12CD34EF5', '0CD56EF78AB9'})
+        self.assertEqual((merger.rows_updated, merger.rows_inserted), (3, 0))
+
+    def test_fallback_row_is_not_adopted_when_its_real_id_exists(self):
+        history = [row('x', row_id='0AB12CD34EF5'), row('01'), row('04')]
+        merger, _ = self.merge(history, [row('04')], fallback_ids={'0AB12CD34EF5': 'TM04'})
+        self.assertEqual(list(read_output(self.output).index), ['0AB12CD34EF5', 'TM01', 'TM04'])
+        self.assertEqual(merger.rekeyed_ids, set())
+
+
+class ChunkedMatchesInMemoryTest(unittest.TestCase):
+    """The chunked merge of a history must give the rows update_dataset gives for the same history"""
+
+    @classmethod
+    def setUpClass(cls):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.scraper = StreamlinedMasterScraper(output_dir=cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def history_and_scrape(self):
+        history = [
+            row(f"{i:02d}", price=f"${15000 + i * 500:,}", kms=str(30000 + i * 1000),
+                car_model='Subaru BRZ' if i % 3 == 0 else 'Toyota 86', is_active=bool(i % 4))
+            for i in range(1, 21)
+        ]
+        # A row saved before listing IDs were extracted, keyed by its content hash
+        fallback_row = row('45', title='2015 Toyota 86 GT manual', year='2015', first_seen='2026-07-01 08:00:00', is_active=False)
+        fallback_row['ID'] = self.scraper.generate_fallback_id(fallback_row['title'], fallback_row['location'], fallback_row['year'])
+        history.append(fallback_row)
+        history.sort(key=lambda listing: listing['ID'])
+
+        new_data = [
+            row('03', price='$14,000'),
+            row('07', price='N/A', kms=''),
+            row('12', year=''),
+            row('45', title='2015 Toyota 86 GT manual', year='2015', price='N/A'),
+            row('21'),
+            row('005'),
+            row('99', car_model='Subaru BRZ'),
+        ]
+        for listing in new_data:
+            listing['first_seen'] = '2026-10-19 08:00:00'
+        return history, new_data, fallback_row['ID']
+
+    def in_memory(self, history, new_data, swept_models):
+        existing = pd.DataFrame(history, columns=COLUMNS)
+        with mock.patch.object(self.scraper, 'load_existing_dataset', return_value=existing), \
+                mock.patch.object(self.scraper, 'link_relistings', side_effect=lambda df, scraped_ids=None: df):
+            merged = self.scraper.update_dataset(new_data, swept_models)
+        return merged, set(self.scraper.changed_ids), set(self.scraper.rekeyed_ids)
+
+    def chunked(self, history, new_data, swept_models, chunk_rows):
+        history_path = os.path.join(self.directory.name, 'history.csv')
+        output_path = os.path.join(self.directory.name, 'merged.csv')
+        write_history(history_path, history)
+        fallback_ids = {
+            self.scraper.generate_fallback_id(listing['title'], listing['location'], listing['year']): listing['ID']
+            for listing in new_data
+        }
+        merger = ChunkedHistoryMerger(chunk_rows)
+        merger.merge(history_path, new_data, output_path, swept_models, fallback_ids=fallback_ids)
+        merged = pd.read_csv(output_path, dtype=object, keep_default_na=False)
+        return merged, merger.changed_ids, merger.rekeyed_ids
+
+    def normalised(self, frame):
+        # Same rows and values as text; last_seen is the merge's own clock
+        frame = frame.drop(columns=['last_seen']).astype(object)
+        frame = frame.where(frame.notna(), '').astype(str)
+        return frame.sort_values('ID').reset_index(drop=True)[sorted(frame.columns)]
+
+    def test_chunk_sizes_give_the_in_memory_result(self):
+        history, new_data, fallback_id = self.history_and_scrape()
+        for swept_models in (None, ['Toyota 86']):
+            expected, expected_changed, expected_rekeyed = self.in_memory(history, new_data, swept_models)
+            self.assertEqual(expected_rekeyed, {fallback_id})
+            for chunk_rows in (1, 3, 7, 1000):
+                with self.subTest(swept_models=swept_models, chunk_rows=chunk_rows):
+                    merged, changed, rekeyed = self.chunked(history, new_data, swept_models, chunk_rows)
+                    pd.testing.assert_frame_equal(self.normalised(merged), self.normalised(expected))
+                    self.assertEqual(rekeyed, expected_rekeyed)
+                    self.assertEqual(changed, expected_changed)
+
+
+if __name__ == '__main__':
+    unittest.main()
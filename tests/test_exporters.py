@@ -0,0 +1,96 @@
+"""Streaming export tests: CSV / JSON Lines round trips and the partitioned Parquet dataset
+
+Run from the repository root: python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from exporters import StreamingExporter, read_parquet_slice
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def sample_dataset():
+    # The first chunk (chunk_rows=2) has no notes at all, so its types can't be inferred from it
+    return pd.DataFrame({
+        'ID': ['TM1', 'TM2', 'TM3', 'TM4', 'TM5'],
+        'car_model': ['Toyota 86', 'Toyota 86', 'Subaru BRZ', 'Toyota 86', 'Subaru BRZ'],
+        'scrape_date': ['2026-10-18', '2026-10-18', '2026-10-18', '2026-10-19', '2026-10-19'],
+        'year': ['2016', 2015, 'N/A', '2021', '2013'],
+        'kms': [66987, '45000', '', 120000, 'N/A'],
+        'price': [25990, '$18,500', 31000, 'N/A', 15000],
+        'is_active': [True, 'True', False, 'false', True],
+        'notes': [None, None, 'Low km (no odometer reading)', None, ''],
+    })
+
+
+class StreamingExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.export_dir = tempfile.TemporaryDirectory()
+        self.exporter = StreamingExporter(self.export_dir.name, chunk_rows=2)
+
+    def tearDown(self):
+        self.export_dir.cleanup()
+
+    def test_csv_has_one_header_and_every_row(self):
+        filepath = self.exporter.export(sample_dataset(), 'csv')
+        exported = pd.read_csv(filepath, dtype=str)
+        self.assertEqual(list(exported['ID']), ['TM1', 'TM2', 'TM3', 'TM4', 'TM5'])
+
+    def test_jsonl_types(self):
+        filepath = self.exporter.export(sample_dataset(), 'jsonl')
+        with open(filepath, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['year'], 2016.0)
+        self.assertIsNone(rows[2]['year'])
+        self.assertIs(rows[1]['is_active'], True)
+        self.assertIs(rows[3]['is_active'], False)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.exporter.export(sample_dataset(), 'xml')
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_parquet_partitions_read_back(self):
+        dataset_dir = self.exporter.export(sample_dataset(), 'parquet')
+        # Hive partition values are URI-encoded in the folder names
+        self.assertTrue(os.path.isdir(os.path.join(dataset_dir, 'scrape_date=2026-10-18', 'car_model=Toyota%2086')))
+
+        everything = read_parquet_slice(dataset_dir)
+        self.assertEqual(sorted(everything['ID']), ['TM1', 'TM2', 'TM3', 'TM4', 'TM5'])
+
+        one_day = read_parquet_slice(dataset_dir, scrape_date='2026-10-18', car_model='Toyota 86',
+                                     columns=['ID', 'year', 'kms', 'price', 'is_active', 'notes'])
+        one_day = one_day.sort_values('ID').reset_index(drop=True)
+        self.assertEqual(list(one_day['ID']), ['TM1', 'TM2'])
+        self.assertEqual(list(one_day['year']), [2016.0, 2015.0])
+        self.assertEqual(list(one_day['kms']), [66987.0, 45000.0])
+        self.assertEqual(one_day['is_active'].tolist(), [True, True])
+        self.assertTrue(one_day['notes'].isna().all())
+
+        brz = read_parquet_slice(dataset_dir, car_model='Subaru BRZ').sort_values('ID')
+        self.assertEqual(list(brz['ID']), ['TM3', 'TM5'])
+        self.assertEqual(brz['notes'].iloc[0], 'Low km (no odometer reading)')
+
+    @unittest.skipIf(pyarrow is None, "pyarrow not installed")
+    def test_parquet_export_replaces_previous(self):
+        self.exporter.export(sample_dataset(), 'parquet')
+        dataset_dir = self.exporter.export(sample_dataset().iloc[:1], 'parquet')
+        self.assertEqual(list(read_parquet_slice(dataset_dir)['ID']), ['TM1'])
+        self.assertFalse(os.path.exists(f"{dataset_dir}.tmp"))
+        self.assertFalse(os.path.exists(f"{dataset_dir}.old"))
+
+
+if __name__ == '__main__':
+    unittest.main()
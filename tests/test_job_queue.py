@@ -0,0 +1,208 @@
+"""Job queue tests: leases, retries and skipping, merging a run, and workers against a failing site
+
+Run from the repository root: python -m unittest discover tests
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import DONE, FAILED, LEASED, PENDING, SKIPPED, JobQueue, write_job_result
+from resilience import CircuitBreaker
+
+URLS = {'Toyota 86': 'https://www.trademe.co.nz/a/motors/cars/toyota/86'}
+
+
+class FakeDriver:
+    """Browser whose every page load times out"""
+
+    def get(self, url):
+        raise TimeoutError(f"Timed out loading {url}")
+
+    def quit(self):
+        pass
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.TemporaryDirectory()
+        self.now = 1000000.0
+        self.clock = mock.patch('time.time', lambda: self.now)
+        self.clock.start()
+        self.queue = JobQueue(os.path.join(self.directory.name, 'queue.sqlite'), lease_seconds=60, max_attempts=2)
+        self.run_id = self.queue.enqueue(URLS, max_pages=3)
+
+    def tearDown(self):
+        self.clock.stop()
+        self.directory.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def statuses(self):
+        return [(job['page'], job['status'], job['attempts']) for job in self.queue.jobs(self.run_id)]
+
+    def test_claims_lowest_page_first_and_never_twice(self):
+        first = self.queue.claim(self.run_id, 'a')
+        second = self.queue.claim(self.run_id, 'b')
+        self.assertEqual((first['page'], first['attempts'], first['worker']), (1, 1, 'a'))
+        self.assertEqual(second['page'], 2)
+        self.assertTrue(self.queue.has_live_leases(self.run_id))
+
+    def test_expired_lease_is_handed_out_again(self):
+        job = self.queue.claim(self.run_id, 'a')
+        self.now += 61
+        retry = self.queue.claim(self.run_id, 'b')
+        self.assertEqual((retry['job_id'], retry['attempts'], retry['worker']), (job['job_id'], 2, 'b'))
+
+    def test_complete_on_lost_lease_is_refused(self):
+        job = self.queue.claim(self.run_id, 'a')
+        self.now += 61
+        retry = self.queue.claim(self.run_id, 'b')
+        self.assertFalse(self.queue.complete(job, 'a', 'late.jsonl', 5))
+        self.assertTrue(self.queue.complete(retry, 'b', 'toyota_86_page001.jsonl', 4))
+        done = self.queue.jobs(self.run_id)[0]
+        self.assertEqual((done['status'], done['result_file'], done['listings']), (DONE, 'toyota_86_page001.jsonl', 4))
+
+    def test_fail_retries_until_max_attempts(self):
+        job = self.queue.claim(self.run_id, 'a')
+        self.queue.fail(job, 'a', TimeoutError('slow'))
+        self.assertEqual(self.statuses()[0], (1, PENDING, 1))
+        job = self.queue.claim(self.run_id, 'a')
+        self.queue.fail(job, 'a', TimeoutError('slow'))
+        self.assertEqual(self.statuses()[0], (1, FAILED, 2))
+        self.assertEqual(self.queue.jobs(self.run_id)[0]['error'], 'slow')
+
+    def test_lease_expiring_on_final_attempt_fails_the_job(self):
+        for _ in range(2):
+            self.queue.claim(self.run_id, 'a')
+            self.queue.claim(self.run_id, 'a')
+            self.queue.claim(self.run_id, 'a')
+            self.now += 61
+        self.assertIsNone(self.queue.claim(self.run_id, 'a'))
+        self.assertEqual({status for _, status, _ in self.statuses()}, {FAILED})
+        self.assertTrue(self.queue.is_finished(self.run_id))
+
+    def test_last_page_skips_the_pages_after_it(self):
+        first = self.queue.claim(self.run_id, 'a')
+        second = self.queue.claim(self.run_id, 'b')
+        self.queue.complete(first, 'a', 'p1.jsonl', 20)
+        self.assertTrue(self.queue.complete(second, 'b', 'p2.jsonl', 0, last_page=True))
+        self.assertEqual([status for _, status, _ in self.statuses()], [DONE, DONE, SKIPPED])
+        self.assertTrue(self.queue.is_finished(self.run_id))
+        self.assertIsNone(self.queue.claim(self.run_id, 'a'))
+
+    def test_release_refunds_the_attempt(self):
+        job = self.queue.claim(self.run_id, 'a')
+        self.queue.release(job, 'a', 'circuit open')
+        self.assertEqual(self.statuses()[0], (1, PENDING, 0))
+
+    def test_only_one_merge(self):
+        self.assertTrue(self.queue.claim_merge(self.run_id))
+        self.assertFalse(self.queue.claim_merge(self.run_id))
+        self.queue.finish_merge(self.run_id, merged=False)
+        self.assertTrue(self.queue.claim_merge(self.run_id))
+
+
+class MergeQueueRunTest(unittest.TestCase):
+    def setUp(self):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.scraper = StreamlinedMasterScraper(output_dir=self.output_dir.name)
+        self.scraper.urls = dict(URLS)
+        self.scraper.max_pages = 1
+        queue = self.scraper.open_queue()
+        self.run_id = self.scraper.enqueue_scrape()
+        job = queue.claim(self.run_id, 'a')
+        listing = {'ID': 'TM1', 'listing_id': '1', 'title': '2016 Toyota 86 GT', 'car_model': 'Toyota 86', 'year': '2016',
+                   'kms': '45000', 'price': '$25,990', 'location': 'Auckland City, Auckland', 'is_active': True,
+                   'listing_date': 'N/A', 'listing_time': 'N/A', 'first_seen': '2026-10-19 08:00:00',
+                   'last_seen': '2026-10-19 08:00:00', 'scrape_date': '2026-10-19'}
+        write_job_result(os.path.join(self.scraper.job_results_dir, self.run_id, 'toyota_86_page001.jsonl'), [listing])
+        # Stored relative to the job results folder, as work() does
+        queue.complete(job, 'a', os.path.join(self.run_id, 'toyota_86_page001.jsonl'), 1, last_page=True)
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_failed_save_reports_failure_and_reopens_the_run(self):
+        with mock.patch.object(self.scraper, 'save_master_dataset', return_value=False) as save:
+            self.assertFalse(self.scraper.merge_queue_run(self.run_id))
+        self.assertEqual(list(save.call_args[0][0]['ID']), ['TM1'])
+        self.assertEqual(self.scraper.open_queue().run_info(self.run_id)['merge_state'], 'open')
+
+    def test_saved_merge_closes_the_run(self):
+        with mock.patch.object(self.scraper, 'save_master_dataset', return_value=True):
+            self.assertTrue(self.scraper.merge_queue_run(self.run_id))
+            self.assertFalse(self.scraper.merge_queue_run(self.run_id))
+        self.assertEqual(self.scraper.open_queue().run_info(self.run_id)['merge_state'], 'merged')
+
+
+class WorkerCircuitTest(unittest.TestCase):
+    """A page that always fails must run out of attempts, not be handed back for ever"""
+
+    def setUp(self):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.scraper = StreamlinedMasterScraper(output_dir=self.output_dir.name)
+        self.scraper.urls = {'Toyota 86': self.scraper.urls['Toyota 86']}
+        self.scraper.max_pages = 1
+        self.scraper.page_wait_seconds = 0
+        self.scraper.create_driver = FakeDriver
+
+        # Simulated time: sleeping moves the breaker's clock on instead of waiting
+        self.now = 0.0
+        self.sleeps = 0
+        self.scraper.breaker = CircuitBreaker(failure_threshold=5, cooldown_seconds=300, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        if self.sleeps > 1000:
+            raise AssertionError("worker never gave up on the failing page")
+        self.now += seconds
+
+    def run_worker(self):
+        run_id = self.scraper.enqueue_scrape()
+        with mock.patch('time.sleep', self.sleep):
+            self.scraper.work(run_id)
+        return self.scraper.open_queue().jobs(run_id)
+
+    def test_failing_page_uses_up_its_attempts(self):
+        jobs = self.run_worker()
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]['status'], FAILED)
+        self.assertEqual(jobs[0]['attempts'], self.scraper.max_job_attempts)
+        self.assertIn('Timed out', jobs[0]['error'])
+
+    def test_job_claimed_while_circuit_open_is_refunded(self):
+        # The circuit opened on some other page before this job was claimed
+        url = self.scraper.urls['Toyota 86']
+        for _ in range(5):
+            self.scraper.breaker.failure(url)
+        run_id = self.scraper.enqueue_scrape()
+        queue = self.scraper.open_queue()
+        job = queue.claim(run_id, 'worker-1')
+        driver = FakeDriver()
+
+        from resilience import CircuitOpenError
+        with self.assertRaises(CircuitOpenError):
+            self.scraper.scrape_job(driver, job, 'worker-1')
+        queue.release(job, 'worker-1')
+        job = queue.jobs(run_id)[0]
+        self.assertEqual((job['status'], job['attempts']), (PENDING, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
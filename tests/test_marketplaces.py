@@ -0,0 +1,194 @@
+"""Parser tests for the TradeMe adapter against a saved results page and recorded cards
+
+Run from the repository root: python -m unittest discover tests
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marketplaces import TradeMeAdapter, get_adapter
+from marketplaces.base import CardHTMLParser
+from recorded_cards import load_cards
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'trademe_results_page.html')
+RECORDED_CARDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'recorded_cards.jsonl')
+
+LOW_KM_NOTE = 'Low km (no odometer reading)'
+
+# (listing ID, field, expected value) for the cards in RECORDED_CARDS
+RECORDED_CARD_CASES = [
+    # Odometer: whole numbers followed by the word km/kms only
+    ('TM4500000001', 'kms', '45600'),            # "45,600km"
+    ('TM4500000002', 'kms', '12000'),            # "Odometer 12,000 KM"
+    ('TM4500000003', 'kms', 'N/A'),              # "230kmh", "A12345km"
+    ('TM4500000004', 'kms', '1234567'),          # never the tail of a longer number
+    # "Low kms" is a claim, not a reading
+    ('TM4500000005', 'kms', 'N/A'),
+    ('TM4500000005', 'notes', LOW_KM_NOTE),
+    ('TM4500000006', 'kms', '45000'),            # "Super low kms, 45,000 km"
+    ('TM4500000006', 'notes', ''),
+    # Year: leading the title, otherwise a standalone year that isn't an engine size
+    ('TM4500000001', 'year', '2016'),
+    ('TM4500000007', 'year', '2015'),            # "Toyota 86 GT86 Manual 2015"
+    ('TM4500000008', 'year', '2014'),            # "Toyota 86 2000cc 2014 GT"
+    ('TM4500000009', 'year', '2017'),            # "2017 ... with 2019 service history"
+    ('TM4500000010', 'year', 'N/A'),             # "Subaru BRZ 2.0 sTI"
+    # Dealer: a badge or a short business name, whole words only
+    ('TM4500000001', 'is_dealer', False),        # "GT Limited" title, "Automatic" line
+    ('TM4500000011', 'is_dealer', True),         # "Dealer"
+    ('TM4500000012', 'is_dealer', True),         # "Capital City Cars"
+    ('TM4500000013', 'is_dealer', False),        # "Minor scars on the bonnet, great cars these"
+    ('TM4500000014', 'is_dealer', False),        # "Undealered import"
+]
+
+
+def load_fixture():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+class CardHTMLParserTest(unittest.TestCase):
+    def setUp(self):
+        adapter = TradeMeAdapter()
+        self.parser = CardHTMLParser(adapter.card_class, adapter.listing_id_pattern)
+        self.parser.feed(load_fixture())
+        self.parser.close()
+
+    def test_finds_every_card_and_nothing_else(self):
+        self.assertEqual(len(self.parser.cards), 3)
+
+    def test_card_text_has_one_line_per_block(self):
+        text, _ = self.parser.cards[0]
+        self.assertEqual(text.split('\n'), [
+            '2016 Toyota 86 GT Limited Automatic',
+            'Auckland City, Auckland',
+            'Listed 3 hours ago',
+            '66,987 km',
+            'Buy Now',
+            '$25,990',
+            'Capital City Cars',
+        ])
+
+    def test_entities_are_decoded(self):
+        text, _ = self.parser.cards[1]
+        self.assertEqual(text.split('\n')[0], 'Toyota 86 GT86 Manual 2015 & extras')
+
+    def test_listing_href_from_wrapping_or_inner_anchor(self):
+        hrefs = [href for _, href in self.parser.cards]
+        self.assertEqual(hrefs, [
+            '/a/motors/cars/toyota/86/listing/4512345678?bof=AbCd1234',
+            'https://www.trademe.co.nz/a/motors/cars/toyota/86/listing/4511111111',
+            None,
+        ])
+
+
+class TradeMeAdapterTest(unittest.TestCase):
+    def setUp(self):
+        self.adapter = TradeMeAdapter()
+
+    def test_registered(self):
+        self.assertIsInstance(get_adapter('trademe'), TradeMeAdapter)
+        with self.assertRaises(ValueError):
+            get_adapter('nosuchsite')
+
+    def test_cards_from_html(self):
+        cards = self.adapter.cards_from_html(load_fixture(), 'Toyota 86')
+        self.assertEqual(len(cards), 3)
+        self.assertTrue(all(card.car_model == 'Toyota 86' for card in cards))
+        self.assertEqual(cards[2].find_elements(TradeMeAdapter.XPATH, self.adapter.listing_anchor_xpath), [])
+
+    def test_parse_listing_href(self):
+        self.assertEqual(
+            self.adapter.parse_listing_href('/a/motors/cars/toyota/86/listing/4512345678?bof=AbCd1234'),
+            ('4512345678', 'https://www.trademe.co.nz/a/motors/cars/toyota/86/listing/4512345678'),
+        )
+        self.assertEqual(self.adapter.parse_listing_href('/a/motors/cars/toyota/86'), ('N/A', 'N/A'))
+        self.assertEqual(self.adapter.parse_listing_href(None), ('N/A', 'N/A'))
+        self.assertEqual(self.adapter.listing_key('4512345678'), 'TM4512345678')
+
+    def test_build_page_url(self):
+        url = self.adapter.search_urls()['Toyota 86']
+        self.assertEqual(url, 'https://www.trademe.co.nz/a/motors/cars/toyota/86')
+        self.assertEqual(self.adapter.build_page_url(url, 1), url)
+        self.assertEqual(self.adapter.build_page_url(url, 3), f"{url}?page=3")
+        self.assertEqual(self.adapter.build_page_url(url, 2, newest_first=True), f"{url}?sort_order=expirydesc&page=2")
+        self.assertEqual(self.adapter.build_page_url(f"{url}?price_max=30000", 2), f"{url}?price_max=30000&page=2")
+
+
+class ExtractListingDataTest(unittest.TestCase):
+    """Cards from the saved page through the scraper's card parser"""
+
+    @classmethod
+    def setUpClass(cls):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        cls.output_dir = tempfile.TemporaryDirectory()
+        scraper = StreamlinedMasterScraper(output_dir=cls.output_dir.name)
+        cards = scraper.marketplace.cards_from_html(load_fixture(), 'Toyota 86')
+        cls.listings = [scraper.extract_listing_data(card, 'Toyota 86') for card in cards]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.output_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_buy_now_dealer_card(self):
+        listing = self.listings[0]
+        self.assertEqual(listing['ID'], 'TM4512345678')
+        self.assertEqual(listing['listing_url'], 'https://www.trademe.co.nz/a/motors/cars/toyota/86/listing/4512345678')
+        self.assertEqual((listing['year'], listing['kms'], listing['price']), ('2016', '66987', '$25,990'))
+        self.assertEqual(listing['transmission'], 'Automatic')
+        self.assertEqual((listing['town'], listing['region']), ('Auckland', 'Auckland'))
+        self.assertFalse(listing['is_auction'])
+        self.assertTrue(listing['is_dealer'])
+
+    def test_auction_card_without_odometer(self):
+        listing = self.listings[1]
+        self.assertEqual(listing['ID'], 'TM4511111111')
+        self.assertEqual(listing['year'], '2015')
+        self.assertEqual(listing['kms'], 'N/A')
+        self.assertIn('Low km', listing['notes'])
+        self.assertTrue(listing['is_auction'])
+        self.assertFalse(listing['is_dealer'])
+
+    def test_card_without_link_gets_fallback_id(self):
+        listing = self.listings[2]
+        self.assertEqual(listing['listing_id'], 'N/A')
+        self.assertFalse(listing['ID'].startswith('TM'))
+        self.assertEqual((listing['year'], listing['kms'], listing['price']), ('2013', '120000', 'N/A'))
+
+
+class RecordedCardParsingTest(unittest.TestCase):
+    """Recorded cards re-parsed without a browser, one field at a time"""
+
+    @classmethod
+    def setUpClass(cls):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        cls.output_dir = tempfile.TemporaryDirectory()
+        scraper = StreamlinedMasterScraper(output_dir=cls.output_dir.name)
+        listings = [scraper.extract_listing_data(card, card.car_model) for card in load_cards(RECORDED_CARDS)]
+        cls.listings = {listing['ID']: listing for listing in listings}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.output_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_every_card_parses(self):
+        self.assertEqual(len(self.listings), 14)
+
+    def test_fields(self):
+        for listing_id, field, expected in RECORDED_CARD_CASES:
+            with self.subTest(listing_id=listing_id, field=field):
+                self.assertEqual(self.listings[listing_id][field], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Query API index tests: filtered, sorted and paged queries against a brute-force reference
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_api import RANGE_FIELDS, ListingIndex, number, parse_listing_query
+
+QUERIES = [
+    '',
+    'sort=kms',
+    'sort=-kms',
+    'sort=-price&offset=40&limit=25',
+    'model=Toyota%2086&active=true&year_min=2015&price_max=23000&sort=price',
+    'region=NZ-WKO&distance_km_max=150&sort=distance_km',
+    'price_min=20000&price_max=20000&sort=-price',
+    'year_min=2020&kms_max=30000&sort=-year',
+    'sort=-deal_score&model=subaru%20brz&limit=30',
+    'sort=last_seen&price_min=10000',
+    'sort=-last_seen&offset=10&limit=50',
+    'year_min=2030',
+    'active=false&sort=-year&offset=290&limit=100',
+    'region=NZ-AUK&sort=-kms&limit=3',
+    'kms_max=5000&sort=-distance_km&limit=1000',
+    'sort=year&offset=590&limit=100',
+]
+
+
+def random_records(count, seed=7):
+    # Few distinct values, so ties and missing values are common
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        records.append({
+            'ID': f"TM{rng.randrange(10 ** 6):06d}-{i}",
+            'car_model': rng.choice(['Toyota 86', 'Subaru BRZ']),
+            'region_code': rng.choice(['NZ-AUK', 'NZ-WKO', 'NZ-CAN', None]),
+            'is_active': rng.random() < 0.4,
+            'year': rng.choice([rng.randint(2012, 2024), None]),
+            'price': rng.choice([rng.randint(150, 300) * 100, None, 'N/A']),
+            'kms': rng.choice([rng.randint(0, 40) * 5000, None]),
+            'distance_km': rng.choice([rng.randint(0, 60) * 10, None]),
+            'deal_score': rng.choice([round(rng.random(), 1), None]),
+            'last_seen': rng.choice([f"2026-10-{rng.randint(1, 19):02d} 08:00:00", 'N/A']),
+        })
+    return records
+
+
+def brute_force(records, options):
+    """The query answered by filtering every record and sorting the lot"""
+    listings = list(records)
+    if options.get('model') is not None:
+        listings = [r for r in listings if str(r['car_model']).lower() == options['model'].lower()]
+    if options.get('region') is not None:
+        listings = [r for r in listings if str(r['region_code']).lower() == options['region'].lower()]
+    if options.get('active') is not None:
+        listings = [r for r in listings if (r['is_active'] is True) == options['active']]
+    for field, (low, high) in (options.get('ranges') or {}).items():
+        listings = [r for r in listings if number(r[field]) is not None
+                    and (low is None or number(r[field]) >= low) and (high is None or number(r[field]) <= high)]
+
+    listings.sort(key=lambda r: r['ID'])
+    sort = options.get('sort')
+    if sort is not None:
+        def value(record):
+            if sort in RANGE_FIELDS or sort == 'deal_score':
+                return number(record.get(sort))
+            return None if record.get(sort) in (None, '', 'N/A') else str(record[sort])
+        present = sorted((r for r in listings if value(r) is not None), key=value, reverse=options.get('descending', False))
+        listings = present + [r for r in listings if value(r) is None]
+    offset, limit = options.get('offset', 0), options.get('limit', 100)
+    return len(listings), [r['ID'] for r in listings[offset:offset + limit]]
+
+
+class ListingIndexQueryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.records = random_records(600)
+
+    def check_queries(self, index, records):
+        for query in QUERIES:
+            with self.subTest(query=query):
+                options = parse_listing_query(parse_qs(query))
+                result = index.query(**options)
+                self.assertEqual((result['total'], [r['ID'] for r in result['listings']]), brute_force(records, options))
+
+    def test_incremental_index(self):
+        index = ListingIndex('/nonexistent/listings.jsonl')
+        for record in self.records:
+            index.add(record['ID'], record)
+        self.check_queries(index, self.records)
+
+    def test_bulk_index(self):
+        index = ListingIndex('/nonexistent/listings.jsonl')
+        for record in self.records:
+            index.add(record['ID'], record, index_ranges=False)
+        index.rebuild_ranges()
+        self.check_queries(index, self.records)
+
+    def test_removed_listings_leave_every_index(self):
+        index = ListingIndex('/nonexistent/listings.jsonl')
+        for record in self.records:
+            index.add(record['ID'], record)
+        for record in self.records[::3]:
+            index.remove(record['ID'])
+        kept = [record for i, record in enumerate(self.records) if i % 3]
+        self.check_queries(index, kept)
+        for field in RANGE_FIELDS:
+            self.assertEqual(len(index.range_ids[field]), len(index.range_value_of[field]))
+
+    def test_fields_trim_the_listings(self):
+        index = ListingIndex('/nonexistent/listings.jsonl')
+        for record in self.records[:5]:
+            index.add(record['ID'], record)
+        result = index.query(sort='kms', limit=2, fields=['ID', 'kms'])
+        self.assertEqual([sorted(listing) for listing in result['listings']], [['ID', 'kms'], ['ID', 'kms']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Relisting detection tests: a relisted car keeps its vehicle record, different cars don't share one
+
+Run from the repository root: python -m unittest discover tests
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from relisting import RelistingDetector
+
+
+def listing(listing_id, kms, title='2016 Toyota 86 GT Limited Automatic', is_active=True):
+    return {
+        'ID': listing_id,
+        'title': title,
+        'year': '2016',
+        'kms': kms,
+        'location': 'Auckland City, Auckland',
+        'transmission': 'Automatic',
+        'car_model': 'Toyota 86',
+        'is_active': is_active,
+    }
+
+
+class RelistingDetectorTest(unittest.TestCase):
+    def setUp(self):
+        self.detector = RelistingDetector()
+        earlier = listing('TM1', '45000', is_active=False)
+        self.detector.add('TM1', 'TM1', earlier)
+
+    def test_relisted_car_matches(self):
+        self.assertEqual(self.detector.find_match('TM2', listing('TM2', '45,600')), 'TM1')
+
+    def test_same_title_rejects_false_matches(self):
+        cases = [
+            ('far more kms', '98000'),
+            ('odometer went backwards', '40000'),
+            ('no odometer reading', 'N/A'),
+        ]
+        for name, kms in cases:
+            with self.subTest(name):
+                self.assertIsNone(self.detector.find_match('TM2', listing('TM2', kms)))
+
+    def test_listing_on_sale_now_is_not_a_match(self):
+        self.assertIsNone(self.detector.find_match('TM2', listing('TM2', '45600'), exclude={'TM1'}))
+
+    def test_different_model_year_never_matches(self):
+        newer = dict(listing('TM2', '45600'), year='2017')
+        self.assertIsNone(self.detector.find_match('TM2', newer))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'relisting_index.pkl')
+            self.detector.save(filepath)
+            loaded = RelistingDetector()
+            loaded.load(filepath)
+        self.assertEqual(loaded.find_match('TM2', listing('TM2', '45600')), 'TM1')
+
+
+class AssignVehicleIdsTest(unittest.TestCase):
+    """Vehicle IDs for a merged frame, through the scraper"""
+
+    @classmethod
+    def setUpClass(cls):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        cls.output_dir = tempfile.TemporaryDirectory()
+        cls.scraper = StreamlinedMasterScraper(output_dir=cls.output_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.output_dir.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_relist_linked_and_concurrent_cars_kept_apart(self):
+        df = pd.DataFrame([
+            listing('TM1', '45000', is_active=False),  # sold, then relisted as TM2
+            listing('TM2', '45200'),
+            listing('TM3', '45500'),                   # an identical car on sale at the same time
+            listing('TM4', '98000'),                   # same title, different car
+        ])
+        linked = self.scraper.assign_vehicle_ids(df, RelistingDetector(), scraped_ids={'TM2', 'TM3', 'TM4'})
+        self.assertEqual(linked, 1)
+        self.assertEqual(list(df['vehicle_id']), ['TM1', 'TM1', 'TM3', 'TM4'])
+
+    def test_vehicle_on_sale_from_an_earlier_run_is_taken(self):
+        detector = RelistingDetector()
+        detector.add('TM1', 'TM1', listing('TM1', '45000'))
+        df = pd.DataFrame([listing('TM1', '45000'), listing('TM2', '45500')])
+        self.assertEqual(self.scraper.assign_vehicle_ids(df, detector, scraped_ids={'TM1', 'TM2'}), 0)
+        self.assertEqual(list(df['vehicle_id']), ['TM1', 'TM2'])
+
+    def test_indexed_listings_keep_their_vehicle(self):
+        detector = RelistingDetector()
+        df = pd.DataFrame([listing('TM1', '45000', is_active=False), listing('TM3', '45500')])
+        self.scraper.assign_vehicle_ids(df, detector, scraped_ids={'TM3'})
+        again = pd.DataFrame([listing('TM3', '45500')])
+        self.assertEqual(self.scraper.assign_vehicle_ids(again, detector, scraped_ids={'TM3'}), 0)
+        self.assertEqual(list(again['vehicle_id']), ['TM1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""Listing validation tests: which rows are rejected, which fields are withheld, and the quarantine table
+
+Run from the repository root: python -m unittest discover tests
+"""
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from recorded_cards import load_cards
+from validation import QUARANTINE_COLUMNS, REJECTED, WITHHELD, ListingValidator, append_quarantine
+
+RECORDED_CARDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'recorded_cards.jsonl')
+
+CAR_MODELS = ['Toyota 86', 'Subaru BRZ']
+NEXT_YEAR = datetime.now().year + 1
+
+
+def listing(listing_id='TM1', **fields):
+    row = {'ID': listing_id, 'title': '2016 Toyota 86 GT', 'car_model': 'Toyota 86',
+           'year': '2016', 'price': '$25,990', 'kms': '66,987 km'}
+    row.update(fields)
+    return row
+
+
+# (case, listing fields, expected (field, rule, action) or None when the row passes untouched)
+ROW_CASES = [
+    ('valid', {}, None),
+    ('numbers already parsed', {'year': 2016.0, 'price': 25990, 'kms': 66987}, None),
+    ('missing values are allowed', {'year': 'N/A', 'price': '', 'kms': None}, None),
+    ('kms with "kms"', {'kms': '45000kms'}, None),
+    ('lowest price', {'price': '$1,000'}, None),
+    ('next year', {'year': str(NEXT_YEAR)}, None),
+    ('no ID', {'ID': 'N/A'}, ('ID', 'required field missing', REJECTED)),
+    ('blank title', {'title': '  '}, ('title', 'required field missing', REJECTED)),
+    ('no car model', {'car_model': None}, ('car_model', 'required field missing', REJECTED)),
+    ('unsearched car model', {'car_model': 'Mazda MX-5'}, ('car_model', 'unknown car model', REJECTED)),
+    ('year before the 86 and BRZ', {'year': '2008'}, ('year', f"outside 2012-{NEXT_YEAR}", WITHHELD)),
+    ('year after next', {'year': str(NEXT_YEAR + 1)}, ('year', f"outside 2012-{NEXT_YEAR}", WITHHELD)),
+    ('deposit, not a price', {'price': '$500'}, ('price', 'outside 1000-250000', WITHHELD)),
+    ('odometer too high', {'kms': '1,234,567 km'}, ('kms', 'outside 0-500000', WITHHELD)),
+    ('negative odometer', {'kms': '-5'}, ('kms', 'outside 0-500000', WITHHELD)),
+    ('price text', {'price': 'Price by negotiation'}, ('price', 'not a number', WITHHELD)),
+    ('kms text', {'kms': 'lots'}, ('kms', 'not a number', WITHHELD)),
+]
+
+
+class ListingValidatorTest(unittest.TestCase):
+    def setUp(self):
+        self.validator = ListingValidator(CAR_MODELS)
+
+    def test_row_rules(self):
+        for case, fields, expected in ROW_CASES:
+            with self.subTest(case):
+                row = listing(**fields)
+                accepted, quarantine = self.validator.validate([row], run_at='2026-10-19 08:00:00')
+                if expected is None:
+                    self.assertEqual(len(accepted), 1)
+                    self.assertTrue(quarantine.empty)
+                    continue
+                field, rule, action = expected
+                self.assertEqual(quarantine[['field', 'rule', 'action']].values.tolist(), [[field, rule, action]])
+                self.assertEqual(quarantine['value'].iloc[0], str(row[field]))
+                if action == REJECTED:
+                    self.assertTrue(accepted.empty)
+                else:
+                    # The row still counts as seen; only the bad value is dropped
+                    self.assertEqual(len(accepted), 1)
+                    self.assertEqual(accepted[field].iloc[0], 'N/A')
+
+    def test_duplicate_id_keeps_the_first_row(self):
+        accepted, quarantine = self.validator.validate([listing(price='$20,000'), listing(price='$21,000')])
+        self.assertEqual(list(accepted['price']), ['$20,000'])
+        self.assertEqual(quarantine[['field', 'rule', 'action']].values.tolist(), [['ID', 'duplicate ID in batch', REJECTED]])
+
+    def test_rejected_row_is_not_also_withheld(self):
+        _, quarantine = self.validator.validate([listing(title='', year='1999', car_model='Mazda MX-5')])
+        self.assertEqual(quarantine['rule'].tolist(), ['required field missing'])
+
+    def test_report_and_rejection_rate(self):
+        rows = [listing('TM1'), listing('TM2', title=''), listing('TM3', kms='lots'),
+                listing('TM4', car_model='Subaru BRZ')]
+        self.validator.validate(rows)
+        self.assertEqual(self.validator.report, {
+            'Toyota 86': {'rows': 3, 'rejected': 1, 'withheld': 1},
+            'Subaru BRZ': {'rows': 1, 'rejected': 0, 'withheld': 0},
+        })
+        self.assertAlmostEqual(self.validator.rejection_rate('Toyota 86'), 1 / 3)
+        self.assertEqual(self.validator.rejection_rate('Mazda MX-5'), 0.0)
+
+    def test_custom_ranges(self):
+        validator = ListingValidator(CAR_MODELS, ranges={'kms': (0, 200000)})
+        accepted, quarantine = validator.validate([listing(kms='250,000 km', year='1999')])
+        self.assertEqual(quarantine['rule'].tolist(), ['outside 0-200000'])
+        self.assertEqual(accepted['year'].iloc[0], '1999')
+
+    def test_empty_batch(self):
+        accepted, quarantine = self.validator.validate([])
+        self.assertTrue(accepted.empty)
+        self.assertEqual(list(quarantine.columns), QUARANTINE_COLUMNS)
+
+    def test_recorded_cards(self):
+        from streamlined_master_scraper import StreamlinedMasterScraper
+
+        logging.disable(logging.CRITICAL)
+        try:
+            with tempfile.TemporaryDirectory() as output_dir:
+                scraper = StreamlinedMasterScraper(output_dir=output_dir)
+                listings = [scraper.extract_listing_data(card, card.car_model) for card in load_cards(RECORDED_CARDS)]
+        finally:
+            logging.disable(logging.NOTSET)
+        accepted, quarantine = self.validator.validate(listings)
+        self.assertEqual(len(accepted), len(listings))
+        self.assertEqual(quarantine[['ID', 'field', 'value']].values.tolist(), [['TM4500000004', 'kms', '1234567']])
+
+
+class AppendQuarantineTest(unittest.TestCase):
+    def test_header_written_once(self):
+        validator = ListingValidator(CAR_MODELS)
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'quarantine', 'validation_quarantine.csv')
+            for listing_id in ('TM1', 'TM2'):
+                _, quarantine = validator.validate([listing(listing_id, kms='lots')])
+                append_quarantine(filepath, quarantine)
+            append_quarantine(filepath, pd.DataFrame(columns=QUARANTINE_COLUMNS))
+            saved = pd.read_csv(filepath, dtype=str)
+        self.assertEqual(list(saved.columns), QUARANTINE_COLUMNS)
+        self.assertEqual(list(saved['ID']), ['TM1', 'TM2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
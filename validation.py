@@ -0,0 +1,145 @@
+import logging
+import os
+from datetime import datetime
+
+# Values that mean "not on the card"; missing fields are allowed and keep their history on merge
+MISSING_VALUES = ['', 'N/A', 'nan', 'None', 'NaN']
+
+# Rows without these can't be matched to the history, so they are held back whole
+REQUIRED_FIELDS = ['ID', 'title', 'car_model']
+
+# Plausible (lowest, highest) values; None as the highest means next year. The 86 and BRZ
+# were launched as 2012 models, so an earlier year has come from a trim or engine name.
+FIELD_RANGES = {
+    'year': (2012, None),
+    'price': (1000, 250000),
+    'kms': (0, 500000),
+}
+
+QUARANTINE_COLUMNS = ['run_at', 'ID', 'car_model', 'title', 'field', 'value', 'rule', 'action']
+
+# Quarantine actions: the whole row held back, or just the one field withheld from the merge
+REJECTED, WITHHELD = 'rejected', 'withheld'
+
+
+def missing_mask(values):
+    """True where a column has no value"""
+    return values.isna() | values.astype(str).str.strip().isin(MISSING_VALUES)
+
+
+def numeric_values(values):
+    """Card text as numbers ('$35,990' -> 35990, '66,987 km' -> 66987, '2016.0' -> 2016), NaN where it isn't one"""
+    import pandas as pd
+
+    text = values.astype(str).str.strip().str.replace(r'^\$|,|\s*kms?$', '', regex=True, case=False)
+    return pd.to_numeric(text, errors='coerce')
+
+
+class ListingValidator:
+    """Batch checks of parsed listings against the schema and plausible ranges
+
+    Every check is a column operation over the whole batch. A row missing a required
+    field, naming a car model no adapter searches for, or repeating an ID already in
+    the batch is rejected. A numeric field that isn't a number or is out of range is
+    withheld: it is set to 'N/A' so the merge keeps the listing's historical value,
+    while the row itself still marks the listing as seen. Every failure is recorded
+    with its reason for the quarantine table.
+    """
+
+    def __init__(self, car_models, ranges=None):
+        self.logger = logging.getLogger(__name__)
+        self.car_models = set(car_models)
+        self.ranges = dict(FIELD_RANGES if ranges is None else ranges)
+        # car_model -> {'rows', 'rejected', 'withheld'} for the last batch
+        self.report = {}
+
+    def validate(self, new_data, run_at=None):
+        """Return (accepted rows as a DataFrame, quarantine rows as a DataFrame)"""
+        import numpy as np
+        import pandas as pd
+
+        run_at = run_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        frame = pd.DataFrame(new_data).reset_index(drop=True)
+        self.report = {}
+        if frame.empty:
+            return frame, pd.DataFrame(columns=QUARANTINE_COLUMNS)
+
+        for column in REQUIRED_FIELDS:
+            if column not in frame.columns:
+                frame[column] = None
+
+        issues = []
+        rejected = np.zeros(len(frame), dtype=bool)
+
+        def record(mask, field, rule, action):
+            if not mask.any():
+                return
+            rows = frame[mask]
+            issues.append(pd.DataFrame({
+                'run_at': run_at,
+                'ID': rows['ID'].to_numpy(),
+                'car_model': rows['car_model'].to_numpy(),
+                'title': rows['title'].to_numpy(),
+                'field': field,
+                'value': rows[field].astype(str).to_numpy() if field in rows.columns else '',
+                'rule': rule,
+                'action': action,
+            }))
+
+        # Schema: required fields present, car model one we search for, one row per listing
+        for field in REQUIRED_FIELDS:
+            mask = missing_mask(frame[field]).to_numpy() & ~rejected
+            record(mask, field, 'required field missing', REJECTED)
+            rejected |= mask
+        mask = ~frame['car_model'].isin(self.car_models).to_numpy() & ~rejected
+        record(mask, 'car_model', 'unknown car model', REJECTED)
+        rejected |= mask
+        mask = frame['ID'].astype(str).duplicated().to_numpy() & ~rejected
+        record(mask, 'ID', 'duplicate ID in batch', REJECTED)
+        rejected |= mask
+
+        # Ranges: withhold implausible values so they never replace a good historical one
+        withheld = np.zeros(len(frame), dtype=bool)
+        for field, (lowest, highest) in self.ranges.items():
+            if field not in frame.columns:
+                continue
+            highest = datetime.now().year + 1 if highest is None else highest
+            present = ~missing_mask(frame[field]).to_numpy() & ~rejected
+            values = numeric_values(frame[field]).to_numpy()
+            not_number = present & np.isnan(values)
+            out_of_range = present & ~not_number & ((values < lowest) | (values > highest))
+            record(not_number, field, 'not a number', WITHHELD)
+            record(out_of_range, field, f"outside {lowest}-{highest}", WITHHELD)
+            bad = not_number | out_of_range
+            if bad.any():
+                frame[field] = frame[field].astype(object)
+                frame.loc[bad, field] = 'N/A'
+                withheld |= bad
+
+        for car_model, group in pd.DataFrame({'car_model': frame['car_model'].astype(str), 'rejected': rejected,
+                                              'withheld': withheld}).groupby('car_model'):
+            self.report[car_model] = {'rows': len(group), 'rejected': int(group['rejected'].sum()),
+                                      'withheld': int(group['withheld'].sum())}
+
+        quarantine = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=QUARANTINE_COLUMNS)
+        return frame[~rejected].reset_index(drop=True), quarantine[QUARANTINE_COLUMNS]
+
+    def rejection_rate(self, car_model):
+        counts = self.report.get(car_model)
+        return counts['rejected'] / counts['rows'] if counts and counts['rows'] else 0.0
+
+    def log_report(self):
+        for car_model, counts in sorted(self.report.items()):
+            self.logger.info(
+                f"Validation {car_model}: {counts['rows']} rows, {counts['rejected']} rejected "
+                f"({self.rejection_rate(car_model):.1%}), {counts['withheld']} with fields withheld"
+            )
+
+
+def append_quarantine(filepath, quarantine):
+    """Append quarantined rows to the quarantine CSV, writing the header when it is new"""
+    if quarantine.empty:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    new_file = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+    quarantine.to_csv(filepath, mode='a', header=new_file, index=False)